@@ -6,9 +6,14 @@ import os
 os.environ["NO_PROXY"] = "localhost, 127.0.0.1"
 os.environ["no_proxy"] = "localhost, 127.0.0.1"
 
-import pandas as pd
+import sys
 import pandas_toon
 
+# Add src to path to reuse the shared play by play cache
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "src"))
+
+from utils.pbp_cache import get_play_by_play
+
 import typer
 app = typer.Typer()
 
@@ -30,12 +35,8 @@ def get_game_report(
     """
     Get the report for a given game.
     """
-    
-    url=f"https://www.basketball-reference.com/boxscores/pbp/{date}0{home_team}.html"
-
-    cols = [2,4]
 
-    df = pd.read_html(url)[0].droplevel(0, axis=1)
+    df = get_play_by_play(date, home_team)
 
     print(df.to_toon())
 
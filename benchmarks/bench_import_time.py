@@ -0,0 +1,100 @@
+'''
+Benchmark of the startup cost of the server: the import time of `main:app`, measured with `python -X importtime`.
+It reports the total import time and the slowest top level packages, and fails if the total exceeds the budget.
+
+Usage:
+    uv run benchmarks/bench_import_time.py
+    uv run benchmarks/bench_import_time.py --module main --budget-ms 1500 --top 15
+'''
+import os
+import re
+import sys
+import json
+import subprocess
+from typing import Dict, List
+
+import typer
+app = typer.Typer()
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+
+# Lines of `-X importtime`: "import time: <self us> | <cumulative us> | <indent><package>"
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def parse_import_times(stderr: str) -> List[Dict]:
+    '''
+    Parse the output of `-X importtime` into one record per imported module.
+    '''
+    records = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, package = match.groups()
+            records.append({
+                "package": package,
+                "level": len(indent) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+    return records
+
+def measure(module: str) -> List[Dict]:
+    '''
+    Import the module in a fresh interpreter and return the import times.
+    '''
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    return parse_import_times(result.stderr)
+
+@app.command()
+def main(
+    module: str = typer.Option(
+        "main",
+        help="Module to import, relative to src."
+        ),
+    budget_ms: float = typer.Option(
+        1500,
+        help="Import time budget of the module in milliseconds."
+        ),
+    top: int = typer.Option(
+        10,
+        help="Number of slowest packages to report."
+        ),
+    repeat: int = typer.Option(
+        3,
+        help="Number of measurements, the fastest one is reported."
+        ),
+):
+    '''
+    Measure the import time of the server module against the startup budget.
+    '''
+    runs = [measure(module) for _ in range(repeat)]
+    totals = [next(r["cumulative_ms"] for r in records if r["package"] == module) for records in runs]
+    records = runs[totals.index(min(totals))]
+
+    # Direct imports of the module, i.e. the packages that the module pulls in at import time
+    module_level = next(r["level"] for r in records if r["package"] == module)
+    children = [r for r in records if r["level"] == module_level + 1]
+    slowest = sorted(children, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+
+    report = {
+        "module": module,
+        "import_ms": round(min(totals), 1),
+        "budget_ms": budget_ms,
+        "within_budget": min(totals) <= budget_ms,
+        "slowest_imports": {r["package"]: round(r["cumulative_ms"], 1) for r in slowest},
+    }
+    print(json.dumps(report, indent=2))
+
+    if not report["within_budget"]:
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,184 @@
+'''
+Benchmark of the HTTP clients of the LLM models against a local stub of the OpenAI Responses API.
+Concurrent sessions call the models of the agents and the team (one model per call, round robin) through:
+- per_model: one HTTP client per model instance,
+- global_default: one client for all models with the default limits of agno,
+- shared_pool: the shared client of the provider with its concurrency limit (src/utils/llm_clients.py).
+The report has the connections opened to the server (connection reuse) and the p50/p95/p99 latency of the calls.
+
+Usage:
+    uv run benchmarks/bench_llm_clients.py
+    uv run benchmarks/bench_llm_clients.py --sessions 64 --calls 20 --max-concurrency 16
+'''
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import typer
+app = typer.Typer()
+
+class StubServer:
+    '''
+    Stub of the Responses API in a background thread, counting the connections of its clients.
+    '''
+
+    def __init__(self, latency_ms: int):
+        self.latency_ms = latency_ms
+        self.connections = set()
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+
+        async def responses(request: Request) -> JSONResponse:
+            self.connections.add(request.scope["client"])
+            body = await request.json()
+            await asyncio.sleep(self.latency_ms / 1000)
+            return JSONResponse({
+                "id": "resp_stub", "object": "response", "created_at": int(time.time()), "status": "completed",
+                "model": body.get("model"), "output": [], "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+            })
+
+        config = uvicorn.Config(
+            Starlette(routes=[Route("/v1/responses", responses, methods=["POST"])]),
+            host="127.0.0.1", port=self.port, log_level="warning", backlog=4096,
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def __enter__(self) -> "StubServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+def percentile(latencies: List[float], q: float) -> float:
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+async def run_sessions(
+        server: StubServer,
+        sdk_clients: List[Any],
+        slot: Callable[[], Any],
+        sessions: int,
+        calls: int,
+        ) -> Dict:
+    '''
+    Run the sessions concurrently, every call with the next model, and summarize the latencies.
+    '''
+    server.connections.clear()
+    latencies: List[float] = []
+
+    async def session(index: int) -> None:
+        for call in range(calls):
+            client = sdk_clients[(index + call) % len(sdk_clients)]
+            start = time.perf_counter()
+            async with slot():
+                await client.responses.create(model=f"model-{(index + call) % len(sdk_clients)}", input="Who won?")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    duration = time.perf_counter() - start
+
+    return {
+        "calls": len(latencies),
+        "connections_opened": len(server.connections),
+        "calls_per_sec": round(len(latencies) / duration, 1),
+        "latency_ms": {q: round(percentile(latencies, int(q[1:])), 1) for q in ("p50", "p95", "p99")},
+    }
+
+@app.command()
+def main(
+    sessions: int = typer.Option(
+        32,
+        help="Number of concurrent sessions."
+        ),
+    calls: int = typer.Option(
+        10,
+        help="Number of model calls per session."
+        ),
+    models: int = typer.Option(
+        10,
+        help="Number of model instances (models and reasoning models of the agents and the team)."
+        ),
+    latency_ms: int = typer.Option(
+        50,
+        help="Latency of the stub server, in milliseconds."
+        ),
+    max_concurrency: int = typer.Option(
+        16,
+        help="Concurrency limit of the shared pool."
+        ),
+):
+    '''
+    Compare the connection reuse and tail latency of per-model and shared LLM HTTP clients.
+    '''
+    os.environ["LLM_PROVIDER_LIMITS"] = json.dumps({"openai": {"max_concurrency": max_concurrency, "max_connections": max_concurrency}})
+    from contextlib import asynccontextmanager
+    from openai import AsyncOpenAI
+    from utils.llm_clients import LLMClientRegistry, get_http_module
+
+    http = get_http_module("openai")
+
+    @asynccontextmanager
+    async def no_limit():
+        yield
+
+    async def scenarios(server: StubServer) -> Dict:
+        def sdk(http_client) -> AsyncOpenAI:
+            return AsyncOpenAI(base_url=server.url, api_key="stub", http_client=http_client, max_retries=0)
+
+        per_model = [sdk(http.AsyncClient()) for _ in range(models)]
+        global_client = http.AsyncClient(limits=http.Limits(max_connections=1000, max_keepalive_connections=200), http2=True)
+        registry = LLMClientRegistry()
+
+        report = {
+            "per_model": await run_sessions(server, per_model, no_limit, sessions, calls),
+            "global_default": await run_sessions(server, [sdk(global_client)] * models, no_limit, sessions, calls),
+            "shared_pool": await run_sessions(
+                server, [sdk(registry.async_client("openai")) for _ in range(models)],
+                lambda: registry.aslot("openai"), sessions, calls,
+            ),
+        }
+        report["shared_pool"]["max_in_flight"] = registry.stats()["openai"]["max_in_flight"]
+        return report
+
+    with StubServer(latency_ms) as server:
+        report = {
+            "sessions": sessions,
+            "calls_per_session": calls,
+            "models": models,
+            "server_latency_ms": latency_ms,
+            "max_concurrency": max_concurrency,
+            "http_package": http.__name__,
+            **asyncio.run(scenarios(server)),
+        }
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,473 @@
+'''
+Offline benchmark suite: no network, no API key, reproducible between commits.
+- the play by play pages are served from the recorded HTML fixtures (tests/fixtures),
+- the season tables are read from a season store of recorded fixtures (tests/fixtures/seasons, filled with
+  `SEASON_STORE_DIR=tests/fixtures/seasons uv run src/utils/season_store.py ingest`), or from deterministic
+  synthetic tables with the same key columns if no fixture is recorded,
+- the KMeans fits run locally on these tables,
+- the agents, the team and the workflow run on the deterministic stub model (llm=stub),
+- the knowledge base uses the local vector DB with the hashing embedder.
+
+It times the game report workflow end to end, every data agent tool (sync and async variant, called through agno),
+the orchestration overhead of the data analysis team over the data agent alone, and the startup of `main:app`.
+The first call of a measurement runs on cold caches and is reported separately.
+The results are printed as JSON, `compare` reports the regressions between two result files.
+
+Usage:
+    uv run benchmarks/bench_offline.py run --output bench.json
+    uv run benchmarks/bench_offline.py run --repeat 50 --stub-latency-ms 50
+    uv run benchmarks/bench_offline.py compare base.json bench.json --threshold 0.2
+'''
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+FIXTURES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures"))
+
+# Add src to path to import our modules
+sys.path.append(SRC_DIR)
+
+import typer
+app = typer.Typer()
+
+# Recorded play by play pages: (date, home_team) -> fixture file
+PBP_FIXTURES = {("20251116", "HOU"): "pbp_20251116_HOU.html"}
+SEASON = "2025"
+
+# Keys of the season tables, the synthetic tables get these columns and numeric stats
+TEAMS = [
+    "ATL", "BOS", "BRK", "CHO", "CHI", "CLE", "DAL", "DEN", "DET", "GSW", "HOU", "IND", "LAC", "LAL", "MEM",
+    "MIA", "MIL", "MIN", "NOP", "NYK", "OKC", "ORL", "PHI", "PHO", "POR", "SAC", "SAS", "TOR", "UTA", "WAS",
+]
+TEAM_SHOOTING_STATS = ["FG%", "Dist.", "2P", "0-3", "3-10", "10-16", "16-3P", "3P", "2P%", "3P%", "%Ast'd", "Dunks"]
+ADV_STATS = ["Age", "G", "MP", "PER", "TS%", "3PAr", "FTr", "ORB%", "DRB%", "TRB%", "AST%", "STL%", "BLK%",
+             "TOV%", "USG%", "OWS", "DWS", "WS", "WS/48", "OBPM", "DBPM", "BPM", "VORP"]
+
+def offline_env(work_dir: str, stub_latency_ms: int) -> Dict[str, str]:
+    '''
+    Environment of the offline runs: stub models, local stores in the work directory, no background services.
+    '''
+    return {
+        "llm": "stub",
+        "llm_reasoning": "stub",
+        "llm_fast": "stub",
+        "STUB_LLM_LATENCY_MS": str(stub_latency_ms),
+        "CACHE_DIR": os.path.join(work_dir, "cache"),
+        "SEASON_STORE_DIR": os.path.join(work_dir, "seasons"),
+        "SEASON_STORE_OFFLINE": "true",
+        "KB_VECTOR_BACKEND": "local",
+        "KB_EMBEDDER": "hashing",
+        "KB_LOCAL_VECTOR_DIR": os.path.join(work_dir, "vectors"),
+        "KB_GLOSSARY_PATH": os.path.join(work_dir, "glossary.json"),
+        "KB_INGEST_ON_STARTUP": "false",
+        "SEMANTIC_CACHE": "false",
+        "ROUTING": "false",
+        "TRACING": "false",
+        "MLFLOW_TRACING": "false",
+        "APP_WARMUP": "false",
+        "AGNO_TELEMETRY": "false",
+    }
+
+def prepare_seasons(store_dir: str) -> str:
+    '''
+    Fill the season store of the run with the recorded season tables, or with synthetic tables.
+
+    Returns:
+        "recorded" or "synthetic".
+    '''
+    recorded = Path(FIXTURES_DIR) / "seasons"
+    if (recorded / "team_shooting" / f"season={SEASON}").exists() and (recorded / "adv_stats" / f"season={SEASON}").exists():
+        import shutil
+        shutil.copytree(recorded, store_dir, dirs_exist_ok=True)
+        return "recorded"
+
+    from utils.season_store import SeasonStore
+
+    rng = np.random.default_rng(int(SEASON))
+    store = SeasonStore(store_dir)
+    team_shooting = pd.DataFrame(rng.random((len(TEAMS), len(TEAM_SHOOTING_STATS))).round(3), columns=TEAM_SHOOTING_STATS)
+    team_shooting.insert(0, "Team", TEAMS)
+    store.write("team_shooting", SEASON, team_shooting)
+
+    players = 450
+    adv_stats = pd.DataFrame((rng.random((players, len(ADV_STATS))) * 30).round(1), columns=ADV_STATS)
+    adv_stats.insert(0, "Player", [f"Player {index}" for index in range(players)])
+    adv_stats.insert(1, "Pos", rng.choice(["PG", "SG", "SF", "PF", "C"], players))
+    adv_stats.insert(2, "Team", rng.choice(TEAMS, players))
+    store.write("adv_stats", SEASON, adv_stats)
+    return "synthetic"
+
+def kmeans_clustering(table: str, key: str, season: str, n_cluster: int) -> pd.DataFrame:
+    '''
+    KMeans fit on the numeric stats of a season table of the local store.
+    '''
+    from sklearn.cluster import KMeans
+    from utils.season_store import read_season_table
+
+    df = read_season_table(table, season)
+    features = df.select_dtypes("number").fillna(0)
+    features = (features - features.mean()) / features.std().replace(0, 1)
+    clusters = KMeans(n_clusters=n_cluster, n_init=10, random_state=0).fit_predict(features)
+    return pd.DataFrame({key: df[key], "cluster": clusters})
+
+# Picklable compute functions of the clustering store, they also run in the process pool
+def cluster_team_shooting(season: str, n_cluster: int) -> pd.DataFrame:
+    return kmeans_clustering("team_shooting", "Team", season, n_cluster)
+
+def cluster_players(season: str, n_cluster: int) -> pd.DataFrame:
+    return kmeans_clustering("adv_stats", "Player", season, n_cluster)
+
+def recorded_page(url: str) -> str:
+    '''
+    Serve a page from the recorded fixtures, there is no network access in the offline runs.
+    '''
+    from utils.pbp_cache import get_pbp_url
+
+    for (date, home_team), fixture in PBP_FIXTURES.items():
+        if url == get_pbp_url(date, home_team):
+            return Path(FIXTURES_DIR, fixture).read_text(encoding="utf-8")
+    raise ConnectionError(f"No recorded fixture for {url}")
+
+async def arecorded_page(url: str) -> str:
+    return recorded_page(url)
+
+def use_fixtures() -> None:
+    '''
+    Route the page fetches and the KMeans fits of the data tools to the fixtures.
+    '''
+    import utils.pbp_cache as pbp_cache_module
+    from utils.clustering_store import FEATURE_SETS
+
+    pbp_cache_module.get_text = recorded_page
+    pbp_cache_module.fetch_text = arecorded_page
+    FEATURE_SETS["team_shooting"]["cluster"] = cluster_team_shooting
+    FEATURE_SETS["player_adv_stats"]["cluster"] = cluster_players
+
+def reset_caches(work_dir: str) -> None:
+    '''
+    Start from cold caches: empty clustering store, no cached play by play.
+    '''
+    import utils.clustering_store as clustering_module
+    from utils.pbp_cache import pbp_cache
+    from utils.pbp_parser import events_cache
+
+    clustering_module.clustering_store = clustering_module.ClusteringStore(
+        store_dir=os.path.join(work_dir, "cache", "clustering", uuid.uuid4().hex[:8]),
+        )
+    for date, home_team in PBP_FIXTURES:
+        pbp_cache.invalidate(date, home_team)
+        events_cache.invalidate(date, home_team)
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    '''
+    The first (cold) call and the percentiles of the following (warm) calls, in milliseconds.
+    '''
+    warm = latencies[1:] or latencies
+    return {
+        "cold_ms": round(latencies[0], 3),
+        "p50_ms": round(float(np.percentile(warm, 50)), 3),
+        "p95_ms": round(float(np.percentile(warm, 95)), 3),
+        "mean_ms": round(float(np.mean(warm)), 3),
+    }
+
+def timed_calls(call: Callable[[], Any], repeat: int) -> List[float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def bench_tools(work_dir: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    '''
+    Every data agent tool called through agno, sync variant and async variant, each from cold caches.
+    '''
+    from agno.tools.function import FunctionCall
+    from agents.data_agent import get_data_toolkit
+
+    (date, home_team), = PBP_FIXTURES
+    arguments = {
+        "get_team_shooting_clustering": {"season": SEASON, "n_cluster": 5},
+        "get_player_adv_stats_clustering": {"season": SEASON, "n_cluster": 5, "columns": ["BPM", "WS"]},
+        "get_play_by_play_game_report": {"date": date, "home_team": home_team},
+    }
+    toolkit = get_data_toolkit()
+    results = {}
+    for variant, functions in (("sync", toolkit.get_functions()), ("async", toolkit.get_async_functions())):
+        for name, kwargs in arguments.items():
+            function = functions[name]
+            function.process_entrypoint()
+
+            def call():
+                function_call = FunctionCall(function=function, arguments=dict(kwargs))
+                result = function_call.execute() if variant == "sync" else asyncio.run(function_call.aexecute())
+                if result.status != "success" or str(function_call.result).startswith("Error"):
+                    raise RuntimeError(f"{name} failed: {result.error or function_call.result}")
+
+            reset_caches(work_dir)
+            results[f"{name}[{variant}]"] = summarize(timed_calls(call, repeat))
+
+    # Next page of the truncated player clustering
+    from utils.tool_output import format_tool_output, get_next_page
+    from utils.clustering_store import get_season_clustering
+
+    df = get_season_clustering("player_adv_stats", SEASON, 5)
+    get_next_page.process_entrypoint()
+
+    def next_page():
+        cursor = format_tool_output(df).rsplit('cursor "', 1)[1].split('"', 1)[0]
+        FunctionCall(function=get_next_page, arguments={"cursor": cursor}).execute()
+
+    results["get_next_page[sync]"] = summarize(timed_calls(next_page, repeat))
+    return results
+
+def bench_team(repeat: int) -> Dict[str, Any]:
+    '''
+    Latency of the data analysis team against the data agent alone, on the same question and stub model.
+    '''
+    from main import registry
+
+    question = "Show me the 2025 team shooting clusters"
+    agent = registry.get("data_agent")
+    team = registry.get("analysis_team")
+
+    async def run(component: Any) -> None:
+        output = await component.arun(question, session_id=str(uuid.uuid4()))
+        if not output.content:
+            raise RuntimeError(f"{component.name} returned no content")
+
+    agent_latencies = timed_calls(lambda: asyncio.run(run(agent)), repeat)
+    team_latencies = timed_calls(lambda: asyncio.run(run(team)), repeat)
+    agent_stats, team_stats = summarize(agent_latencies), summarize(team_latencies)
+    return {
+        "data_agent": agent_stats,
+        "team": team_stats,
+        "overhead_p50_ms": round(team_stats["p50_ms"] - agent_stats["p50_ms"], 3),
+        "overhead_mean_ms": round(team_stats["mean_ms"] - agent_stats["mean_ms"], 3),
+    }
+
+def bench_workflow(work_dir: str, repeat: int) -> Dict[str, Any]:
+    '''
+    The game report workflow end to end, from cold caches (fetch and parse of the page) and from the cache,
+    and the time to the progress event and to the first token of the report when it is streamed.
+    '''
+    from workflow.generate_game_report import game_report_workflow, get_input_message
+
+    (date, home_team), = PBP_FIXTURES
+    workflow = game_report_workflow()
+
+    def run() -> None:
+        output = asyncio.run(workflow.arun(
+            input=get_input_message(date, home_team, "ORL"),
+            additional_data={"date": date, "home_team": home_team},
+            ))
+        if not output.content:
+            raise RuntimeError("The workflow returned no report")
+
+    async def stream() -> Dict[str, float]:
+        # Time to the progress event of the search phase and to the first token of the report
+        from agno.run.agent import RunContentEvent
+        from workflow.generate_game_report import SearchPhaseEvent
+
+        start = time.perf_counter()
+        latencies: Dict[str, float] = {}
+        async for event in workflow.arun(
+                input=get_input_message(date, home_team, "ORL"),
+                additional_data={"date": date, "home_team": home_team},
+                stream=True,
+                stream_events=True,
+                ):
+            if isinstance(event, SearchPhaseEvent):
+                latencies.setdefault("progress_ms", (time.perf_counter() - start) * 1000)
+            elif isinstance(event, RunContentEvent) and event.content:
+                latencies.setdefault("first_token_ms", (time.perf_counter() - start) * 1000)
+        latencies["report_ms"] = (time.perf_counter() - start) * 1000
+        return latencies
+
+    cold, streamed = [], []
+    for _ in range(max(2, repeat // 5)):
+        reset_caches(work_dir)
+        cold += timed_calls(run, 1)
+        reset_caches(work_dir)
+        streamed.append(asyncio.run(stream()))
+    return {
+        "cold": summarize(cold),
+        "warm": summarize(timed_calls(run, repeat)),
+        "stream_cold": {
+            key: round(float(np.median([latencies[key] for latencies in streamed])), 3)
+            for key in ("progress_ms", "first_token_ms", "report_ms")
+        },
+    }
+
+def bench_startup(work_dir: str, env: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    '''
+    Import of `main:app` and build of the AgentOS app (first request), each in a fresh interpreter.
+    '''
+    script = (
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        "imported = time.perf_counter()\n"
+        "main.build_app()\n"
+        "built = time.perf_counter()\n"
+        "print(json.dumps({'import_ms': (imported - start) * 1000, 'build_app_ms': (built - imported) * 1000}))\n"
+    )
+    python_path = os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")]))
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=work_dir,
+            env={**os.environ, **env, "PYTHONPATH": python_path},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            # Reported instead of aborting the other measurements, e.g. an optional dependency of AgentOS missing
+            return {"error": result.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return {
+        key: round(float(np.median([run[key] for run in runs])), 1)
+        for key in ("import_ms", "build_app_ms")
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+    except Exception:
+        return None
+
+@app.command()
+def run(
+    repeat: int = typer.Option(
+        20,
+        help="Number of calls per measurement, the first one runs on cold caches."
+        ),
+    stub_latency_ms: int = typer.Option(
+        0,
+        help="Latency of every call of the stub model, 0 measures the overhead of the app alone."
+        ),
+    startup_repeat: int = typer.Option(
+        3,
+        help="Number of fresh interpreters started to measure the startup."
+        ),
+    output: Optional[str] = typer.Option(
+        None,
+        help="File where the JSON results are written, e.g. to compare them with `compare`."
+        ),
+):
+    '''
+    Run the offline benchmarks and print the results as JSON.
+    '''
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = offline_env(work_dir, stub_latency_ms)
+        os.environ.update(env)
+        os.chdir(work_dir)
+
+        seasons = prepare_seasons(env["SEASON_STORE_DIR"])
+        use_fixtures()
+
+        from utils.metrics import PHASE_LATENCY, metrics
+        metrics.clear()
+
+        results: Dict[str, Any] = {
+            "commit": git_commit(),
+            "repeat": repeat,
+            "stub_latency_ms": stub_latency_ms,
+            "fixtures": {"pbp": [f"{date}_{home_team}" for date, home_team in PBP_FIXTURES], "seasons": seasons},
+            "startup": bench_startup(work_dir, env, startup_repeat),
+            "tools": bench_tools(work_dir, repeat),
+            "team": bench_team(repeat),
+            "workflow": bench_workflow(work_dir, repeat),
+        }
+
+        # Time spent in the phases of the data tools over all the runs above
+        results["phases"] = {}
+        for phase in ("http_fetch", "html_parse", "toon_serialize", "kmeans_fit", "knowledge_search"):
+            observed = PHASE_LATENCY.get(phase=phase)
+            if observed["count"]:
+                results["phases"][phase] = {
+                    "count": observed["count"],
+                    "mean_ms": round(observed["sum"] / observed["count"] * 1000, 3),
+                }
+
+        from utils.async_io import close as close_async_executors
+        asyncio.run(close_async_executors())
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if output:
+        Path(output).write_text(report + "\n", encoding="utf-8")
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    '''
+    Flatten the latencies of a result file to {"tools.get_next_page[sync].p50_ms": value}.
+    '''
+    values = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{name}."))
+        elif name.endswith("_ms") and isinstance(value, (int, float)) and key != "stub_latency_ms":
+            values[name] = float(value)
+    return values
+
+@app.command()
+def compare(
+    base: str = typer.Argument(..., help="Results of the base commit."),
+    new: str = typer.Argument(..., help="Results of the new commit."),
+    threshold: float = typer.Option(
+        0.2,
+        help="Relative slowdown reported as a regression."
+        ),
+    min_delta_ms: float = typer.Option(
+        1.0,
+        help="Absolute slowdown below which changes are ignored, the noise of sub-millisecond timings."
+        ),
+):
+    '''
+    Compare two result files and exit with an error if a latency regressed beyond the threshold.
+    '''
+    base_results = json.loads(Path(base).read_text(encoding="utf-8"))
+    new_results = json.loads(Path(new).read_text(encoding="utf-8"))
+    base_values, new_values = flatten(base_results), flatten(new_results)
+
+    changes = {}
+    for name in sorted(base_values.keys() & new_values.keys()):
+        before, after = base_values[name], new_values[name]
+        if name.endswith("overhead_p50_ms") or name.endswith("overhead_mean_ms"):
+            continue
+        change = (after - before) / before if before > 0 else 0.0
+        changes[name] = {"base_ms": before, "new_ms": after, "change": round(change, 3)}
+
+    regressions = {
+        name: change for name, change in changes.items()
+        if change["change"] > threshold and change["new_ms"] - change["base_ms"] > min_delta_ms
+    }
+    print(json.dumps({
+        "base_commit": base_results.get("commit"),
+        "new_commit": new_results.get("commit"),
+        "threshold": threshold,
+        "regressions": regressions,
+        "changes": changes,
+    }, indent=2))
+
+    if regressions:
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    app()
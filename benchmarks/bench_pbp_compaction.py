@@ -0,0 +1,80 @@
+'''
+Benchmark of the play by play compaction step of the game report workflow.
+It reports the prompt size (tokens) of the raw play by play and of the compact summary.
+
+Usage:
+    uv run benchmarks/bench_pbp_compaction.py
+    uv run benchmarks/bench_pbp_compaction.py --date 20251116 --home-team HOU
+'''
+import os
+import sys
+import json
+import time
+from typing import Optional
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.pbp_cache import get_play_by_play, parse_play_by_play_html
+from utils.pbp_summary import summarize_play_by_play, render_summary
+from utils.table_format import to_toon
+
+import typer
+app = typer.Typer()
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "pbp_20251116_HOU.html")
+
+def count_tokens(text: str) -> int:
+    '''
+    Count the tokens of a text with tiktoken, or estimate them (4 characters per token) if it is not available.
+    '''
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except Exception:
+        return len(text) // 4
+
+@app.command()
+def main(
+    date: Optional[str] = typer.Option(
+        None,
+        help="Date of the game. The recorded fixture is used if omitted."
+        ),
+    home_team: str = typer.Option(
+        "HOU",
+        help="Abbreviation of the home team."
+        ),
+    raw_row_budget: int = typer.Option(
+        0,
+        help="Raw rows added to the summary."
+        ),
+    repeat: int = typer.Option(
+        20,
+        help="Number of timed compaction runs."
+        ),
+):
+    '''
+    Compare the prompt size of the raw play by play with the compact summary.
+    '''
+    df = get_play_by_play(date, home_team) if date else parse_play_by_play_html(FIXTURE)
+
+    raw = to_toon(df)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        summary = render_summary(summarize_play_by_play(df, raw_row_budget=raw_row_budget))
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+
+    raw_tokens = count_tokens(raw)
+    summary_tokens = count_tokens(summary)
+
+    print(json.dumps({
+        "rows": len(df),
+        "raw_tokens": raw_tokens,
+        "summary_tokens": summary_tokens,
+        "reduction": round(1 - summary_tokens / raw_tokens, 3),
+        "compaction_ms": round(elapsed_ms, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    app()
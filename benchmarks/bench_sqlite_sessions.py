@@ -0,0 +1,115 @@
+'''
+Benchmark of the agent database under concurrent sessions.
+N parallel sessions write their run history and user memories, either through one SqliteDb per agent
+with default settings or through the shared WAL database of `sqlite_db`.
+
+Usage:
+    uv run benchmarks/bench_sqlite_sessions.py
+    uv run benchmarks/bench_sqlite_sessions.py --sessions 32 --runs 20
+'''
+import os
+import sys
+import json
+import time
+import uuid
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from agno.db.sqlite import SqliteDb
+from agno.db.schemas.memory import UserMemory
+from agno.session import AgentSession
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.config import sqlite_db
+
+import typer
+app = typer.Typer()
+
+AGENTS = ["data_agent", "analyst_agent", "visual_agent", "game_report_agent", "data_analysis_team"]
+
+def run_session(get_db: Callable[[str], SqliteDb], session_index: int, runs: int) -> List[float]:
+    '''
+    Simulate one chat session: every run updates the session history and adds a user memory.
+    Returns the latency of every run in milliseconds.
+    '''
+    agent_id = AGENTS[session_index % len(AGENTS)]
+    db = get_db(agent_id)
+    session_id = str(uuid.uuid4())
+    user_id = f"user-{session_index}"
+    history = []
+    latencies = []
+
+    for run in range(runs):
+        start = time.perf_counter()
+        history.append({"role": "user", "content": f"Question {run} about season 2025 " * 20})
+        db.upsert_session(AgentSession(
+            session_id=session_id,
+            agent_id=agent_id,
+            user_id=user_id,
+            session_data={"history": history},
+            created_at=int(time.time()),
+            ))
+        db.upsert_user_memory(UserMemory(
+            memory=f"The user is interested in topic {run}",
+            user_id=user_id,
+            agent_id=agent_id,
+            ))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+def run_benchmark(get_db: Callable[[str], SqliteDb], sessions: int, runs: int) -> dict:
+    '''
+    Run the sessions in parallel threads and collect the latencies and errors.
+    '''
+    latencies: List[float] = []
+    errors = 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, get_db, index, runs) for index in range(sessions)]
+        for future in futures:
+            try:
+                latencies.extend(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "runs_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2], 2) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None,
+        "failed_sessions": errors,
+    }
+
+@app.command()
+def main(
+    sessions: int = typer.Option(
+        16,
+        help="Number of parallel sessions."
+        ),
+    runs: int = typer.Option(
+        10,
+        help="Number of runs per session."
+        ),
+):
+    '''
+    Compare per-agent SqliteDb instances with the shared WAL database.
+    '''
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        per_agent_path = os.path.join(tmp_dir, "per_agent.db")
+        per_agent = {agent_id: SqliteDb(db_file=per_agent_path) for agent_id in AGENTS}
+        results["per_agent"] = run_benchmark(lambda agent_id: per_agent[agent_id], sessions, runs)
+
+        shared_path = os.path.join(tmp_dir, "shared.db")
+        results["shared_wal"] = run_benchmark(lambda agent_id: sqlite_db(shared_path), sessions, runs)
+
+    print(json.dumps({"sessions": sessions, "runs": runs, **results}, indent=2))
+
+if __name__ == "__main__":
+    app()
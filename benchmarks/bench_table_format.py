@@ -0,0 +1,142 @@
+'''
+Micro-benchmark of the table serializer (src/utils/table_format.py) against `pandas_toon`,
+on a play by play table (the recorded fixture, repeated up to --pbp-rows rows) and a player table like the advanced stats.
+It reports the serialization time of every format, the time to the first chunk of `iter_table`,
+the time to render a page of the table within the token budget and the size (tokens) of every format.
+
+Usage:
+    uv run benchmarks/bench_table_format.py
+    uv run benchmarks/bench_table_format.py --pbp-rows 2000 --player-rows 600 --repeat 200
+'''
+import os
+import sys
+import json
+import time
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+import pandas_toon  # Registers DataFrame.to_toon
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.pbp_cache import parse_play_by_play_html
+from utils.table_format import FORMATS, iter_table, to_table
+from utils.tool_output import estimate_tokens, format_tool_output
+from utils.config import PBP_RAW_MAX_TOKENS
+
+import typer
+app = typer.Typer()
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures", "pbp_20251116_HOU.html")
+
+def count_tokens(text: str) -> int:
+    '''
+    Count the tokens of a text with tiktoken, or estimate them (4 characters per token) if it is not available.
+    '''
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except Exception:
+        return len(text) // 4
+
+def pbp_table(rows: int) -> pd.DataFrame:
+    df = parse_play_by_play_html(FIXTURE)
+    return pd.concat([df] * (rows // len(df) + 1), ignore_index=True).head(rows)
+
+def player_table(rows: int) -> pd.DataFrame:
+    '''
+    A table like the advanced stats of a season: names, positions, teams and float stats.
+    '''
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Player": [f"Player {index}" for index in range(rows)],
+        "Pos": rng.choice(["PG", "SG", "SF", "PF", "C"], rows),
+        "Team": rng.choice(["HOU", "ORL", "LAL", "BOS", "DEN", "OKC"], rows),
+        "Age": rng.integers(19, 40, rows),
+        "G": rng.integers(1, 82, rows),
+    })
+    # Rounded like the season tables: rates with three decimals, the other stats with one
+    for column in ["TS%", "3PAr", "FTr", "WS/48"]:
+        df[column] = rng.normal(0.5, 0.15, rows).round(3)
+    for column in ["PER", "ORB%", "DRB%", "TRB%", "AST%", "STL%", "BLK%", "TOV%", "USG%",
+                   "OWS", "DWS", "WS", "OBPM", "DBPM", "BPM", "VORP"]:
+        df[column] = rng.normal(10, 6, rows).round(1)
+    return df
+
+def legacy_page(df: pd.DataFrame, max_rows: int, max_tokens: int) -> str:
+    '''
+    The budgeted page as rendered before, with `pandas_toon` and the table serialized again until it fits.
+    '''
+    rows = max(1, min(max_rows, len(df)))
+    page = df.iloc[:rows].to_toon()
+    while rows > 1 and estimate_tokens(page) > max_tokens:
+        rows = max(1, min(rows - 1, rows * max_tokens // estimate_tokens(page)))
+        page = df.iloc[:rows].to_toon()
+    return page
+
+def median_ms(function: Callable[[], object], repeat: int) -> float:
+    function()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return round(float(np.median(latencies)), 3)
+
+def bench_table(df: pd.DataFrame, repeat: int) -> Dict[str, object]:
+    results: Dict[str, object] = {"rows": len(df), "columns": df.shape[1]}
+    baseline = median_ms(lambda: df.to_toon(), repeat)
+    results["pandas_toon_ms"] = baseline
+
+    for format in FORMATS:
+        elapsed = median_ms(lambda: to_table(df, format), repeat)
+        results[f"{format}_ms"] = elapsed
+        results[f"{format}_speedup"] = round(baseline / elapsed, 1)
+
+    def first_chunk():
+        # The header and the first rows, what a consumer of the stream gets first
+        chunks = iter_table(df, chunk_rows=64)
+        return next(chunks) + next(chunks)
+
+    results["first_chunk_ms"] = median_ms(first_chunk, repeat)
+
+    # Page of the whole table within the token budget, like the raw play by play of the workflow
+    results["budget_page"] = {
+        "max_tokens": PBP_RAW_MAX_TOKENS,
+        "legacy_ms": median_ms(lambda: legacy_page(df, len(df), PBP_RAW_MAX_TOKENS), repeat),
+        "format_tool_output_ms": median_ms(
+            lambda: format_tool_output(df, max_rows=len(df), max_tokens=PBP_RAW_MAX_TOKENS, paginate=False), repeat,
+            ),
+    }
+
+    results["tokens"] = {"pandas_toon": count_tokens(df.to_toon())}
+    results["tokens"].update({format: count_tokens(to_table(df, format)) for format in FORMATS})
+    return results
+
+@app.command()
+def main(
+    pbp_rows: int = typer.Option(
+        500,
+        help="Rows of the play by play table."
+        ),
+    player_rows: int = typer.Option(
+        600,
+        help="Rows of the player table."
+        ),
+    repeat: int = typer.Option(
+        100,
+        help="Number of timed serializations per format, the median is reported."
+        ),
+):
+    '''
+    Compare the serialization time and size of the formats with `pandas_toon`.
+    '''
+    print(json.dumps({
+        "pbp": bench_table(pbp_table(pbp_rows), repeat),
+        "players": bench_table(player_table(player_rows), repeat),
+    }, indent=2))
+
+if __name__ == "__main__":
+    app()
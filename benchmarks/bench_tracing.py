@@ -0,0 +1,212 @@
+'''
+Benchmark of the per-run overhead of the tracing, on runs of an agent with the stub LLM provider.
+The spans are exported to a stub exporter with the latency of a collector round trip, with:
+- off: no tracing,
+- inline: every span exported when it ends (SimpleSpanProcessor),
+- batched: every run exported in the background (src/utils/tracing.py, tail sample rate 1),
+- tail_sampled: the runs sampled at TRACING_TAIL_SAMPLE_RATE, errors and slow runs kept,
+- head_sampled: only the head sampled runs recorded.
+The spans come from the agno instrumentation (OpenInference). If it is not available for the installed agno
+version, every run is wrapped in the spans the instrumentation creates (run, model calls and tool call).
+
+Usage:
+    uv run benchmarks/bench_tracing.py
+    uv run benchmarks/bench_tracing.py --runs 500 --export-latency-ms 20
+'''
+import os
+import sys
+import json
+import time
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import typer
+app = typer.Typer()
+
+class LatencyExporter(SpanExporter):
+    '''
+    Stub exporter waiting for the latency of a collector round trip on every export call.
+    '''
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.spans = 0
+        self.calls = 0
+
+    def export(self, spans: Sequence[Any]) -> SpanExportResult:
+        time.sleep(self.latency_ms / 1000)
+        self.spans += len(spans)
+        self.calls += 1
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+def percentile(latencies: List[float], q: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+class Instrumentation:
+    '''
+    Spans of the agent runs: the agno instrumentation, or the same spans created around every run.
+    '''
+
+    def __init__(self):
+        from openinference.instrumentation.agno import AgnoInstrumentor
+
+        self.instrumentor = AgnoInstrumentor()
+        self.tracer = None
+        self.source = "openinference"
+        self.probed = False
+
+    def start(self, provider: TracerProvider, agent: Any) -> None:
+        self.tracer = provider.get_tracer("bench")
+        if self.source != "openinference":
+            return
+        try:
+            self.instrumentor.instrument(tracer_provider=provider)
+        except Exception as e:
+            self.source = f"manual ({type(e).__name__}: {str(e)[:80]})"
+            return
+
+        if self.probed:
+            return
+
+        # The instrumentor skips unsupported agno versions without an error
+        self.probed = True
+        exporter = LatencyExporter(0)
+        probe = TracerProvider()
+        probe.add_span_processor(SimpleSpanProcessor(exporter))
+        self.instrumentor.uninstrument()
+        self.instrumentor.instrument(tracer_provider=probe)
+        asyncio.run(agent.arun("probe"))
+        self.instrumentor.uninstrument()
+        if exporter.spans == 0:
+            self.source = "manual (the instrumentation does not support the installed agno version)"
+            return
+        self.instrumentor.instrument(tracer_provider=provider)
+
+    def stop(self) -> None:
+        if self.source == "openinference":
+            self.instrumentor.uninstrument()
+        self.tracer = None
+
+    def run_span(self, name: str, question: str) -> Any:
+        if self.tracer is None or self.source == "openinference":
+            return nullcontext()
+        return self.tracer.start_as_current_span(name, attributes={"input.value": question, "openinference.span.kind": "AGENT"})
+
+    def child_spans(self, answer: str) -> None:
+        if self.tracer is None or self.source == "openinference":
+            return
+        for name, kind in (("OpenAIResponses.ainvoke", "LLM"), ("get_team_shooting_clustering", "TOOL"), ("OpenAIResponses.ainvoke", "LLM")):
+            with self.tracer.start_as_current_span(name, attributes={"openinference.span.kind": kind, "output.value": answer}):
+                pass
+
+async def run_agent(agent: Any, instrumentation: Instrumentation, runs: int) -> List[float]:
+    latencies = []
+    for index in range(runs):
+        question = f"Show me the {2000 + index % 25} team shooting clusters"
+        start = time.perf_counter()
+        with instrumentation.run_span("Basketball Data Agent.arun", question):
+            output = await agent.arun(question)
+            instrumentation.child_spans(str(output.content))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+@app.command()
+def main(
+    runs: int = typer.Option(
+        300,
+        help="Number of agent runs per scenario."
+        ),
+    export_latency_ms: float = typer.Option(
+        20,
+        help="Latency of an export call of the stub exporter, in milliseconds."
+        ),
+    tail_sample_rate: float = typer.Option(
+        0.1,
+        help="Tail sample rate of the tail_sampled scenario."
+        ),
+    head_sample_rate: float = typer.Option(
+        0.1,
+        help="Head sample rate of the head_sampled scenario."
+        ),
+    rounds: int = typer.Option(
+        10,
+        help="Number of turns of the scenarios, the runs of a scenario are split between them."
+        ),
+):
+    '''
+    Compare the per-run latency of the agent runs with tracing off, inline and sampled in the background.
+    '''
+    from agno.agent import Agent
+    from utils.stub_model import StubModel
+    from utils.tracing import SampledBatchSpanProcessor, SamplingPolicy, create_tracer_provider
+
+    agent = Agent(name="Basketball Data Agent", model=StubModel(id="stub", latency_ms=0), markdown=True, telemetry=False)
+    instrumentation = Instrumentation()
+
+    # Processor and exporter of every scenario, None for no tracing
+    scenarios: Dict[str, Any] = {"off": (None, None, 1.0)}
+    exporter = LatencyExporter(export_latency_ms)
+    scenarios["inline"] = (SimpleSpanProcessor(exporter), exporter, 1.0)
+    for name, policy, head in (
+            ("batched", SamplingPolicy(sample_rate=1.0), 1.0),
+            ("tail_sampled", SamplingPolicy(sample_rate=tail_sample_rate), 1.0),
+            ("head_sampled", SamplingPolicy(sample_rate=1.0), head_sample_rate),
+            ):
+        exporter = LatencyExporter(export_latency_ms)
+        scenarios[name] = (SampledBatchSpanProcessor(exporter, policy=policy), exporter, head)
+    providers = {
+        name: create_tracer_provider(processor, head_sample_rate=head)
+        for name, (processor, _, head) in scenarios.items() if processor is not None
+        }
+
+    # Warm up the agent and the imports
+    asyncio.run(run_agent(agent, instrumentation, 10))
+
+    # The scenarios take turns, so that the drift of the machine is shared by all of them
+    latencies: Dict[str, List[float]] = {name: [] for name in scenarios}
+    for _ in range(rounds):
+        for name in scenarios:
+            if name in providers:
+                instrumentation.start(providers[name], agent)
+            latencies[name] += asyncio.run(run_agent(agent, instrumentation, runs // rounds))
+            instrumentation.stop()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, (processor, exporter, _) in scenarios.items():
+        result: Dict[str, Any] = {
+            "latency_ms": {q: round(percentile(latencies[name], int(q[1:])), 3) for q in ("p50", "p95", "p99")},
+            "mean_ms": round(sum(latencies[name]) / len(latencies[name]), 3),
+        }
+        if processor is not None:
+            processor.shutdown()
+            result["exported_spans"] = exporter.spans
+            result["export_calls"] = exporter.calls
+        if isinstance(processor, SampledBatchSpanProcessor):
+            stats = processor.stats()
+            result["dropped_spans"] = stats["dropped_queue_full"] + stats["dropped_evicted"]
+        results[name] = result
+
+    for name, result in results.items():
+        result["overhead_ms_per_run"] = round(result["mean_ms"] - results["off"]["mean_ms"], 3)
+        result["overhead_p50_ms"] = round(result["latency_ms"]["p50"] - results["off"]["latency_ms"]["p50"], 3)
+
+    print(json.dumps({
+        "runs": runs // rounds * rounds,
+        "export_latency_ms": export_latency_ms,
+        "span_source": instrumentation.source,
+        **results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,166 @@
+'''
+Benchmark of the vector backends of the knowledge base: the in-process LocalVectorDb (KB_VECTOR_BACKEND=local)
+against the Qdrant server at Qdrant_URL. Both are filled with the same synthetic corpus and queried through the
+VectorDb interface used by the knowledge search; the query latency (p50/p95) and the recall@k against the exact
+nearest neighbours are reported. The embeddings are precomputed, so no embedding API is called.
+If no Qdrant server is reachable, the in-memory Qdrant client is measured instead (marked in the report).
+
+Usage:
+    uv run benchmarks/bench_vector_backends.py
+    uv run benchmarks/bench_vector_backends.py --docs 20000 --dimensions 1536 --queries 500
+'''
+import os
+import sys
+import json
+import time
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+from agno.knowledge.document import Document
+from agno.knowledge.embedder import Embedder
+from agno.vectordb.base import VectorDb
+from agno.vectordb.qdrant import Qdrant
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.config import Qdrant_URL
+from utils.local_vectordb import LocalVectorDb
+
+import typer
+app = typer.Typer()
+
+COLLECTION = "bench_vector_backends"
+
+@dataclass
+class LookupEmbedder(Embedder):
+    '''
+    Embedder serving the precomputed embeddings of the corpus and the queries.
+    '''
+    vectors: Dict[str, List[float]] = field(default_factory=dict)
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.vectors[text]
+
+    def get_embedding_and_usage(self, text: str):
+        return self.vectors[text], None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self.vectors[text]
+
+    async def async_get_embedding_and_usage(self, text: str):
+        return self.vectors[text], None
+
+def make_corpus(docs: int, dimensions: int, queries: int, seed: int):
+    '''
+    Clustered random unit vectors (like the chunks of a few glossary pages), and queries near random documents.
+    '''
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, docs // 50), dimensions))
+    corpus = centers[rng.integers(len(centers), size=docs)] + rng.normal(size=(docs, dimensions))
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    questions = corpus[rng.integers(docs, size=queries)] + 0.5 * rng.normal(size=(queries, dimensions)) / np.sqrt(dimensions)
+    questions /= np.linalg.norm(questions, axis=1, keepdims=True)
+    return corpus.astype(np.float32), questions.astype(np.float32)
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+def measure(vector_db: VectorDb, documents: List[Document], queries: List[str], truth: List[set], k: int) -> Dict:
+    '''
+    Insert the documents, then run the queries and compare the results with the exact nearest neighbours.
+    '''
+    vector_db.create()
+    start = time.perf_counter()
+    for i in range(0, len(documents), 500):
+        vector_db.insert("bench", documents[i:i + 500])
+    insert_s = time.perf_counter() - start
+
+    # Warm up (connections, memory mapping)
+    for query in queries[:5]:
+        vector_db.search(query, limit=k)
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results = vector_db.search(query, limit=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({document.content for document in results} & expected)
+
+    return {
+        "insert_s": round(insert_s, 2),
+        "latency_ms": {"p50": round(percentile(latencies, 50), 3), "p95": round(percentile(latencies, 95), 3)},
+        f"recall_at_{k}": round(hits / (k * len(queries)), 4),
+    }
+
+def qdrant_server_available(url: str) -> bool:
+    from qdrant_client import QdrantClient
+    try:
+        QdrantClient(url=url, timeout=2).get_collections()
+        return True
+    except Exception:
+        return False
+
+@app.command()
+def main(
+    docs: int = typer.Option(
+        5000,
+        help="Number of documents (chunks) of the corpus."
+        ),
+    dimensions: int = typer.Option(
+        1536,
+        help="Dimensions of the embeddings (1536 for text-embedding-3-small)."
+        ),
+    queries: int = typer.Option(
+        200,
+        help="Number of queries."
+        ),
+    k: int = typer.Option(
+        5,
+        help="Number of results per query, as in the knowledge search."
+        ),
+    seed: int = typer.Option(
+        0,
+        help="Seed of the synthetic corpus."
+        ),
+):
+    '''
+    Compare the query latency and recall of the local vector DB and Qdrant.
+    '''
+    corpus, questions = make_corpus(docs, dimensions, queries, seed)
+    texts = [f"doc-{i}" for i in range(docs)]
+    query_texts = [f"query-{i}" for i in range(queries)]
+    embedder = LookupEmbedder(
+        vectors={**dict(zip(texts, corpus.tolist())), **dict(zip(query_texts, questions.tolist()))},
+        dimensions=dimensions,
+    )
+
+    # Exact nearest neighbours
+    top = np.argsort(-(questions @ corpus.T), axis=1)[:, :k]
+    truth = [{texts[i] for i in row} for row in top]
+
+    def documents() -> List[Document]:
+        return [Document(id=text, name=COLLECTION, content=text) for text in texts]
+
+    report = {"docs": docs, "dimensions": dimensions, "queries": queries, "k": k, "backends": {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        local = LocalVectorDb(collection=COLLECTION, embedder=embedder, path=directory)
+        report["backends"]["local"] = measure(local, documents(), query_texts, truth, k)
+
+    if qdrant_server_available(Qdrant_URL):
+        name, qdrant = "qdrant_server", Qdrant(collection=COLLECTION, url=Qdrant_URL, embedder=embedder)
+    else:
+        name, qdrant = "qdrant_in_memory", Qdrant(collection=COLLECTION, location=":memory:", embedder=embedder)
+        report["note"] = f"No Qdrant server at {Qdrant_URL}, measured the in-memory Qdrant client instead"
+    try:
+        report["backends"][name] = measure(qdrant, documents(), query_texts, truth, k)
+    finally:
+        qdrant.drop()
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    app()
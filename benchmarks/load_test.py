@@ -0,0 +1,199 @@
+'''
+Load test of the AgentOS server against the stub LLM provider (llm=stub), so that the throughput of the
+server itself is measured. It starts `src/serve.py` with the given number of workers, fires agent runs with
+a fixed concurrency and reports the requests per second and the p50/p95/p99 latency, then stops the server
+with SIGTERM to check that it drains gracefully. Pass --url to target a server that is already running.
+
+Usage:
+    uv run benchmarks/load_test.py --workers 4 --requests 400 --concurrency 32
+    uv run benchmarks/load_test.py --url http://localhost:7777 --requests 100
+'''
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import asyncio
+import subprocess
+from typing import Dict, List, Optional
+
+import httpx
+import typer
+app = typer.Typer()
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+
+def percentile(latencies: List[float], q: float) -> float:
+    '''
+    Return the q-th percentile (nearest rank) of the latencies.
+    '''
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict:
+    '''
+    Summarize the latencies (seconds) of the successful requests of a run.
+    '''
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "duration_s": round(duration, 2),
+        "requests_per_sec": round(len(latencies) / duration, 1) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies, default=0) * 1000, 1),
+        },
+    }
+
+def start_server(app_path: str, workers: int, port: int, latency_ms: int) -> subprocess.Popen:
+    '''
+    Start the multi-worker server with the stub LLM provider.
+    '''
+    env = {
+        **os.environ,
+        "llm": "stub",
+        "llm_reasoning": "stub",
+        "STUB_LLM_LATENCY_MS": str(latency_ms),
+        "MLFLOW_TRACING": "false",
+        "KB_INGEST_ON_STARTUP": "false",
+    }
+    return subprocess.Popen(
+        [sys.executable, "serve.py", "--app", app_path, "--workers", str(workers), "--port", str(port)],
+        cwd=SRC_DIR,
+        env=env,
+    )
+
+async def wait_until_ready(url: str, timeout: float) -> None:
+    '''
+    Poll the health endpoint until the server answers.
+    '''
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+
+    raise TimeoutError(f"Server at {url} was not ready after {timeout} seconds")
+
+async def run_load(url: str, path: str, message: str, requests: int, concurrency: int) -> Dict:
+    '''
+    Send the agent runs with a fixed number of requests in flight and summarize the latencies.
+    '''
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    path,
+                    data={"message": message, "stream": "false", "session_id": f"load-test-{uuid.uuid4().hex}"},
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        duration = time.perf_counter() - start
+
+    return summarize(latencies, errors, duration)
+
+@app.command()
+def main(
+    url: Optional[str] = typer.Option(
+        None,
+        help="URL of a running server. A server with the stub LLM provider is started if omitted."
+        ),
+    app_path: str = typer.Option(
+        "main:app",
+        "--app",
+        help="ASGI app of the started server, as module:attribute relative to src."
+        ),
+    workers: int = typer.Option(
+        4,
+        help="Number of workers of the started server."
+        ),
+    port: int = typer.Option(
+        7790,
+        help="Port of the started server."
+        ),
+    path: str = typer.Option(
+        "/agents/basketball-game-report-agent/runs",
+        help="Endpoint of the agent runs."
+        ),
+    message: str = typer.Option(
+        "Summarize the last game of the Boston Celtics.",
+        help="Message sent to the agent."
+        ),
+    requests: int = typer.Option(
+        200,
+        help="Number of requests."
+        ),
+    concurrency: int = typer.Option(
+        16,
+        help="Number of requests in flight."
+        ),
+    latency_ms: int = typer.Option(
+        200,
+        help="Latency of the stub LLM provider of the started server, in milliseconds."
+        ),
+    startup_timeout: float = typer.Option(
+        120,
+        help="Seconds to wait for the started server to be ready."
+        ),
+):
+    '''
+    Measure the throughput and latency of the agent runs of the server.
+    '''
+    server = None
+    if url is None:
+        url = f"http://localhost:{port}"
+        server = start_server(app_path, workers, port, latency_ms)
+
+    try:
+        asyncio.run(wait_until_ready(url, startup_timeout))
+        # Warm up every worker before the measurement
+        asyncio.run(run_load(url, path, message, concurrency, concurrency))
+        report = {
+            "url": url,
+            "path": path,
+            "workers": workers if server else None,
+            "concurrency": concurrency,
+            **asyncio.run(run_load(url, path, message, requests, concurrency)),
+        }
+    finally:
+        if server is not None:
+            start = time.perf_counter()
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+            shutdown_s = round(time.perf_counter() - start, 2)
+
+    if server is not None:
+        report["shutdown_s"] = shutdown_s
+    print(json.dumps(report, indent=2))
+
+    if report["errors"]:
+        raise typer.Exit(code=1)
+
+if __name__ == "__main__":
+    app()
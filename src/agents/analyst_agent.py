@@ -9,8 +9,11 @@ from agno.knowledge.knowledge import Knowledge
 from agno.agent import Agent
 from agno.tools.reasoning import ReasoningTools
 
+from utils.sql_tools import StatsSqlTools
+from utils.glossary import GlossaryTools
 from utils.agent_instructions import get_analyst_agent_instructions
 from utils.logger import get_logger
+from utils.session_history import get_history_settings
 from utils.config import (
     get_llm_config,
     sqlite_db,
@@ -47,12 +50,14 @@ def create_agent(
         db=sqlite_db(),
         tools=[
             PandasTools(),
+            StatsSqlTools(),
+            GlossaryTools(),
             ReasoningTools(add_instructions=True),
             ],
         instructions=get_analyst_agent_instructions(),
         knowledge=knowledge_base,
         search_knowledge=True,
-        add_history_to_context=True,
+        **get_history_settings(),
         enable_user_memories=True,
         markdown=True,
     )
@@ -2,26 +2,22 @@
 This module defines an agent configured to interact with a MS SQL Server instance via MCPTools.
 '''
 from textwrap import dedent
-import pandas_toon
 from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, cast
 
-import pandas as pd
-
-from agno.tools import tool
+from agno.tools import tool, Toolkit
 from agno.agent import Agent
 from agno.tools.reasoning import ReasoningTools
 
-from BasketIntelligence.create_season import CreateSeason
-from BasketIntelligence.ml_analysis import (
-    k_means_team_shooting_clustering,
-    k_means_player_clustering,
-    )
-
 from utils.agent_instructions import (
     get_data_agent_instructions,
     get_data_agent_output,
     )
 from utils.logger import get_logger
+from utils.session_history import get_history_settings
+from utils.pbp_parser import get_game_events, aget_game_events
+from utils.clustering_store import get_season_clustering, aget_season_clustering
+from utils.tool_output import format_tool_output, get_next_page
+from utils.metrics import timed_tool
 from utils.config import (
     get_llm_config,
     sqlite_db,
@@ -31,75 +27,190 @@ from utils.config import (
 # Initialize logger
 logger = get_logger()
 
+# Shared by the sync tools and their async variants
+TEAM_SHOOTING_CLUSTERING_DESCRIPTION = '''
+    Get the team clustering data with shooting stats for a given season.
+    Args:
+        season: The season, e.g. "2025".
+        n_cluster: The number of clusters.
+        columns: The stat columns relevant to the question. All columns are returned if omitted.
+    '''
+
+PLAYER_CLUSTERING_DESCRIPTION = '''
+    Get the player clustering data with advanced stats for a given season.
+    Large results are paginated, use get_next_page for the next rows.
+    Args:
+        season: The season, e.g. "2025".
+        n_cluster: The number of clusters.
+        columns: The stat columns relevant to the question (e.g. ["BPM", "WS"]). All columns are returned if omitted.
+    '''
+
+GAME_REPORT_DESCRIPTION = '''
+    Get the play by play report for a given game.
+    Every play has the period, seconds remaining, team, player, event type, points and running score.
+    Large results are paginated, use get_next_page for the next rows.
+    Args:
+        date: The date of the game in YYYYMMDD format.
+        home_team: The home team abbreviation.
+        columns: The columns relevant to the question. All columns are returned if omitted.
+    '''
+
 @tool(
     name="get_team_shooting_clustering",
-    description="Get the team clustering data with shooting stats for a given season",
+    description=TEAM_SHOOTING_CLUSTERING_DESCRIPTION,
     stop_after_tool_call=False
     )
+@timed_tool("get_team_shooting_clustering")
 def get_team_shooting_clustering(
         season: str, 
-        n_cluster: Optional[int]= 5
-        ):
+        n_cluster: Optional[int]= 5,
+        columns: Optional[List[str]] = None,
+        ) -> str:
     """
     Get the team shooting clustering data for a given season.
     """
     try:
-       df_shooting = CreateSeason(season).read_team_shooting()
-       df_clustering = k_means_team_shooting_clustering(season, n_cluster)
-       df_output = df_shooting.join(df_clustering.set_index('Team'), on='Team')
+        df_output = get_season_clustering("team_shooting", season, n_cluster)
 
     except Exception as e:
          logger.error(f"Error in get_team_shooting_clustering: {e}")
+         return f"Error getting the team shooting clustering of season {season}: {e}"
 
-    return df_output
+    return format_tool_output(df_output, columns=columns, key_columns=["Team", "cluster"])
 
 @tool(
     name="get_player_adv_stats_clustering",
-    description="Get the player clustering data with advanced stats for a given season",
+    description=PLAYER_CLUSTERING_DESCRIPTION,
     stop_after_tool_call=False
-    )                                 
+    )
+@timed_tool("get_player_adv_stats_clustering")
 def get_player_clustering(
         season: str, 
-        n_cluster: Optional[int]= 5
-        ):
+        n_cluster: Optional[int]= 5,
+        columns: Optional[List[str]] = None,
+        ) -> str:
     """
     Get the player clustering data with advanced stats for a given season.
     """
     try:
-        df_adv_stats = CreateSeason(season).read_adv_stats()
-        df_clustering = k_means_player_clustering(season, n_cluster)
-        df_output = df_adv_stats.merge(df_clustering, on='Player', how='inner')
+        df_output = get_season_clustering("player_adv_stats", season, n_cluster)
 
     except Exception as e:
         logger.error(f"Error in get_player_clustering: {e}")
+        return f"Error getting the player clustering of season {season}: {e}"
 
-    return df_output
+    return format_tool_output(df_output, columns=columns, key_columns=["Player", "cluster"])
 
 @tool(
     name="get_play_by_play_game_report",
-    description='''
-    Get the play by play report for a given game.
-    Args:
-        date: The date of the game in YYYYMMDD format.
-        home_team: The home team abbreviation.
-    ''',
+    description=GAME_REPORT_DESCRIPTION,
     stop_after_tool_call=False
-    )     
+    )
+@timed_tool("get_play_by_play_game_report")
 def get_game_report(
     date: str, 
-    home_team: str) -> str:
+    home_team: str,
+    columns: Optional[List[str]] = None) -> str:
     '''
     Get the play by play report for a given game.
     More Details please refer to the tool description.
     '''
     try:
-        url=f"https://www.basketball-reference.com/boxscores/pbp/{date}0{home_team}.html"
-        df = pd.read_html(url)[0].droplevel(0, axis=1)
+        df = get_game_events(date, home_team)
 
     except Exception as e:
         logger.error(f"Error fetching game stats: {e}")
-    
-    return df.to_toon()
+        return f"Error fetching the play by play of {date} {home_team}: {e}"
+
+    return format_tool_output(df, columns=columns, key_columns=["period", "seconds_remaining", "team"])
+
+@tool(
+    name="get_team_shooting_clustering",
+    description=TEAM_SHOOTING_CLUSTERING_DESCRIPTION,
+    stop_after_tool_call=False
+    )
+@timed_tool("get_team_shooting_clustering")
+async def aget_team_shooting_clustering(
+        season: str, 
+        n_cluster: Optional[int]= 5,
+        columns: Optional[List[str]] = None,
+        ) -> str:
+    """
+    Async variant of get_team_shooting_clustering, the KMeans fit runs in the process pool.
+    """
+    try:
+        df_output = await aget_season_clustering("team_shooting", season, n_cluster)
+
+    except Exception as e:
+        logger.error(f"Error in get_team_shooting_clustering: {e}")
+        return f"Error getting the team shooting clustering of season {season}: {e}"
+
+    return format_tool_output(df_output, columns=columns, key_columns=["Team", "cluster"])
+
+@tool(
+    name="get_player_adv_stats_clustering",
+    description=PLAYER_CLUSTERING_DESCRIPTION,
+    stop_after_tool_call=False
+    )
+@timed_tool("get_player_adv_stats_clustering")
+async def aget_player_clustering(
+        season: str, 
+        n_cluster: Optional[int]= 5,
+        columns: Optional[List[str]] = None,
+        ) -> str:
+    """
+    Async variant of get_player_clustering, the KMeans fit runs in the process pool.
+    """
+    try:
+        df_output = await aget_season_clustering("player_adv_stats", season, n_cluster)
+
+    except Exception as e:
+        logger.error(f"Error in get_player_clustering: {e}")
+        return f"Error getting the player clustering of season {season}: {e}"
+
+    return format_tool_output(df_output, columns=columns, key_columns=["Player", "cluster"])
+
+@tool(
+    name="get_play_by_play_game_report",
+    description=GAME_REPORT_DESCRIPTION,
+    stop_after_tool_call=False
+    )
+@timed_tool("get_play_by_play_game_report")
+async def aget_game_report(
+    date: str, 
+    home_team: str,
+    columns: Optional[List[str]] = None) -> str:
+    '''
+    Async variant of get_game_report, the page is fetched with the pooled HTTP client.
+    '''
+    try:
+        df = await aget_game_events(date, home_team)
+
+    except Exception as e:
+        logger.error(f"Error fetching game stats: {e}")
+        return f"Error fetching the play by play of {date} {home_team}: {e}"
+
+    return format_tool_output(df, columns=columns, key_columns=["period", "seconds_remaining", "team"])
+
+def get_data_toolkit() -> Toolkit:
+    '''
+    Bundle the data tools with their async variants.
+    Sync runs use the sync tools, async runs (e.g. served by AgentOS) use the async variants.
+    '''
+    return Toolkit(
+        name="basketball_data_tools",
+        tools=[
+            get_team_shooting_clustering,
+            get_player_clustering,
+            get_game_report,
+            get_next_page,
+            ],
+        async_tools=[
+            (aget_team_shooting_clustering, "get_team_shooting_clustering"),
+            (aget_player_clustering, "get_player_adv_stats_clustering"),
+            (aget_game_report, "get_play_by_play_game_report"),
+            ],
+        )
 
 def create_agent(llm: str, llm_reasoning: Optional[str]) -> Agent:
     '''
@@ -107,31 +218,33 @@ def create_agent(llm: str, llm_reasoning: Optional[str]) -> Agent:
 
     Args:
         llm: The LLM model to use for the team ("claude", "OpenAI-mini","OpenAI" or "AzureOpenAI")
-        llm_reasoning: The LLM model for reasoning ("claude", "OpenAI-mini", "OpenAI" or "AzureOpenAI")
+        llm_reasoning: The LLM model for reasoning ("claude", "OpenAI-mini", "OpenAI" or "AzureOpenAI"), None for the fast agent without reasoning
         model_id: The model ID to use for the LLM. Options: "claude-sonnet-4-5", "gpt-4.1-mini", "gpt-4.1"
         knowledge_base: The knowledge base to be used by the agent
     '''
 
+    # Without reasoning model, the agent answers the simple data retrievals routed to it in one pass
+    reasoning_model = None
+    tools = [get_data_toolkit()]
+    if llm_reasoning is not None:
+        reasoning_model = get_llm_config(
+                    provider=llm_reasoning,
+                    model_id=llm_catalog.get(llm_reasoning, llm),
+                    )
+        tools.append(ReasoningTools(add_instructions=True))
+
     agent = Agent(
         name="Basketball Data Agent",
         model=get_llm_config(
                     provider=llm,
                     model_id=llm_catalog.get(llm)
                     ),
-        reasoning_model=get_llm_config(
-                    provider=llm_reasoning,
-                    model_id=llm_catalog.get(llm_reasoning, llm),
-                    ),
+        reasoning_model=reasoning_model,
         db=sqlite_db(),
-        tools=[
-            get_team_shooting_clustering,
-            get_player_clustering,
-            get_game_report,
-            ReasoningTools(add_instructions=True),
-            ],
+        tools=tools,
         instructions=get_data_agent_instructions(),
         expected_output=dedent(get_data_agent_output()),
-        add_history_to_context=True,
+        **get_history_settings(),
         enable_user_memories=True,
         markdown=True,
     )
@@ -2,7 +2,6 @@
 This module defines an agent configured to interact with a MS SQL Server instance via MCPTools.
 '''
 from textwrap import dedent
-import pandas_toon
 from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, cast
 from pathlib import Path
 
@@ -11,6 +10,7 @@ from agno.agent import Agent
 from agno.skills import Skills, LocalSkills
 
 from utils.logger import get_logger
+from utils.session_history import get_history_settings
 from utils.config import (
     get_llm_config,
     sqlite_db,
@@ -43,7 +43,7 @@ def create_agent(llm: str) -> Agent:
         instructions=[
         "You are a helpful assistant with access to specialized skills."
         ],
-        add_history_to_context=True,
+        **get_history_settings(),
         enable_user_memories=True,
         markdown=True,
     )
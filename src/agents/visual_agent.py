@@ -10,6 +10,7 @@ from agno.tools.reasoning import ReasoningTools
 
 from utils.agent_instructions import get_data_agent_output, get_visualization_agent_instructions
 from utils.logger import get_logger
+from utils.session_history import get_history_settings
 from utils.config import (
     get_llm_config,
     sqlite_db,
@@ -46,7 +47,7 @@ def create_agent(llm: str, llm_reasoning: Optional[str],) -> Agent:
             ReasoningTools(add_instructions=True),
             ],
         instructions=get_visualization_agent_instructions(),
-        add_history_to_context=True,
+        **get_history_settings(),
         enable_user_memories=True,
         markdown=True,
     )
@@ -1,29 +1,23 @@
 '''
 Main entry point to start the agent app.
+
+The knowledge base, the agents, the team, the workflow and the AgentOS are registered as factories
+and built on the first request (or at startup with APP_WARMUP=true), so importing `main:app` stays
+cheap for uvicorn reloads and workers.
 '''
-import asyncio
-import mlflow
-from agno.team import Team
-from agno.os import AgentOS
-from agno.knowledge.reader.website_reader import WebsiteReader
+from contextlib import asynccontextmanager
 
 import os
-from agents.data_agent import create_agent as create_data_agent
-from agents.analyst_agent import create_agent as create_analyst_agent
-from agents.visual_agent import create_agent as create_visual_agent
-from agents.game_report_agent import create_agent as create_game_report_agent
-from teams.data_analysis_team import create_team as create_data_analysis_team
-from workflow.generate_game_report import game_report_workflow
-
-from utils.knowledge_base import create_knowledge_base
-from utils.mlflow_tracer import setup_mlflow_tracer
+from utils.registry import registry, LazyASGIApp
+from utils.async_io import close as close_async_executors
 from utils.config import (
-    llm, 
-    llm_reasoning, 
-    MLFLOW_TRACING,
-    MLFLOW_TRACK_SERVER,
-    MLFLOW_EXPERIMENT_NAME,
-    DATABRICKS_HOST,
+    llm,
+    llm_reasoning,
+    llm_fast,
+    APP_WARMUP,
+    KB_INGEST_ON_STARTUP,
+    TRACING,
+    METRICS,
 )
 from utils.logger import get_logger
 
@@ -34,77 +28,116 @@ logger = get_logger()
 os.environ["NO_PROXY"] = "localhost, 127.0.0.1"
 os.environ["no_proxy"] = "localhost, 127.0.0.1"
 
-# crate knowledge base
-knowledge_base = create_knowledge_base(COLLECTION_NAME="basketball_knowledge")
+def build_knowledge_base():
+    from utils.knowledge_base import create_knowledge_base
+    return create_knowledge_base(COLLECTION_NAME="basketball_knowledge")
 
-# Create agents
-data_agent = create_data_agent(
-    llm, 
-    llm_reasoning,
-    )
-
-analyst_agent = create_analyst_agent(
-    llm,
-    llm_reasoning, 
-    knowledge_base,
-    )
+def build_data_agent():
+    from agents.data_agent import create_agent as create_data_agent
+    return create_data_agent(
+        llm,
+        llm_reasoning,
+        )
 
-game_report_agent = create_game_report_agent(
-    llm, 
-    llm_reasoning,
-    )
+def build_fast_data_agent():
+    from agents.data_agent import create_agent as create_data_agent
+    return create_data_agent(llm_fast, None)
 
-visual_agent = create_visual_agent(
-    llm, 
-    llm_reasoning,
-    )
+def build_analyst_agent():
+    from agents.analyst_agent import create_agent as create_analyst_agent
+    return create_analyst_agent(
+        llm,
+        llm_reasoning,
+        registry.get("knowledge_base"),
+        )
 
-member_list = [data_agent, 
-               analyst_agent, 
-               game_report_agent,
-               visual_agent]
+def build_game_report_agent():
+    from agents.game_report_agent import create_agent as create_game_report_agent
+    return create_game_report_agent(llm)
 
-# Create a team
-analysis_team = create_data_analysis_team(
-    member_list, 
-    llm, 
-    llm_reasoning,
-    knowledge_base,
-    )
+def build_visual_agent():
+    from agents.visual_agent import create_agent as create_visual_agent
+    return create_visual_agent(
+        llm,
+        llm_reasoning,
+        )
 
-# Create a workflow
-game_report_workflow = game_report_workflow()
+def build_analysis_team():
+    from teams.data_analysis_team import create_team as create_data_analysis_team
 
-# Create the AgentOS
-agent_os = AgentOS(         
-    agents=[game_report_agent],           
-    teams=[analysis_team],
-    workflows=[game_report_workflow],
-    enable_mcp_server=True,
-                    )
-# Get the FastAPI app for the AgentOS
-app = agent_os.get_app()
+    member_list = [registry.get("data_agent"),
+                   registry.get("analyst_agent"),
+                   registry.get("game_report_agent"),
+                   registry.get("visual_agent")]
 
-if __name__ == "__main__":
+    return create_data_analysis_team(
+        member_list,
+        llm,
+        llm_reasoning,
+        registry.get("knowledge_base"),
+        fast_agent=registry.get("fast_data_agent"),
+        )
 
-    # Set up mlflow tracer
-    if MLFLOW_TRACING == 'true':
-        setup_mlflow_tracer(
-            track_server=MLFLOW_TRACK_SERVER,
-            experiment_name=MLFLOW_EXPERIMENT_NAME
+def build_game_report_workflow():
+    from workflow.generate_game_report import game_report_workflow
+    return game_report_workflow()
+
+@asynccontextmanager
+async def lifespan(app):
+    '''
+    Release the pooled HTTP client and process pool of the async tools on shutdown.
+    '''
+    yield
+    await close_async_executors()
+
+def build_agent_os():
+    from agno.os import AgentOS
+    return AgentOS(
+        agents=[registry.get("game_report_agent")],
+        teams=[registry.get("analysis_team")],
+        workflows=[registry.get("game_report_workflow")],
+        enable_mcp_server=True,
+        lifespan=lifespan,
                         )
-        if MLFLOW_TRACK_SERVER == "databricks":
-            logger.info(f"Initialized mlflow trace to Databricks: {DATABRICKS_HOST}")
-        else:
-            logger.info("Initialized mlflow trace to http://localhost:5000")
-
-    # Load knowledge base asynchronously
-    asyncio.run(knowledge_base.add_content_async(
-            url="https://www.nba.com/stats/help/glossary",
-            reader=WebsiteReader(max_depth=2, max_links=5),
-            skip_if_exists=True
-        )
+
+def build_app():
+    '''
+    FastAPI app of the AgentOS, with the Prometheus metrics of the worker on METRICS_PATH.
+    '''
+    app = registry.get("agent_os").get_app()
+    if METRICS == 'true':
+        from utils.metrics import add_metrics_route
+        add_metrics_route(app)
+    return app
+
+registry.register("knowledge_base", build_knowledge_base)
+registry.register("data_agent", build_data_agent)
+registry.register("fast_data_agent", build_fast_data_agent)
+registry.register("analyst_agent", build_analyst_agent)
+registry.register("game_report_agent", build_game_report_agent)
+registry.register("visual_agent", build_visual_agent)
+registry.register("analysis_team", build_analysis_team)
+registry.register("game_report_workflow", build_game_report_workflow)
+registry.register("agent_os", build_agent_os)
+
+# The FastAPI app of the AgentOS, built on the first request
+app = LazyASGIApp(
+    build_app,
+    warm_up=APP_WARMUP == 'true',
     )
-    
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Set up the sampled tracing of the agent runs, exported in the background
+    if TRACING == 'true':
+        from utils.tracing import setup_tracing
+        setup_tracing()
+
+    # Ingest the knowledge base in the background, unchanged pages are skipped
+    if KB_INGEST_ON_STARTUP == 'true':
+        from utils.kb_ingest import start_ingestion_process
+        start_ingestion_process()
+
     # Serve the AgentOS app
-    agent_os.serve(app="main:app", port=7777)
+    uvicorn.run(app="main:app", host="localhost", port=7777, lifespan="on")
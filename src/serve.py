@@ -0,0 +1,144 @@
+'''
+Production entry point: serve the AgentOS app with several worker processes.
+
+The read-only data (season tables, clustering results) is loaded in the master process before the
+workers are forked, so all workers share it copy-on-write. The agents, the database engines and the
+executors are built lazily inside each worker, as they must not be shared across a fork.
+On SIGTERM the workers stop accepting connections and drain the requests in flight for up to the graceful timeout.
+
+Usage:
+    uv run src/serve.py --workers 4
+    uv run src/serve.py --workers 8 --port 8000 --graceful-timeout 60
+'''
+import os
+import importlib
+from typing import Any, Dict
+
+from utils.logger import get_logger
+from utils.config import (
+    SERVE_WORKERS,
+    SERVE_GRACEFUL_TIMEOUT,
+    SERVE_PRELOAD,
+    KB_INGEST_ON_STARTUP,
+    TRACING,
+    )
+
+import typer
+app = typer.Typer()
+
+# Get logger
+logger = get_logger()
+
+def preload_shared_data() -> None:
+    '''
+    Load the read-only data into memory before the workers are forked.
+    '''
+    from utils.season_store import season_store
+    from utils.clustering_store import clustering_store
+
+    tables = season_store.preload()
+    results = clustering_store.preload()
+    logger.info(f"Preloaded {tables} season tables and {results} clustering results")
+
+def setup_worker_tracing(worker: Any) -> None:
+    '''
+    Set up the tracing in every worker, the span export thread does not survive a fork.
+    '''
+    if TRACING == 'true':
+        from utils.tracing import setup_tracing
+        setup_tracing()
+
+def serve_with_gunicorn(app_path: str, options: Dict[str, Any]) -> None:
+    '''
+    Run the app with a gunicorn master process and uvicorn workers.
+
+    Args:
+        app_path: The ASGI app as "module:attribute".
+        options: The gunicorn settings.
+    '''
+    from gunicorn.app.base import BaseApplication
+
+    class AgentOSApplication(BaseApplication):
+
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            module_name, attribute = app_path.split(":")
+            return getattr(importlib.import_module(module_name), attribute)
+
+    AgentOSApplication().run()
+
+@app.command()
+def main(
+    app_path: str = typer.Option(
+        "main:app",
+        "--app",
+        help="ASGI app to serve as module:attribute, relative to src."
+        ),
+    workers: int = typer.Option(
+        SERVE_WORKERS,
+        help="Number of worker processes."
+        ),
+    host: str = typer.Option(
+        "localhost",
+        help="Host to bind."
+        ),
+    port: int = typer.Option(
+        7777,
+        help="Port to bind."
+        ),
+    preload: bool = typer.Option(
+        SERVE_PRELOAD == 'true',
+        help="Load the season tables and clustering results before the workers are forked."
+        ),
+    graceful_timeout: int = typer.Option(
+        SERVE_GRACEFUL_TIMEOUT,
+        help="Seconds to drain the requests in flight on shutdown before the workers are killed."
+        ),
+):
+    '''
+    Serve the AgentOS app with several worker processes.
+    '''
+    # Set NO_PROXY to avoid proxy for localhost connections
+    os.environ["NO_PROXY"] = "localhost, 127.0.0.1"
+    os.environ["no_proxy"] = "localhost, 127.0.0.1"
+
+    # Ingest the knowledge base once in the background, not in every worker
+    if KB_INGEST_ON_STARTUP == 'true':
+        from utils.kb_ingest import start_ingestion_process
+        start_ingestion_process()
+
+    if not hasattr(os, "fork"):
+        # No fork on Windows: every worker is spawned and loads its own data
+        import uvicorn
+
+        logger.warning("Fork is not available, the workers do not share the preloaded data")
+        uvicorn.run(
+            app_path,
+            host=host,
+            port=port,
+            workers=workers,
+            lifespan="on",
+            timeout_graceful_shutdown=graceful_timeout,
+            )
+        return
+
+    if preload:
+        preload_shared_data()
+
+    serve_with_gunicorn(app_path, {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "graceful_timeout": graceful_timeout,
+        # Agent runs can take minutes, only workers that stop responding are restarted
+        "timeout": max(120, graceful_timeout),
+        "keepalive": 5,
+        "post_worker_init": setup_worker_tracing,
+    })
+
+if __name__ == "__main__":
+    app()
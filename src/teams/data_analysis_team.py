@@ -3,6 +3,7 @@ This module defines a data analysis team for basketball statistics.
 '''
 from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, cast
 
+from agno.agent import Agent
 from agno.team import Team
 from agno.models.azure.openai_chat import AzureOpenAI
 from agno.tools.reasoning import ReasoningTools
@@ -14,12 +15,22 @@ from utils.config import (
     llm_catalog,
     )
 from utils.agent_instructions import get_team_instructions
+from utils.session_history import get_history_settings
+from utils.semantic_cache import CachedTeam
+from utils.routing import RoutedTeam
+from utils.glossary import GlossaryTools
+
+class DataAnalysisTeam(CachedTeam, RoutedTeam):
+    '''
+    Team answering repeated questions from the semantic cache, then simple data retrievals with the fast data agent.
+    '''
 
 def create_team(
         member_list: list, 
         llm: str, 
         llm_reasoning: Optional[str],
         knowledge_base: Knowledge,
+        fast_agent: Optional[Agent] = None,
         ) -> Team:
     '''
     Create a data analysis team with the given members.
@@ -28,11 +39,12 @@ def create_team(
         member_list: List of Agent instances to be members of the team.
         llm: The LLM model to use for the team ("claude", "OpenAI" or "AzureOpenAI")
         model_id: The model ID to use for the LLM. Options: "claude-sonnet-4-5", "gpt-4.1-mini", "gpt-4.1"
+        fast_agent: Agent answering the simple data retrievals without the team, e.g. the data agent on the fast model.
 
     Returns:
-        An instance of Team configured as a data analysis team.
+        An instance of Team configured as a data analysis team, answering repeated questions from the semantic cache.
     '''
-    analyst_team = Team(
+    analyst_team = DataAnalysisTeam(
         name="Data Analysis Team",
         description="A team of agents that collaborates to analyze basketball data.",
         members=member_list,
@@ -45,7 +57,7 @@ def create_team(
                     model_id=llm_catalog.get(llm_reasoning, llm),
                     ),
         id="data_analysis_team",
-        tools=[ReasoningTools(add_instructions=True)],
+        tools=[ReasoningTools(add_instructions=True), GlossaryTools()],
         instructions=[
             get_team_instructions(),
         ],
@@ -54,9 +66,10 @@ def create_team(
         share_member_interactions=True,
         add_team_history_to_members=True,
         enable_user_memories=True,
-        add_history_to_context=True,
+        **get_history_settings(team=True),
         add_datetime_to_context=True,
         markdown=True,
+        fast_agent=fast_agent,
     )
 
     return analyst_team
@@ -16,6 +16,8 @@ def get_analyst_agent_instructions() -> str:
         Focus on:
         1. Interpreting the data provided by the data agent accurately,
         2. Providing clear and concise analysis that directly addresses the user's questions,
+        3. Using `run_sql_query` for aggregations over the season statistics and play by play events
+           (check `list_tables` first), one aggregate query instead of several pandas steps.
 
         Be thorough but concise. 
         If no relevant information can be found, ask data agent for more data.
@@ -54,6 +56,7 @@ def get_data_agent_instructions() -> str:
         1. Accurately capturing the relevant parameter values from user's questions for the tools call,
         2. Identifying the correct tool to use based on the user's questions
         3. Extracting relevant data that provides context for the next analysis steps
+        4. Passing only the `columns` relevant to the question, and calling `get_next_page` only if more rows are needed
 
         Be thorough but concise. 
         If no relevant information can be found with the defined agent tools, respond with "No relevant information found.
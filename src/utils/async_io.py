@@ -0,0 +1,102 @@
+'''
+This module provides shared executors for the async agent tools.
+Network I/O goes through one pooled async HTTP client, CPU heavy work goes to a bounded process pool,
+so that slow fetches or model fits never block the AgentOS event loop.
+'''
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+import httpx
+
+from utils.logger import get_logger
+from utils.metrics import PHASE_LATENCY
+from utils.config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_TIMEOUT,
+    CPU_POOL_WORKERS,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+# Basketball Reference rejects requests without a browser-like user agent
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; agno-os-basketball-ai)"}
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    '''
+    Return the pooled async HTTP client of the running event loop.
+    A new client is created when it is first used or when the event loop has changed.
+    '''
+    global _http_client, _http_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            headers=HTTP_HEADERS,
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        _http_client_loop = loop
+
+    return _http_client
+
+async def fetch_text(url: str) -> str:
+    '''
+    Fetch a url with the pooled HTTP client and return the response body.
+    '''
+    with PHASE_LATENCY.time(phase="http_fetch"):
+        response = await get_http_client().get(url)
+        response.raise_for_status()
+        return response.text
+
+def get_text(url: str) -> str:
+    '''
+    Sync variant of fetch_text for the sync tools and workflow steps.
+    '''
+    with PHASE_LATENCY.time(phase="http_fetch"):
+        response = httpx.get(url, headers=HTTP_HEADERS, timeout=HTTP_TIMEOUT, follow_redirects=True)
+        response.raise_for_status()
+        return response.text
+
+def get_process_pool() -> ProcessPoolExecutor:
+    '''
+    Return the bounded process pool used for CPU heavy work.
+    '''
+    global _process_pool
+
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS)
+        logger.info(f"Started process pool with {CPU_POOL_WORKERS} workers")
+
+    return _process_pool
+
+async def run_in_process(func: Callable[..., Any], *args: Any) -> Any:
+    '''
+    Run a picklable function in the process pool without blocking the event loop.
+    '''
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args))
+
+async def close() -> None:
+    '''
+    Close the HTTP client and shut down the process pool.
+    '''
+    global _http_client, _process_pool
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
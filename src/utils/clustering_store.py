@@ -0,0 +1,288 @@
+'''
+This module provides a persistent store for the season clustering results of the BasketIntelligence library.
+Results are keyed by (season, n_cluster, feature set) and a content hash of the season stats and the clustering function.
+The stats are read from the local season store, a snapshot of the CreateSeason tables that the library clusters,
+so a refresh of the season in progress changes the hash and the clustering is computed again.
+The results are kept in a bounded in-memory LRU and persisted as Parquet so they survive process restarts.
+
+Run `python src/utils/clustering_store.py --help` to precompute every season x k offline.
+'''
+import os
+import sys
+import uuid
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Add src to path when the module is executed as a script
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from BasketIntelligence.ml_analysis import (
+    k_means_team_shooting_clustering,
+    k_means_player_clustering,
+    )
+
+from utils.logger import get_logger
+from utils.async_io import run_in_process
+from utils.metrics import PHASE_LATENCY
+from utils.season_store import read_season_table, season_store
+from utils.config import (
+    CLUSTERING_STORE_DIR,
+    CLUSTERING_CACHE_SIZE,
+    )
+
+import typer
+app = typer.Typer()
+
+# Initialize logger
+logger = get_logger()
+
+# Feature sets that can be clustered: the season table of the stats, the library function clustering them
+# and how to join the clusters back onto the stats
+FEATURE_SETS: Dict[str, Dict[str, Any]] = {
+    "team_shooting": {
+        "table": "team_shooting",
+        "cluster": k_means_team_shooting_clustering,
+        "key": "Team",
+        "how": "left",
+    },
+    "player_adv_stats": {
+        "table": "adv_stats",
+        "cluster": k_means_player_clustering,
+        "key": "Player",
+        "how": "inner",
+    },
+}
+
+def hash_frame(df: pd.DataFrame, salt: str = "") -> str:
+    '''
+    Compute a content hash of a DataFrame (column names and values), optionally salted e.g. with the clustering function.
+    '''
+    digest = hashlib.sha256()
+    digest.update(salt.encode())
+    digest.update("|".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def compute_name(compute: Callable[..., Any]) -> str:
+    return f"{compute.__module__}.{compute.__qualname__}"
+
+class ClusteringStore:
+    '''
+    Two level (memory LRU + Parquet on disk) store for clustering results.
+    '''
+
+    def __init__(self, store_dir: str = CLUSTERING_STORE_DIR, max_entries: int = CLUSTERING_CACHE_SIZE):
+        '''
+        Args:
+            store_dir: Directory where the Parquet files are stored.
+            max_entries: Maximum number of results kept in memory.
+        '''
+        self.store_dir = Path(store_dir)
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[Tuple[str, str, int, str], pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: Tuple[str, str, int, str]) -> Path:
+        feature_set, season, n_cluster, stats_hash = key
+        return self.store_dir / feature_set / f"season={season}" / f"k={n_cluster}" / f"{stats_hash}.parquet"
+
+    def _remember(self, key: Tuple[str, str, int, str], df: pd.DataFrame) -> None:
+        with self._lock:
+            self._memory[key] = df
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, feature_set: str, season: str, n_cluster: int, stats_hash: str) -> Optional[pd.DataFrame]:
+        '''
+        Return a stored clustering result or None if it has not been computed yet.
+        '''
+        key = (feature_set, str(season), int(n_cluster), stats_hash)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        if not path.exists():
+            return None
+
+        df = pd.read_parquet(path)
+        self._remember(key, df)
+        return df
+
+    def put(self, feature_set: str, season: str, n_cluster: int, stats_hash: str, df: pd.DataFrame) -> None:
+        '''
+        Store a clustering result in memory and on disk.
+        '''
+        key = (feature_set, str(season), int(n_cluster), stats_hash)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Unique per writer, threads of the same process may store the same result concurrently
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+        self._remember(key, df)
+
+    def preload(self) -> int:
+        '''
+        Load the most recent results on disk into the memory LRU, e.g. in the server master process
+        before the workers are forked, so that the workers share them copy-on-write.
+
+        Returns:
+            The number of results loaded.
+        '''
+        paths = sorted(self.store_dir.glob("*/season=*/k=*/*.parquet"), key=lambda path: path.stat().st_mtime)
+        for path in paths[-self.max_entries:]:
+            feature_set = path.parents[2].name
+            season = path.parents[1].name.split("=", 1)[1]
+            n_cluster = int(path.parent.name.split("=", 1)[1])
+            self._remember((feature_set, season, n_cluster, path.stem), pd.read_parquet(path))
+
+        return len(paths[-self.max_entries:])
+
+    def get_or_compute(
+            self,
+            feature_set: str,
+            season: str,
+            n_cluster: int,
+            stats: pd.DataFrame,
+            compute: Callable[[str, int], pd.DataFrame]) -> pd.DataFrame:
+        '''
+        Return the clustering result for the given input stats, computing and storing it on a miss.
+
+        Args:
+            feature_set: Name of the feature set (e.g. "team_shooting").
+            season: The season of the input stats.
+            n_cluster: Number of clusters.
+            stats: The input stats, used for the content hash with the name of the compute function.
+            compute: Function called as compute(season, n_cluster) on a miss.
+        '''
+        stats_hash = hash_frame(stats, salt=compute_name(compute))
+        df = self.get(feature_set, season, n_cluster, stats_hash)
+        if df is not None:
+            return df
+
+        logger.info(f"Computing {feature_set} clustering for season {season} with k={n_cluster}")
+        with PHASE_LATENCY.time(phase="kmeans_fit"):
+            df = compute(season, n_cluster)
+        self.put(feature_set, season, n_cluster, stats_hash, df)
+        return df
+
+    async def aget_or_compute(
+            self,
+            feature_set: str,
+            season: str,
+            n_cluster: int,
+            stats: pd.DataFrame,
+            compute: Callable[[str, int], pd.DataFrame]) -> pd.DataFrame:
+        '''
+        Async variant of get_or_compute. On a miss the clustering runs in the process pool,
+        so `compute` has to be a picklable module level function.
+        '''
+        stats_hash = await asyncio.to_thread(hash_frame, stats, compute_name(compute))
+        df = await asyncio.to_thread(self.get, feature_set, season, n_cluster, stats_hash)
+        if df is not None:
+            return df
+
+        logger.info(f"Computing {feature_set} clustering for season {season} with k={n_cluster}")
+        with PHASE_LATENCY.time(phase="kmeans_fit"):
+            df = await run_in_process(compute, season, n_cluster)
+        await asyncio.to_thread(self.put, feature_set, season, n_cluster, stats_hash, df)
+        return df
+
+# Process-wide store used by the data agent tools
+clustering_store = ClusteringStore()
+
+def get_season_clustering(feature_set: str, season: str, n_cluster: Optional[int] = 5) -> pd.DataFrame:
+    '''
+    Get the stats of a season joined with their cluster labels.
+
+    Args:
+        feature_set: Name of the feature set, one of FEATURE_SETS.
+        season: The season to cluster.
+        n_cluster: Number of clusters.
+    '''
+    spec = FEATURE_SETS[feature_set]
+    n_cluster = n_cluster or 5
+    df_stats = read_season_table(spec["table"], season)
+    df_clustering = clustering_store.get_or_compute(
+        feature_set, season, n_cluster, df_stats, spec["cluster"],
+        )
+
+    return df_stats.merge(df_clustering, on=spec["key"], how=spec["how"])
+
+async def aget_season_clustering(feature_set: str, season: str, n_cluster: Optional[int] = 5) -> pd.DataFrame:
+    '''
+    Async variant of get_season_clustering.
+    '''
+    spec = FEATURE_SETS[feature_set]
+    n_cluster = n_cluster or 5
+    df_stats = await asyncio.to_thread(read_season_table, spec["table"], season)
+    df_clustering = await clustering_store.aget_or_compute(
+        feature_set, season, n_cluster, df_stats, spec["cluster"],
+        )
+
+    return df_stats.merge(df_clustering, on=spec["key"], how=spec["how"])
+
+@app.command()
+def precompute(
+    start_season: Optional[int] = typer.Option(
+        None,
+        help="First season to precompute, defaults to the first season of the season store."
+        ),
+    end_season: Optional[int] = typer.Option(
+        None,
+        help="Last season to precompute, defaults to the last season of the season store."
+        ),
+    min_cluster: int = typer.Option(
+        2,
+        help="Smallest number of clusters."
+        ),
+    max_cluster: int = typer.Option(
+        10,
+        help="Largest number of clusters."
+        ),
+):
+    '''
+    Warm the clustering store for every season of the season store x k in the given ranges.
+    '''
+    manifest = season_store.read_manifest()
+
+    for feature_set, spec in FEATURE_SETS.items():
+        seasons = sorted(int(season) for season in manifest.get(spec["table"], {}))
+        seasons = [
+            season for season in seasons
+            if (start_season is None or season >= start_season) and (end_season is None or season <= end_season)
+        ]
+        if not seasons:
+            logger.warning(f"No {spec['table']} seasons in the season store, run `make ingest-seasons` first")
+
+        for season in seasons:
+            try:
+                df_stats = read_season_table(spec["table"], str(season))
+            except Exception as e:
+                logger.error(f"Error reading {feature_set} stats for season {season}: {e}")
+                continue
+
+            for n_cluster in range(min_cluster, max_cluster + 1):
+                try:
+                    clustering_store.get_or_compute(
+                        feature_set, str(season), n_cluster, df_stats, spec["cluster"],
+                        )
+                except Exception as e:
+                    logger.error(f"Error clustering {feature_set} for season {season} with k={n_cluster}: {e}")
+
+    logger.info("Clustering store precompute complete.")
+
+if __name__ == "__main__":
+    app()
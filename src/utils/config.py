@@ -4,12 +4,14 @@ Configuration module for the agent application.
 
 import os
 import json
+import threading
+from typing import Dict, Optional
+
 from dotenv import load_dotenv
+from sqlalchemy import Table, create_engine, event
+from sqlalchemy.engine import Engine
 
 from agno.db.sqlite import SqliteDb
-from agno.models.anthropic import Claude
-from agno.models.azure.openai_chat import AzureOpenAI
-from agno.models.openai.responses import OpenAIResponses
 
 # Load environment variables
 load_dotenv()
@@ -22,17 +24,149 @@ DATABRICKS_HOST = os.getenv("DATABRICKS_HOST", "local")
 
 # Qdrant URL configuration for vector database as Knowledge Base
 Qdrant_URL = os.getenv("Qdrant_URL", "http://localhost:6333")
+KB_VECTOR_BACKEND = os.getenv("KB_VECTOR_BACKEND", "qdrant")  # Options: "qdrant" (server at Qdrant_URL) or "local" (in-process)
+KB_EMBEDDER = os.getenv("KB_EMBEDDER", "openai")  # Options: "openai" or "hashing" (local, no API call, e.g. for the offline benchmarks)
+KB_LOCAL_VECTOR_DIR = os.getenv("KB_LOCAL_VECTOR_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data", "vectors"))
+
+# Build the agents, the team and the workflow at server startup instead of on the first request
+APP_WARMUP = os.getenv("APP_WARMUP", "false")
+
+# Root directory of the on-disk caches, anchored at the project root so that all entry points share it
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", ".cache"))
+
+# Tracing of the agent runs (src/utils/tracing.py), sampled and exported in the background
+TRACING = os.getenv("TRACING", MLFLOW_TRACING)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "mlflow")  # Options: "mlflow", "otlp", "sqlite", "file" or "console"
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://127.0.0.1:6006/v1/traces")  # e.g. Arize Phoenix
+TRACING_HEAD_SAMPLE_RATE = float(os.getenv("TRACING_HEAD_SAMPLE_RATE", "1.0"))  # Share of the runs recorded
+TRACING_TAIL_SAMPLE_RATE = float(os.getenv("TRACING_TAIL_SAMPLE_RATE", "0.1"))  # Share of the recorded runs exported, besides errors and slow runs
+TRACING_SLOW_MS = float(os.getenv("TRACING_SLOW_MS", "10000"))  # Runs slower than this are always exported
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "4096"))  # Spans waiting for export, new runs are dropped when full
+TRACING_BATCH_SIZE = int(os.getenv("TRACING_BATCH_SIZE", "256"))  # Spans per export call
+TRACING_EXPORT_INTERVAL_MS = int(os.getenv("TRACING_EXPORT_INTERVAL_MS", "2000"))
+TRACING_MAX_OPEN_TRACES = int(os.getenv("TRACING_MAX_OPEN_TRACES", "1024"))  # Runs in progress kept in memory
+TRACING_PATH = os.getenv("TRACING_PATH", os.path.join(CACHE_DIR, "traces"))  # Local store of the "sqlite" and "file" exporters
+
+# Play-by-play cache configuration (finished games are cached forever, live games expire after the TTL)
+PBP_CACHE_DIR = os.getenv("PBP_CACHE_DIR", os.path.join(CACHE_DIR, "pbp"))
+PBP_CACHE_TTL = int(os.getenv("PBP_CACHE_TTL", "300"))  # Seconds
+
+# Play-by-play compaction before the report writing phase
+PBP_COMPACTION = os.getenv("PBP_COMPACTION", "true")  # Set to false to pass the raw play by play to the agent
+PBP_RAW_ROW_BUDGET = int(os.getenv("PBP_RAW_ROW_BUDGET", "0"))  # Raw rows (last plays) added to the summary
+PBP_RAW_MAX_TOKENS = int(os.getenv("PBP_RAW_MAX_TOKENS", "16000"))  # Budget of the raw play by play if compaction is disabled
+PBP_DROUGHT_SECONDS = int(os.getenv("PBP_DROUGHT_SECONDS", "180"))  # Minimum length of a scoring drought
+
+# Local season data store (Parquet snapshots of the BasketIntelligence season tables)
+SEASON_STORE_DIR = os.getenv("SEASON_STORE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data", "seasons"))
+SEASON_STORE_OFFLINE = os.getenv("SEASON_STORE_OFFLINE", "false")  # Set to true to never fall back to the upstream source
+SEASON_STORE_TTL = int(os.getenv("SEASON_STORE_TTL", "21600"))  # Seconds before the season in progress is fetched again, 0 to never refresh it
+
+# Budget of the data tool results (larger results are paginated with the get_next_page tool)
+TOOL_OUTPUT_MAX_ROWS = int(os.getenv("TOOL_OUTPUT_MAX_ROWS", "100"))
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "4000"))  # Estimated with 4 characters per token
+TOOL_OUTPUT_FORMAT = os.getenv("TOOL_OUTPUT_FORMAT", "toon")  # toon, csv or markdown
+TOOL_CURSOR_CACHE_SIZE = int(os.getenv("TOOL_CURSOR_CACHE_SIZE", "32"))  # Number of paginated results kept in memory
+TOOL_CURSOR_DIR = os.getenv("TOOL_CURSOR_DIR", os.path.join(CACHE_DIR, "cursors"))  # Shared by the server workers
+TOOL_CURSOR_TTL = int(os.getenv("TOOL_CURSOR_TTL", "3600"))  # Seconds before an unused cursor is deleted
+
+# Session history of the agents and the team
+HISTORY_NUM_RUNS = int(os.getenv("HISTORY_NUM_RUNS", "3"))  # Runs replayed in full, older runs are summarized
+HISTORY_MAX_TOOL_CALLS = int(os.getenv("HISTORY_MAX_TOOL_CALLS", "2"))  # Tool results kept in the history
+HISTORY_SESSION_SUMMARIES = os.getenv("HISTORY_SESSION_SUMMARIES", "true")  # Rolling summary of the session
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "24000"))  # Context tokens per run, 0 disables compression
+
+# SQL tool of the analyst agent (embedded DuckDB over the local season store and play-by-play cache)
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "200"))  # Rows returned to the agent per query
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "128"))  # Number of query results kept in memory
+
+# Clustering store configuration (results persist on disk, the in-memory LRU is bounded)
+CLUSTERING_STORE_DIR = os.getenv("CLUSTERING_STORE_DIR", os.path.join(CACHE_DIR, "clustering"))
+CLUSTERING_CACHE_SIZE = int(os.getenv("CLUSTERING_CACHE_SIZE", "64"))  # Number of results kept in memory
+
+# Executors for the async agent tools (pooled HTTP client and process pool for CPU heavy work)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))  # Seconds
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Batch game report settings
+REPORT_OUTPUT_DIR = os.getenv("REPORT_OUTPUT_DIR", "reports")
+BATCH_MAX_CONNECTIONS = int(os.getenv("BATCH_MAX_CONNECTIONS", "4"))  # Concurrent play by play fetches
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "3"))  # Concurrent report writing runs
+
+# SQLite database of the agents, one shared engine per database file
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "5"))  # Connections kept open per database file
+SQLITE_MAX_OVERFLOW = int(os.getenv("SQLITE_MAX_OVERFLOW", "10"))  # Additional connections under load
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # Wait for locks instead of failing
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is durable with WAL except on power loss
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes
+
+# Knowledge base ingestion (src/utils/kb_ingest.py), run in the background at server startup
+KB_INGEST_ON_STARTUP = os.getenv("KB_INGEST_ON_STARTUP", "true")
+KB_SOURCE_URLS = os.getenv("KB_SOURCE_URLS", "https://www.nba.com/stats/help/glossary").split(",")
+KB_DOCS_DIR = os.getenv("KB_DOCS_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "data", "knowledge"))  # PDF, Markdown, text
+KB_CRAWL_MAX_DEPTH = int(os.getenv("KB_CRAWL_MAX_DEPTH", "2"))
+KB_CRAWL_MAX_LINKS = int(os.getenv("KB_CRAWL_MAX_LINKS", "5"))  # Pages crawled per start url
+KB_CRAWL_CONCURRENCY = int(os.getenv("KB_CRAWL_CONCURRENCY", "4"))  # Pages fetched at the same time
+KB_CHUNK_SIZE = int(os.getenv("KB_CHUNK_SIZE", "5000"))  # Characters
+KB_EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "100"))  # Chunks per embedding API call
+KB_EMBED_BATCH_WINDOW_MS = int(os.getenv("KB_EMBED_BATCH_WINDOW_MS", "10"))  # Wait for concurrent queries to embed them together
+KB_GLOSSARY_PATH = os.getenv("KB_GLOSSARY_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "data", "glossary.json"))  # Stat glossary index
+
+# Retrieval cache of the knowledge searches (query embeddings and top-k results), cleared when the collection changes
+KB_RETRIEVAL_CACHE = os.getenv("KB_RETRIEVAL_CACHE", "true")
+KB_RETRIEVAL_CACHE_SIZE = int(os.getenv("KB_RETRIEVAL_CACHE_SIZE", "1024"))  # Entries
+KB_RETRIEVAL_CACHE_TTL = int(os.getenv("KB_RETRIEVAL_CACHE_TTL", "3600"))  # Seconds
+KB_RETRIEVAL_VERSION_TTL = float(os.getenv("KB_RETRIEVAL_VERSION_TTL", "10"))  # Seconds between checks of the collection for changes
+
+# Semantic cache of the team answers (local vector index shared by the server workers)
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "true")
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", os.path.join(CACHE_DIR, "semantic_cache.db"))
+SEMANTIC_CACHE_THRESHOLD = os.getenv("SEMANTIC_CACHE_THRESHOLD", "")  # Minimum cosine similarity of a hit, empty: 0.97 (hashing) or 0.9 (openai)
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))  # Seconds, answers about completed seasons never expire
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing")  # "hashing" (local) or "openai" (paraphrases)
+
+# Multi-worker serving mode (src/serve.py)
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", str(min(4, os.cpu_count() or 1))))
+SERVE_GRACEFUL_TIMEOUT = int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))  # Seconds to drain the requests in flight
+SERVE_PRELOAD = os.getenv("SERVE_PRELOAD", "true")  # Load the read-only data before the workers are forked
+
+# Shared HTTP clients of the LLM providers (src/utils/llm_clients.py), one per provider and process
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # Requests in flight per provider
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "8"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))  # Seconds an idle connection is kept
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # Seconds
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))  # Seconds
+LLM_PROVIDER_LIMITS = json.loads(os.getenv("LLM_PROVIDER_LIMITS", "{}"))  # e.g. {"anthropic": {"max_concurrency": 4, "timeout": 300}}
+
+# Adaptive routing of the team requests (src/utils/routing.py): simple data retrievals skip the team and its reasoning model
+ROUTING = os.getenv("ROUTING", "true")
+ROUTING_MAX_WORDS = int(os.getenv("ROUTING_MAX_WORDS", "30"))  # Longer questions are escalated to the team
+
+# Latency histograms of the tools, data phases, LLM calls and workflow steps (src/utils/metrics.py), served on /metrics
+METRICS = os.getenv("METRICS", "true")
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics/prometheus")  # GET /metrics of the AgentOS serves its usage metrics (JSON)
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "basketball_ai")
+METRICS_BUCKETS = [float(bound) for bound in os.getenv("METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60").split(",")]  # Seconds
+
+# Latency of the stub LLM provider (llm=stub) used by the load tests
+STUB_LLM_LATENCY_MS = int(os.getenv("STUB_LLM_LATENCY_MS", "200"))
 
 # Define a catalog of available LLM providers and models
 llm_catalog = {"claude": "claude-sonnet-4-5",
                "claude-mini": "claude-3-5-sonnet-20240620",
                "OpenAI": "gpt-4.1",
                "OpenAI-mini": "o4-mini",
-               "AzureOpenAI": "gpt-4.1"}
+               "OpenAI-fast": "gpt-4.1-mini",
+               "AzureOpenAI": "gpt-4.1",
+               "stub": "stub"}
 
 # Load env variables for llm settings
 llm = os.getenv("llm", "OpenAI")
 llm_reasoning = os.getenv("llm_reasoning", "OpenAI")
+llm_fast = os.getenv("llm_fast", llm)  # Model of the fast data agent answering the routed requests
 
 # Define function for LLM configuration
 def get_llm_config(provider: str, model_id: str):
@@ -40,22 +174,95 @@ def get_llm_config(provider: str, model_id: str):
     Get the LLM configuration based on the provider.
 
     Args:
-        provider: The LLM provider ("claude", "OpenAI" or "AzureOpenAI")
+        provider: The LLM provider ("claude", "OpenAI", "AzureOpenAI" or "stub")
         model_id: The model ID to use for the LLM. Options: "claude-sonnet-4-5", "gpt-4.1-mini", "gpt-4.1".
 
     Returns:
-        An instance of the corresponding LLM model.
+        An instance of the corresponding LLM model, using the shared HTTP client of its provider.
     """
-    llm = Claude(model_id) if provider.startswith("claude")\
-          else OpenAIResponses(id=model_id) if provider.startswith("OpenAI")\
-          else AzureOpenAI(id=model_id, api_version="2024-12-01-preview")
+    # The provider SDKs are imported on use, each of them takes noticeable time to import
+    if provider == "stub":
+        from utils.stub_model import StubModel
+        from utils.metrics import timed_model
+        return timed_model(StubModel)(id=model_id)
 
-    return llm
+    from utils.llm_clients import pooled
+
+    if provider.startswith("claude"):
+        from agno.models.anthropic import Claude
+        return pooled(Claude, "anthropic")(model_id)
+
+    if provider.startswith("OpenAI"):
+        from agno.models.openai.responses import OpenAIResponses
+        return pooled(OpenAIResponses, "openai")(id=model_id)
+
+    from agno.models.azure.openai_chat import AzureOpenAI
+    return pooled(AzureOpenAI, "azure")(id=model_id, api_version="2024-12-01-preview")
 
 # Define function for SQLite database configuration as memory store
+def create_sqlite_engine(db_path: str) -> Engine:
+    '''
+    This function creates a pooled SQLAlchemy engine for a SQLite file in WAL mode.
+    The pragmas are set on every new connection of the pool.
+
+    Args:
+        db_path (str): The file path for the SQLite database.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
+    '''
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        pool_size=SQLITE_POOL_SIZE,
+        max_overflow=SQLITE_MAX_OVERFLOW,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+    return engine
+
+class SharedSqliteDb(SqliteDb):
+    '''
+    SqliteDb that resolves every table once.
+    SqliteDb reflects the table on every read and write, which is slow and not safe when
+    concurrent sessions share the instance (and its metadata).
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tables: Dict[str, Table] = {}
+        self._tables_lock = threading.RLock()  # Creating a table reads the versions table
+
+    def _get_table(self, table_type: str, create_table_if_not_found: Optional[bool] = False) -> Optional[Table]:
+        table = self._tables.get(table_type)
+        if table is not None:
+            return table
+
+        with self._tables_lock:
+            if table_type not in self._tables:
+                table = super()._get_table(table_type, create_table_if_not_found=create_table_if_not_found)
+                if table is None:
+                    return None
+                self._tables[table_type] = table
+
+            return self._tables[table_type]
+
+# One SqliteDb per database file, shared by all agents, teams and workflows of the process
+_sqlite_dbs: Dict[str, SqliteDb] = {}
+_sqlite_dbs_lock = threading.Lock()
+
 def sqlite_db(db_path: str = "agno.db") -> SqliteDb:
     '''
     This function configures and returns a SQLite database for use as a memory store.
+    All callers with the same database file share one instance and its connection pool.
 
     Args:
         db_path (str): The file path for the SQLite database. Defaults to "agno.db".
@@ -63,4 +270,10 @@ def sqlite_db(db_path: str = "agno.db") -> SqliteDb:
     Returns:
         SqliteDb: An instance of SqliteDb configured with the specified database file.
     '''
-    return SqliteDb(db_file=db_path)
+    db_file = os.path.abspath(db_path)
+
+    with _sqlite_dbs_lock:
+        if db_file not in _sqlite_dbs:
+            _sqlite_dbs[db_file] = SharedSqliteDb(db_file=db_path, db_engine=create_sqlite_engine(db_file))
+
+        return _sqlite_dbs[db_file]
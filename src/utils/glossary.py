@@ -0,0 +1,267 @@
+'''
+This module provides the stat glossary index: the terms of the ingested glossary pages and documents
+(e.g. the NBA stats glossary), keyed by abbreviation, name and aliases, with their definition and formula.
+It is built by the knowledge base ingestion (src/utils/kb_ingest.py) and exposed to the agents as a tool,
+so that an exact stat term is answered with a dictionary lookup instead of an embedding call and a vector search.
+'''
+import re
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from agno.tools import Toolkit
+
+from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.config import KB_GLOSSARY_PATH
+
+# Initialize logger
+logger = get_logger()
+
+# "Abbreviation", "Definition", ... alone on a line (value on the next line) or followed by ": value"
+LABEL = re.compile(r"^(abbreviation|abbr|name|term|definition|formula)\s*(?::\s*(.*))?$", re.IGNORECASE)
+LABELS = {"abbr": "abbreviation", "term": "name"}
+
+# "True Shooting Percentage (TS%): definition" and "TS%: definition"
+NAMED_TERM = re.compile(r"^(?P<name>[A-Za-z][\w .'/-]{2,60}?)\s*\((?P<abbreviation>[\w%+/-]{1,10})\)\s*[:\-–]\s*(?P<definition>.+)$")
+ABBREVIATION_TERM = re.compile(r"^(?P<abbreviation>[A-Z][A-Z0-9%+/-]{0,9})\s*:\s*(?P<definition>.+)$")
+
+# The words around a term asked as a question: "What is BPM?", "What does TS% stand for?", "Define usage rate"
+QUESTION = re.compile(
+    r"^(?:what\s+(?:is|are|does|do)|what's|define|explain|(?:the\s+)?(?:meaning|definition)\s+of)\s+(?:the\s+|an?\s+)?"
+    r"|\s+(?:mean|means|stand\s+for|stands\s+for)$",
+    re.IGNORECASE,
+)
+
+@dataclass
+class GlossaryEntry:
+    '''
+    A stat term of the glossary.
+    '''
+    abbreviation: Optional[str]
+    name: Optional[str]
+    definition: str
+    formula: Optional[str] = None
+    source: Optional[str] = None
+
+    def format(self) -> str:
+        term = self.abbreviation or self.name
+        if self.abbreviation and self.name:
+            term = f"{self.abbreviation} ({self.name})"
+        lines = [f"{term}: {self.definition}"]
+        if self.formula:
+            lines.append(f"Formula: {self.formula}")
+        if self.source:
+            lines.append(f"Source: {self.source}")
+        return "\n".join(lines)
+
+def normalize_term(term: str) -> str:
+    '''
+    Key of a term: lower case alphanumerics, with "%", "percentage" and "rate" spelled "pct",
+    so that "TS%", "ts pct" and "TS Percentage" or "usage rate" and "Usage Percentage" share a key.
+    '''
+    term = term.lower().replace("%", " pct ")
+    term = re.sub(r"\b(percentage|percent|rate)\b", "pct", term)
+    term = term.replace("+/-", "plusminus")
+    return re.sub(r"[^a-z0-9]", "", term)
+
+def parse_glossary(text: str, source: Optional[str] = None) -> List[GlossaryEntry]:
+    '''
+    Extract the glossary entries of a text: labelled blocks ("Abbreviation", "Definition", "Formula",
+    named by the line before them, as on the NBA stats glossary) and one-line entries ("Name (ABBR): definition").
+
+    Args:
+        text: The text of a page or document.
+        source: Name of the page or document, recorded in the entries.
+    '''
+    entries: List[Dict[str, Optional[str]]] = []
+    current: Optional[Dict[str, Optional[str]]] = None
+    pending: Optional[str] = None
+    previous: Optional[str] = None
+
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+
+        label = LABEL.match(line)
+        if label:
+            field = LABELS.get(label.group(1).lower(), label.group(1).lower())
+            if field == "name" or (field == "abbreviation" and (current is None or current.get("abbreviation"))):
+                current = {"name": previous if field == "abbreviation" else None}
+                entries.append(current)
+            if current is not None:
+                if label.group(2):
+                    current[field] = label.group(2).strip()
+                    pending = None
+                else:
+                    pending = field
+            continue
+
+        if pending and current is not None:
+            current[pending] = line
+            pending = None
+            continue
+
+        match = NAMED_TERM.match(line) or ABBREVIATION_TERM.match(line)
+        if match:
+            entry = match.groupdict()
+            definition, _, formula = entry["definition"].partition("Formula:")
+            entries.append({**entry, "definition": definition.strip(), "formula": formula.strip() or None})
+            current = None
+        previous = line
+
+    return [
+        GlossaryEntry(
+            abbreviation=entry.get("abbreviation"),
+            name=entry.get("name"),
+            definition=entry["definition"],
+            formula=entry.get("formula"),
+            source=source,
+        )
+        for entry in entries
+        if entry.get("definition") and (entry.get("abbreviation") or entry.get("name"))
+    ]
+
+class GlossaryIndex:
+    '''
+    Glossary entries of the ingested sources, persisted in a JSON file and reloaded when it changes
+    (it is written by the ingestion process and read by the server workers).
+    '''
+
+    def __init__(self, path: str = KB_GLOSSARY_PATH):
+        '''
+        Args:
+            path: JSON file of the index.
+        '''
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._sources: Dict[str, List[GlossaryEntry]] = {}
+        self._terms: Dict[str, GlossaryEntry] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _index(self) -> None:
+        '''
+        Key the entries by abbreviation, then by name, then by name without "pct" (e.g. "true shooting").
+        '''
+        entries = [entry for source in self._sources.values() for entry in source]
+        terms: Dict[str, GlossaryEntry] = {}
+        for entry in entries:
+            if entry.abbreviation:
+                terms.setdefault(normalize_term(entry.abbreviation), entry)
+        for entry in entries:
+            if entry.name:
+                terms.setdefault(normalize_term(entry.name), entry)
+        for entry in entries:
+            if entry.name and normalize_term(entry.name).endswith("pct"):
+                terms.setdefault(normalize_term(entry.name)[:-3], entry)
+        terms.pop("", None)
+        self._terms = terms
+
+    def _refresh(self) -> None:
+        '''
+        Reload the index when the file has changed. Must be called with the lock held.
+        '''
+        version = self.path.stat().st_mtime_ns if self.path.exists() else None
+        if version == self._version:
+            return
+
+        data = json.loads(self.path.read_text(encoding="utf-8")) if version else {}
+        self._sources = {
+            source: [GlossaryEntry(**entry) for entry in entries]
+            for source, entries in data.get("sources", {}).items()
+        }
+        self._index()
+        self._version = version
+
+    def update(self, source: str, entries: List[GlossaryEntry]) -> bool:
+        '''
+        Replace the entries of a source and save the index if they have changed.
+
+        Returns:
+            Whether the index has changed.
+        '''
+        with self._lock:
+            self._refresh()
+            if self._sources.get(source, []) == entries:
+                return False
+            if entries:
+                self._sources[source] = entries
+            else:
+                self._sources.pop(source, None)
+            self._index()
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            data = {"sources": {name: [asdict(entry) for entry in items] for name, items in self._sources.items()}}
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+            self._version = self.path.stat().st_mtime_ns
+            return True
+
+    def lookup(self, term: str) -> Optional[GlossaryEntry]:
+        '''
+        Return the entry of a term (abbreviation, name or alias), also asked as a question ("What does BPM mean?").
+        A phrase is only matched as a whole, e.g. "defensive rating" does not match "rating".
+        '''
+        with self._lock:
+            self._refresh()
+            entry = self._terms.get(normalize_term(term))
+            if entry is None:
+                entry = self._terms.get(normalize_term(QUESTION.sub("", term.strip().rstrip("?").strip())))
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._terms)
+
+class GlossaryTools(Toolkit):
+    '''
+    Lookup of stat terms in the glossary index, before the search in the knowledge base.
+    '''
+
+    def __init__(self, index: Optional["GlossaryIndex"] = None, **kwargs):
+        '''
+        Args:
+            index: The glossary index. Defaults to the shared index of the ingestion.
+        '''
+        self.index = index or glossary_index
+        super().__init__(
+            name="glossary_tools",
+            tools=[self.lookup_stat_definition],
+            instructions=(
+                "To explain a stat abbreviation or term (e.g. TS%, BPM, usage rate), call `lookup_stat_definition` first. "
+                "Search the knowledge base only if the glossary has no entry for it."
+            ),
+            add_instructions=True,
+            **kwargs,
+        )
+
+    def lookup_stat_definition(self, term: str) -> str:
+        '''
+        Use this function to get the definition and formula of a basketball stat from the glossary.
+
+        Args:
+            term (str): Abbreviation or name of the stat, e.g. "TS%", "DBPM" or "usage rate".
+
+        Returns:
+            str: The definition and formula of the stat, or a note to search the knowledge base.
+        '''
+        entry = self.index.lookup(term)
+        if entry is None:
+            return f"No glossary entry for '{term}'. Search the knowledge base instead."
+        return entry.format()
+
+# Index shared by the agents, the team and the ingestion
+glossary_index = GlossaryIndex()
+metrics.register_collector("glossary", lambda: {"hits": glossary_index.hits, "misses": glossary_index.misses})
@@ -0,0 +1,360 @@
+'''
+This module ingests web pages and local documents into the knowledge base, as a command separate from the server.
+Pages are crawled with bounded concurrency, local documents (PDF, Markdown, text) are read in bulk.
+Every source is recorded in the contents DB of the knowledge base (knowledge_base.db) with the hash of its text
+and of its chunks: unchanged sources are skipped, and only the new chunks of changed sources are embedded, in batches.
+The stat terms of the sources are indexed in the glossary index (src/utils/glossary.py).
+
+Run `python src/utils/kb_ingest.py --help` to ingest the sources.
+'''
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+
+# Add src to path when the module is executed as a script
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from agno.db.schemas.knowledge import KnowledgeRow
+from agno.knowledge.chunking.recursive import RecursiveChunking
+from agno.knowledge.content import ContentStatus
+from agno.knowledge.document.base import Document
+from agno.knowledge.knowledge import Knowledge
+from agno.vectordb.qdrant import Qdrant
+from qdrant_client import models
+
+from utils.logger import get_logger
+from utils.glossary import GlossaryIndex, glossary_index, parse_glossary
+from utils.async_io import fetch_text, run_in_process, close as close_async_executors
+from utils.config import (
+    KB_SOURCE_URLS,
+    KB_DOCS_DIR,
+    KB_CRAWL_MAX_DEPTH,
+    KB_CRAWL_MAX_LINKS,
+    KB_CRAWL_CONCURRENCY,
+    KB_CHUNK_SIZE,
+    )
+
+import typer
+app = typer.Typer()
+
+# Initialize logger
+logger = get_logger()
+
+# File types of the local documents
+DOCUMENT_SUFFIXES = {".pdf", ".md", ".markdown", ".txt"}
+
+@dataclass
+class Source:
+    '''
+    A web page or local document to ingest.
+    '''
+    name: str
+    text: str
+    type: str
+
+def content_hash(text: str) -> str:
+    '''
+    Hash of a text, used to detect unchanged sources and chunks.
+    '''
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+def extract_page(html: str, url: str) -> Tuple[str, List[str]]:
+    '''
+    Extract the visible text of a page and the links to other pages of the same site.
+    '''
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "svg", "nav", "footer"]):
+        tag.decompose()
+
+    lines = (line.strip() for line in soup.get_text("\n").splitlines())
+    text = "\n".join(line for line in lines if line)
+
+    site = urlparse(url).netloc
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        link = urldefrag(urljoin(url, anchor["href"]))[0]
+        if urlparse(link).scheme in ("http", "https") and urlparse(link).netloc == site:
+            links.append(link)
+
+    return text, links
+
+def read_document(path: str) -> str:
+    '''
+    Read the text of a local document.
+    '''
+    if path.lower().endswith(".pdf"):
+        from pypdf import PdfReader
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+    return Path(path).read_text(encoding="utf-8", errors="replace")
+
+async def crawl(
+        urls: List[str],
+        max_depth: int = KB_CRAWL_MAX_DEPTH,
+        max_links: int = KB_CRAWL_MAX_LINKS,
+        concurrency: int = KB_CRAWL_CONCURRENCY,
+        ) -> List[Source]:
+    '''
+    Crawl the pages linked from the start urls, level by level.
+
+    Args:
+        urls: The start urls.
+        max_depth: Number of link levels followed from the start urls.
+        max_links: Maximum number of pages crawled per start url.
+        concurrency: Maximum number of pages fetched at the same time.
+    '''
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str) -> Optional[Tuple[str, List[str]]]:
+        async with semaphore:
+            try:
+                html = await fetch_text(url)
+            except Exception as e:
+                logger.warning(f"Failed to fetch {url}: {e}")
+                return None
+        return await run_in_process(extract_page, html, url)
+
+    sources: List[Source] = []
+    seen = set(urls)
+    level = list(urls)
+    budget = max_links * len(urls)
+
+    for depth in range(max_depth + 1):
+        pages = await asyncio.gather(*(fetch(url) for url in level))
+        next_level = []
+        for url, page in zip(level, pages):
+            if page is None:
+                continue
+            text, links = page
+            sources.append(Source(name=url, text=text, type="url"))
+            for link in links:
+                if link not in seen and len(seen) < budget:
+                    seen.add(link)
+                    next_level.append(link)
+
+        if depth == max_depth or not next_level:
+            break
+        level = next_level
+
+    return sources
+
+async def read_documents(paths: List[str]) -> List[Source]:
+    '''
+    Read the local documents of the given files and directories (searched recursively).
+    '''
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in DOCUMENT_SUFFIXES))
+        elif path.suffix.lower() in DOCUMENT_SUFFIXES:
+            files.append(path)
+
+    texts = await asyncio.gather(*(run_in_process(read_document, str(file)) for file in files))
+    return [Source(name=str(file.resolve()), text=text, type="file") for file, text in zip(files, texts)]
+
+class KnowledgeIngestor:
+    '''
+    Incremental ingestion of sources into a knowledge base, tracked in its contents DB.
+    '''
+
+    def __init__(self, knowledge: Knowledge, chunk_size: int = KB_CHUNK_SIZE, glossary: Optional[GlossaryIndex] = None):
+        '''
+        Args:
+            knowledge: The knowledge base, with a vector DB and a contents DB.
+            chunk_size: Maximum number of characters of a chunk.
+            glossary: Glossary index updated with the stat terms of the sources.
+        '''
+        self.knowledge = knowledge
+        self.glossary = glossary
+        self.vector_db = knowledge.vector_db
+        self.contents_db = knowledge.contents_db
+        self.chunking = RecursiveChunking(chunk_size=chunk_size)
+
+    def _chunks(self, source: Source, content_id: str) -> List[Document]:
+        document = Document(name=source.name, content=source.text, meta_data={"source": source.name})
+        chunks = {}
+        for chunk in self.chunking.chunk(document):
+            chunk_hash = content_hash(chunk.content)
+            chunk.id = f"{content_id}-{chunk_hash}"
+            chunk.content_id = content_id
+            chunk.meta_data = {"source": source.name, "type": source.type, "chunk_hash": chunk_hash}
+            chunks.setdefault(chunk_hash, chunk)
+
+        return list(chunks.values())
+
+    def _delete_chunks(self, source_name: str, chunk_hashes: List[str]) -> None:
+        '''
+        Delete the chunks of a source with one call, i.e. one new version of the local vector DB files.
+        '''
+        if isinstance(self.vector_db, Qdrant):
+            # delete_by_metadata of Qdrant only matches single values
+            self.vector_db.client.delete(
+                collection_name=self.vector_db.collection,
+                points_selector=models.Filter(must=[
+                    models.FieldCondition(key="meta_data.source", match=models.MatchValue(value=source_name)),
+                    models.FieldCondition(key="meta_data.chunk_hash", match=models.MatchAny(any=chunk_hashes)),
+                ]),
+                wait=True,
+            )
+        else:
+            self.vector_db.delete_by_metadata({"source": source_name, "chunk_hash": chunk_hashes})
+
+    async def ingest(self, sources: List[Source]) -> Dict[str, Any]:
+        '''
+        Ingest the sources and return the ingestion stats, with the throughput in docs/sec and embedded chunks/sec.
+        '''
+        start = time.perf_counter()
+        stats = {"docs": 0, "docs_unchanged": 0, "chunks_embedded": 0, "chunks_kept": 0, "chunks_deleted": 0}
+        await asyncio.to_thread(self.vector_db.create)
+
+        changed: List[Tuple[Source, str, KnowledgeRow, List[Document]]] = []
+        for source in sources:
+            if not source.text.strip():
+                continue
+            stats["docs"] += 1
+            content_id = hashlib.md5(source.name.encode()).hexdigest()
+            source_hash = content_hash(source.text)
+
+            row = self.contents_db.get_knowledge_content(content_id)
+            metadata = (row.metadata or {}) if row is not None else {}
+            if metadata.get("content_hash") == source_hash and row.status == ContentStatus.COMPLETED:
+                stats["docs_unchanged"] += 1
+                continue
+
+            chunks = self._chunks(source, content_id)
+            known = set(metadata.get("chunk_hashes", []))
+            new_chunks = [chunk for chunk in chunks if chunk.meta_data["chunk_hash"] not in known]
+            removed = known - {chunk.meta_data["chunk_hash"] for chunk in chunks}
+
+            stats["chunks_kept"] += len(chunks) - len(new_chunks)
+            stats["chunks_deleted"] += len(removed)
+            if removed:
+                await asyncio.to_thread(self._delete_chunks, source.name, sorted(removed))
+
+            now = int(time.time())
+            row = KnowledgeRow(
+                id=content_id,
+                name=source.name,
+                description=f"Ingested {source.type}",
+                metadata={
+                    "source": source.name,
+                    "content_hash": source_hash,
+                    "chunk_hashes": [chunk.meta_data["chunk_hash"] for chunk in chunks],
+                },
+                type=source.type,
+                size=len(source.text),
+                status=ContentStatus.COMPLETED,
+                created_at=row.created_at if row is not None else now,
+                updated_at=now,
+            )
+            changed.append((source, source_hash, row, new_chunks))
+
+        # The new chunks of all sources are embedded together, in as few API calls as possible
+        new_chunks = [chunk for _, _, _, chunks in changed for chunk in chunks]
+        embedder = self.vector_db.embedder
+        stats["embed_batches"] = await embedder.aprefetch([chunk.content for chunk in new_chunks]) if hasattr(embedder, "aprefetch") else 0
+
+        try:
+            for source, source_hash, row, chunks in changed:
+                if chunks:
+                    await asyncio.to_thread(self.vector_db.insert, source_hash, chunks)
+                self.contents_db.upsert_knowledge_content(row)
+                stats["chunks_embedded"] += len(chunks)
+                logger.info(f"Ingested {source.name}: {len(chunks)} new chunks")
+        finally:
+            # The embeddings of chunks which were not inserted, e.g. after an error, are not kept
+            if hasattr(embedder, "clear_prefetched"):
+                embedder.clear_prefetched()
+
+        # The cached search results of the knowledge base are outdated
+        if (changed or stats["chunks_deleted"]) and hasattr(self.knowledge, "clear_cache"):
+            self.knowledge.clear_cache()
+
+        if self.glossary is not None:
+            for source in sources:
+                if source.text.strip():
+                    self.glossary.update(source.name, parse_glossary(source.text, source.name))
+            stats["glossary_terms"] = len(self.glossary)
+
+        duration = time.perf_counter() - start
+        stats["duration_s"] = round(duration, 2)
+        stats["docs_per_sec"] = round(stats["docs"] / duration, 1) if duration else 0.0
+        stats["chunks_per_sec"] = round(stats["chunks_embedded"] / duration, 1) if duration else 0.0
+        return stats
+
+async def ingest_sources(
+        knowledge: Knowledge,
+        urls: List[str],
+        paths: List[str],
+        max_depth: int = KB_CRAWL_MAX_DEPTH,
+        max_links: int = KB_CRAWL_MAX_LINKS,
+        concurrency: int = KB_CRAWL_CONCURRENCY,
+        ) -> Dict[str, Any]:
+    '''
+    Crawl the urls, read the local documents and ingest them into the knowledge base.
+    '''
+    start = time.perf_counter()
+    try:
+        sources = await crawl(urls, max_depth, max_links, concurrency) if urls else []
+        sources += await read_documents(paths)
+    finally:
+        await close_async_executors()
+    read_s = time.perf_counter() - start
+
+    stats = await KnowledgeIngestor(knowledge, glossary=glossary_index).ingest(sources)
+    stats["read_s"] = round(read_s, 2)
+    return stats
+
+def start_ingestion_process() -> subprocess.Popen:
+    '''
+    Run the ingestion command in the background, so that the server starts without waiting for it.
+    '''
+    logger.info("Started the knowledge base ingestion in the background")
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__)])
+
+@app.command()
+def ingest(
+    urls: List[str] = typer.Option(
+        KB_SOURCE_URLS,
+        "--url",
+        help="Start url of the crawl, can be repeated."
+        ),
+    paths: List[str] = typer.Option(
+        [KB_DOCS_DIR],
+        "--path",
+        help="Local document or directory of documents (PDF, Markdown, text), can be repeated."
+        ),
+    max_depth: int = typer.Option(
+        KB_CRAWL_MAX_DEPTH,
+        help="Number of link levels followed from the start urls."
+        ),
+    max_links: int = typer.Option(
+        KB_CRAWL_MAX_LINKS,
+        help="Maximum number of pages crawled per start url."
+        ),
+    concurrency: int = typer.Option(
+        KB_CRAWL_CONCURRENCY,
+        help="Maximum number of pages fetched at the same time."
+        ),
+):
+    '''
+    Ingest the web pages and local documents into the knowledge base, skipping unchanged sources.
+    '''
+    from utils.knowledge_base import create_knowledge_base
+
+    knowledge = create_knowledge_base(COLLECTION_NAME="basketball_knowledge")
+    stats = asyncio.run(ingest_sources(knowledge, urls, paths, max_depth, max_links, concurrency))
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    app()
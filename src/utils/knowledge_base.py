@@ -1,13 +1,381 @@
-from agno.agent import Agent
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.knowledge.document import Document
+from agno.knowledge.embedder import Embedder
 from agno.knowledge.knowledge import Knowledge
 from agno.vectordb.qdrant import Qdrant
 
+from utils.metrics import PHASE_LATENCY, metrics
 from utils.config import (
-    get_llm_config, 
-    sqlite_db, 
-    Qdrant_URL
+    sqlite_db,
+    Qdrant_URL,
+    KB_EMBEDDER,
+    KB_VECTOR_BACKEND,
+    KB_EMBED_BATCH_SIZE,
+    KB_EMBED_BATCH_WINDOW_MS,
+    KB_RETRIEVAL_CACHE,
+    KB_RETRIEVAL_CACHE_SIZE,
+    KB_RETRIEVAL_CACHE_TTL,
+    KB_RETRIEVAL_VERSION_TTL,
     )
 
+@dataclass
+class HashingEmbedder(Embedder):
+    '''
+    Local embedder hashing the words and character trigrams of a text, without API calls.
+    It only matches texts with the same wording, e.g. for offline runs, benchmarks and the semantic cache.
+    '''
+    dimensions: Optional[int] = 512
+
+    def get_embedding(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        padded = f" {text} "
+        features = text.split() + [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.dimensions] += 1.0
+
+        return vector.tolist()
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+def get_embedder(name: str = KB_EMBEDDER) -> Embedder:
+    '''
+    Return the embedder of the knowledge base: "openai" or "hashing" (local).
+    '''
+    if name == "hashing":
+        return HashingEmbedder()
+
+    from agno.knowledge.embedder.openai import OpenAIEmbedder
+    return OpenAIEmbedder()
+
+@dataclass
+class BatchingEmbedder(Embedder):
+    '''
+    Embedder wrapper that embeds texts in batches, one API call per batch:
+    - ahead of use, e.g. the new chunks of an ingestion run. The prefetched embeddings are served once,
+      the unused ones are dropped by `clear_prefetched`.
+    - for concurrent queries, e.g. the knowledge searches of simultaneous sessions, which are collected
+      for batch_window_ms. Identical queries in flight share one embedding.
+    The embeddings of the queries are kept in an LRU cache, other texts are embedded by the wrapped embedder.
+    '''
+    embedder: Optional[Embedder] = None
+    batch_size: int = KB_EMBED_BATCH_SIZE
+    batch_window_ms: int = KB_EMBED_BATCH_WINDOW_MS
+    cache_size: int = KB_RETRIEVAL_CACHE_SIZE
+    _prefetched: Dict[str, List[float]] = field(default_factory=dict, init=False, repr=False)
+    _cache: "OrderedDict[str, List[float]]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _pending: Dict[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]] = field(default_factory=dict, init=False, repr=False)
+    _stats: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    # The sync embeddings run in the threads of the vector DB calls
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.embedder is None:
+            self.embedder = get_embedder()
+        self.dimensions = self.embedder.dimensions
+        self._stats.update(embed_calls=0, embedded_texts=0, cache_hits=0)
+
+    def _count(self, texts: int) -> None:
+        with self._lock:
+            self._stats["embed_calls"] += 1
+            self._stats["embedded_texts"] += texts
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        '''
+        Embed the texts with one API call if the wrapped embedder supports it.
+        '''
+        self._count(len(texts))
+        if hasattr(self.embedder, "async_get_embeddings_batch_and_usage"):
+            embeddings, _ = await self.embedder.async_get_embeddings_batch_and_usage(texts)
+            return embeddings
+        return await asyncio.gather(*(self.embedder.async_get_embedding(text) for text in texts))
+
+    async def aprefetch(self, texts: List[str]) -> int:
+        '''
+        Embed the texts in batches and keep the embeddings until they are used.
+
+        Returns:
+            The number of batches, i.e. of embedding API calls.
+        '''
+        with self._lock:
+            missing = [text for text in dict.fromkeys(texts) if text not in self._prefetched]
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+
+        for batch in batches:
+            embeddings = await self._embed_batch(batch)
+            with self._lock:
+                self._prefetched.update(
+                    (text, embedding) for text, embedding in zip(batch, embeddings) if embedding
+                )
+
+        return len(batches)
+
+    def clear_prefetched(self) -> int:
+        '''
+        Drop the prefetched embeddings which were not used, e.g. at the end of an ingestion run.
+
+        Returns:
+            The number of dropped embeddings.
+        '''
+        with self._lock:
+            dropped = len(self._prefetched)
+            self._prefetched.clear()
+        return dropped
+
+    def _cached(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            if text in self._prefetched:
+                return self._prefetched.pop(text)
+            embedding = self._cache.get(text)
+            if embedding is not None:
+                self._cache.move_to_end(text)
+                self._stats["cache_hits"] += 1
+            return embedding
+
+    def _remember(self, text: str, embedding: List[float]) -> None:
+        if embedding and self.cache_size > 0:
+            with self._lock:
+                self._cache[text] = embedding
+                self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        '''
+        Embed the queries collected on the loop with one API call.
+        '''
+        batch = self._pending.pop(loop, None)
+        if not batch:
+            return
+
+        async def embed() -> None:
+            try:
+                embeddings = await self._embed_batch(list(batch))
+            except Exception as e:
+                for future in batch.values():
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (text, future), embedding in zip(batch.items(), embeddings):
+                self._remember(text, embedding)
+                if not future.done():
+                    future.set_result(embedding)
+
+        loop.create_task(embed())
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        embedding = self._cached(text)
+        if embedding is not None:
+            return embedding, None
+
+        self._count(1)
+        embedding, usage = self.embedder.get_embedding_and_usage(text)
+        self._remember(text, embedding)
+        return embedding, usage
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embedding_and_usage(text))[0]
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        embedding = self._cached(text)
+        if embedding is not None:
+            return embedding, None
+
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = self._pending[loop] = {}
+            loop.call_later(self.batch_window_ms / 1000, self._flush, loop)
+
+        future = batch.get(text)
+        if future is None:
+            future = batch[text] = loop.create_future()
+            if len(batch) >= self.batch_size:
+                self._flush(loop)
+
+        # A cancelled search must not cancel the embedding shared with other searches
+        return await asyncio.shield(future), None
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Number of embedding API calls, of embedded texts and of cached query embeddings served.
+        '''
+        with self._lock:
+            return {**self._stats, "cached_embeddings": len(self._cache), "prefetched_embeddings": len(self._prefetched)}
+
+@dataclass
+class TimedKnowledge(Knowledge):
+    '''
+    Knowledge base observing the duration of the searches of the vector DB.
+    '''
+
+    def search(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        filters: Optional[Any] = None,
+        search_type: Optional[str] = None,
+    ) -> List[Document]:
+        with PHASE_LATENCY.time(phase="knowledge_search"):
+            return super().search(query, max_results, filters, search_type)
+
+    async def asearch(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        filters: Optional[Any] = None,
+        search_type: Optional[str] = None,
+    ) -> List[Document]:
+        with PHASE_LATENCY.time(phase="knowledge_search"):
+            return await super().asearch(query, max_results, filters, search_type)
+
+@dataclass
+class CachedKnowledge(TimedKnowledge):
+    '''
+    Knowledge base memoizing the top-k results of the searches in an LRU cache with a TTL.
+    The cache is cleared when the collection changes, i.e. when contents are ingested or removed.
+    The version of the collection is checked at most every version_ttl seconds, and `clear_cache`
+    is called by the ingestion of the same process. Only the searches of the vector DB, i.e. the cache misses, are timed.
+    '''
+    cache_size: int = KB_RETRIEVAL_CACHE_SIZE
+    cache_ttl: int = KB_RETRIEVAL_CACHE_TTL
+    version_ttl: float = KB_RETRIEVAL_VERSION_TTL
+
+    def __post_init__(self):
+        super().__post_init__()
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple] = None
+        self._version_checked_at = float("-inf")
+        self._results: "OrderedDict[Tuple, Tuple[float, List[Document]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def _collection_version(self) -> Tuple:
+        '''
+        Version of the collection: the number of contents and their last update in the contents DB,
+        and the version of the vector DB if it has one.
+        '''
+        version = getattr(self.vector_db, "version", None)
+        if self.contents_db is None:
+            return (version,)
+        rows, count = self.contents_db.get_knowledge_contents(limit=1, page=1, sort_by="updated_at", sort_order="desc")
+        return (count, rows[0].updated_at if rows else None, version)
+
+    def _key(self, query: str, max_results: Optional[int], filters: Any, search_type: Optional[str]) -> Tuple:
+        return (
+            " ".join(query.lower().split()),
+            max_results or self.max_results,
+            json.dumps(filters, sort_keys=True, default=str),
+            search_type,
+        )
+
+    def _version_due(self) -> bool:
+        return time.monotonic() - self._version_checked_at >= self.version_ttl
+
+    def _set_version(self, version: Tuple) -> None:
+        with self._lock:
+            if version != self._version:
+                self._results.clear()
+                self._version = version
+            self._version_checked_at = time.monotonic()
+
+    def clear_cache(self) -> None:
+        '''
+        Clear the cached results, e.g. after contents were ingested or removed.
+        '''
+        with self._lock:
+            self._results.clear()
+            self._version_checked_at = float("-inf")
+
+    def _get(self, key: Tuple) -> Optional[List[Document]]:
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and time.time() - entry[0] < self.cache_ttl:
+                self._results.move_to_end(key)
+                self._hits += 1
+                return list(entry[1])
+
+            self._misses += 1
+            return None
+
+    def _put(self, key: Tuple, documents: List[Document]) -> None:
+        # Empty results are not cached: the search also returns them on errors
+        if not documents or self.cache_size <= 0:
+            return
+        with self._lock:
+            self._results[key] = (time.time(), list(documents))
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+    def search(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        filters: Optional[Any] = None,
+        search_type: Optional[str] = None,
+    ) -> List[Document]:
+        key = self._key(query, max_results, filters, search_type)
+        if self._version_due():
+            self._set_version(self._collection_version())
+        documents = self._get(key)
+        if documents is None:
+            documents = super().search(query, max_results, filters, search_type)
+            self._put(key, documents)
+        return documents
+
+    async def asearch(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        filters: Optional[Any] = None,
+        search_type: Optional[str] = None,
+    ) -> List[Document]:
+        key = self._key(query, max_results, filters, search_type)
+        if self._version_due():
+            # The contents DB is a sync SQLite query, it must not block the event loop
+            self._set_version(await asyncio.to_thread(self._collection_version))
+        documents = self._get(key)
+        if documents is None:
+            documents = await super().asearch(query, max_results, filters, search_type)
+            self._put(key, documents)
+        return documents
+
+    def stats(self) -> Dict[str, Any]:
+        '''
+        Hits and misses of the search results cache, and the embedding stats of the embedder.
+        '''
+        with self._lock:
+            stats = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / (self._hits + self._misses), 3) if self._hits + self._misses else 0.0,
+                "cached_results": len(self._results),
+            }
+        embedder = getattr(self.vector_db, "embedder", None)
+        if hasattr(embedder, "stats"):
+            stats["embedder"] = embedder.stats()
+        return stats
+
 def create_knowledge_base(COLLECTION_NAME: str = "basketball_knowledge") -> Knowledge:
     '''
     This function creates a knowledge base for the agent.
@@ -24,16 +392,27 @@ def create_knowledge_base(COLLECTION_NAME: str = "basketball_knowledge") -> Know
                         db_path="knowledge_base.db"
                         )
 
-    # Initialize Qdrant with local instance
-    vector_db = Qdrant(
-        collection=COLLECTION_NAME, 
-        url=Qdrant_URL
-    )
+    # Initialize the vector DB, in process or the Qdrant server
+    if KB_VECTOR_BACKEND == "local":
+        from utils.local_vectordb import LocalVectorDb
+        vector_db = LocalVectorDb(
+            collection=COLLECTION_NAME,
+            embedder=BatchingEmbedder(),
+        )
+    else:
+        vector_db = Qdrant(
+            collection=COLLECTION_NAME,
+            url=Qdrant_URL,
+            embedder=BatchingEmbedder(),
+        )
 
-    # Create knowledge base
-    knowledge_base = Knowledge(
+    # Create knowledge base, with the retrieval cache in front of the searches
+    knowledge_class = CachedKnowledge if KB_RETRIEVAL_CACHE == "true" else TimedKnowledge
+    knowledge_base = knowledge_class(
         vector_db=vector_db,
         contents_db=contents_db,
     )
+    if isinstance(knowledge_base, CachedKnowledge):
+        metrics.register_collector("knowledge_cache", knowledge_base.stats)
 
     return knowledge_base
@@ -0,0 +1,283 @@
+'''
+This module provides the shared HTTP clients of the LLM providers.
+The models of all agents and of the team use one HTTP client per provider and process (keep-alive, HTTP/2,
+pool limits), with a limit of the model calls in flight and timeouts configured per provider:
+LLM_MAX_CONCURRENCY, LLM_MAX_CONNECTIONS, LLM_TIMEOUT, ... and LLM_PROVIDER_LIMITS for the overrides of a provider.
+'''
+import os
+import asyncio
+import threading
+import importlib
+import importlib.util
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from types import ModuleType
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from utils.logger import get_logger
+from utils.metrics import TimedModelMixin, metrics
+from utils.config import (
+    LLM_HTTP2,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_TIMEOUT,
+    LLM_CONNECT_TIMEOUT,
+    LLM_PROVIDER_LIMITS,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    '''
+    Limits and timeouts of the HTTP client of a provider.
+    '''
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+    max_connections: int = LLM_MAX_CONNECTIONS
+    max_keepalive: int = LLM_MAX_KEEPALIVE
+    keepalive_expiry: float = LLM_KEEPALIVE_EXPIRY
+    timeout: float = LLM_TIMEOUT
+    connect_timeout: float = LLM_CONNECT_TIMEOUT
+    http2: bool = LLM_HTTP2 == "true"
+
+def get_provider_limits(provider: str) -> ProviderLimits:
+    '''
+    Limits of a provider: the defaults, overridden by its entry in LLM_PROVIDER_LIMITS.
+    '''
+    return ProviderLimits(**LLM_PROVIDER_LIMITS.get(provider, {}))
+
+def get_http_module(provider: str) -> ModuleType:
+    '''
+    HTTP package of the SDK of a provider: httpx, or httpx2 for the SDK versions built on it.
+    '''
+    sdk = importlib.import_module(f"{'anthropic' if provider == 'anthropic' else 'openai'}._base_client")
+    return getattr(sdk, "httpx2", None) or getattr(sdk, "httpx")
+
+def get_running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    '''
+    Return the running event loop, None outside of a coroutine.
+    '''
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+class LLMClientRegistry:
+    '''
+    One sync HTTP client per provider and one async HTTP client per provider and event loop, created on first use
+    in every process, and the limit of the model calls in flight per provider.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._async_clients: Dict[Tuple[str, Optional[asyncio.AbstractEventLoop]], Any] = {}
+        self._sync_clients: Dict[str, Any] = {}
+        self._async_slots: Dict[Tuple[str, Optional[asyncio.AbstractEventLoop]], asyncio.Semaphore] = {}
+        self._sync_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _reset_after_fork(self) -> None:
+        '''
+        The connections of the parent process are not shared with a forked worker, and the async clients and slots
+        of a closed event loop (e.g. of a previous `asyncio.run`) cannot be used again. Must be called with the lock held.
+        '''
+        if self._pid != os.getpid():
+            self._async_clients, self._sync_clients = {}, {}
+            self._async_slots, self._sync_slots = {}, {}
+            self._stats = {}
+            self._pid = os.getpid()
+
+        for entries in (self._async_clients, self._async_slots):
+            for key in [key for key in entries if key[1] is not None and key[1].is_closed()]:
+                del entries[key]
+
+    def _create_client(self, provider: str, asynchronous: bool) -> Any:
+        http = get_http_module(provider)
+        limits = get_provider_limits(provider)
+        http2 = limits.http2 and asynchronous and importlib.util.find_spec("h2") is not None
+        if limits.http2 and asynchronous and not http2:
+            logger.warning(f"HTTP/2 needs the h2 package, the {provider} client uses HTTP/1.1")
+
+        client_class = http.AsyncClient if asynchronous else http.Client
+        return client_class(
+            http2=http2,
+            limits=http.Limits(
+                max_connections=limits.max_connections,
+                max_keepalive_connections=limits.max_keepalive,
+                keepalive_expiry=limits.keepalive_expiry,
+            ),
+            timeout=http.Timeout(limits.timeout, connect=limits.connect_timeout),
+            follow_redirects=True,
+        )
+
+    def async_client(self, provider: str) -> Any:
+        '''
+        Shared async HTTP client of a provider on the running event loop, its connections are bound to the loop.
+        '''
+        key = (provider, get_running_loop())
+        with self._lock:
+            self._reset_after_fork()
+            client = self._async_clients.get(key)
+            if client is None or client.is_closed:
+                client = self._async_clients[key] = self._create_client(provider, asynchronous=True)
+            return client
+
+    def sync_client(self, provider: str) -> Any:
+        '''
+        Shared sync HTTP client of a provider (HTTP/1.1, HTTP/2 is only used by the async client).
+        '''
+        with self._lock:
+            self._reset_after_fork()
+            client = self._sync_clients.get(provider)
+            if client is None or client.is_closed:
+                client = self._sync_clients[provider] = self._create_client(provider, asynchronous=False)
+            return client
+
+    def _count(self, provider: str, delta: int) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(provider, {"calls": 0, "in_flight": 0, "max_in_flight": 0})
+            stats["calls"] += max(delta, 0)
+            stats["in_flight"] += delta
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    @asynccontextmanager
+    async def aslot(self, provider: str) -> AsyncIterator[None]:
+        '''
+        Wait for a free slot of the provider for an async model call, the slots are counted per event loop.
+        '''
+        key = (provider, get_running_loop())
+        with self._lock:
+            self._reset_after_fork()
+            if key not in self._async_slots:
+                self._async_slots[key] = asyncio.Semaphore(get_provider_limits(provider).max_concurrency)
+            semaphore = self._async_slots[key]
+        async with semaphore:
+            self._count(provider, 1)
+            try:
+                yield
+            finally:
+                self._count(provider, -1)
+
+    @contextmanager
+    def slot(self, provider: str) -> Iterator[None]:
+        '''
+        Wait for a free slot of the provider for a sync model call.
+        '''
+        with self._lock:
+            self._reset_after_fork()
+            if provider not in self._sync_slots:
+                self._sync_slots[provider] = threading.BoundedSemaphore(get_provider_limits(provider).max_concurrency)
+            semaphore = self._sync_slots[provider]
+        with semaphore:
+            self._count(provider, 1)
+            try:
+                yield
+            finally:
+                self._count(provider, -1)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        '''
+        Model calls, calls in flight and open connections per provider.
+        '''
+        with self._lock:
+            stats = {provider: dict(counts) for provider, counts in self._stats.items()}
+            async_clients = [(provider, client) for (provider, _), client in self._async_clients.items()]
+            sync_clients = list(self._sync_clients.items())
+            for kind, clients in (("async_connections", async_clients), ("sync_connections", sync_clients)):
+                for provider, client in clients:
+                    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+                    connections = stats.setdefault(provider, {}).get(kind) or 0
+                    stats[provider][kind] = connections + len(pool.connections) if pool is not None else None
+            for provider in stats:
+                stats[provider]["limits"] = asdict(get_provider_limits(provider))
+        return stats
+
+    async def aclose(self) -> None:
+        '''
+        Close the clients of the process, the async clients of other event loops are dropped.
+        '''
+        loop = get_running_loop()
+        with self._lock:
+            async_clients = [client for (_, client_loop), client in self._async_clients.items() if client_loop is loop]
+            self._async_clients = {}
+            sync_clients, self._sync_clients = list(self._sync_clients.values()), {}
+        for client in async_clients:
+            await client.aclose()
+        for client in sync_clients:
+            client.close()
+
+# Clients shared by the models of all agents and of the team
+llm_clients = LLMClientRegistry()
+metrics.register_collector("llm_clients", llm_clients.stats)
+
+class PooledClientMixin:
+    '''
+    Model mixin creating the SDK clients of the model on the shared HTTP clients of its provider,
+    and waiting for a free slot of the provider before every call.
+    '''
+    provider_pool: str = "openai"
+    _client_lock = threading.Lock()
+
+    def _timeout(self) -> None:
+        if self.timeout is None:
+            self.timeout = get_provider_limits(self.provider_pool).timeout
+
+    def get_client(self):
+        with self._client_lock:
+            if self.client is not None and not self.client.is_closed():
+                return self.client
+            self._timeout()
+            self.http_client = llm_clients.sync_client(self.provider_pool)
+            try:
+                return super().get_client()
+            finally:
+                self.http_client = None
+
+    def get_async_client(self):
+        with self._client_lock:
+            http_client = llm_clients.async_client(self.provider_pool)
+            # The SDK client is built again on the client of a new event loop
+            if (self.async_client is not None and not self.async_client.is_closed()
+                    and getattr(self.async_client, "_client", None) is http_client):
+                return self.async_client
+            self._timeout()
+            self.async_client = None
+            self.http_client = http_client
+            try:
+                return super().get_async_client()
+            finally:
+                self.http_client = None
+
+    def invoke(self, *args, **kwargs):
+        with llm_clients.slot(self.provider_pool):
+            return super().invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        async with llm_clients.aslot(self.provider_pool):
+            return await super().ainvoke(*args, **kwargs)
+
+    def invoke_stream(self, *args, **kwargs):
+        with llm_clients.slot(self.provider_pool):
+            yield from super().invoke_stream(*args, **kwargs)
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        async with llm_clients.aslot(self.provider_pool):
+            async for response in super().ainvoke_stream(*args, **kwargs):
+                yield response
+
+@lru_cache(maxsize=None)
+def pooled(model_class: type, provider: str) -> type:
+    '''
+    Subclass of a model class using the shared HTTP clients and the concurrency limit of the provider.
+    The calls are timed once they have a slot, the wait for a slot is not counted.
+
+    Args:
+        model_class: The agno model class, e.g. OpenAIResponses.
+        provider: Name of the provider in LLM_PROVIDER_LIMITS: "openai", "anthropic" or "azure".
+    '''
+    return type(f"Pooled{model_class.__name__}", (PooledClientMixin, TimedModelMixin, model_class), {"provider_pool": provider})
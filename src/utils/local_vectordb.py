@@ -0,0 +1,313 @@
+'''
+This module provides an in-process vector database for the knowledge base, as an alternative to the Qdrant server.
+The normalized embeddings are stored in a NumPy file that is memory-mapped by every reader, so the server workers
+share one copy in the page cache, and the documents in a JSON lines file next to it. Searches are exact
+(brute-force cosine similarity), which is fast for collections of the size of the stat glossaries.
+
+Layout:
+    <KB_LOCAL_VECTOR_DIR>/<collection>/manifest.json
+    <KB_LOCAL_VECTOR_DIR>/<collection>/vectors-<version>.npy
+    <KB_LOCAL_VECTOR_DIR>/<collection>/records-<version>.jsonl
+
+Writes replace the files of a new version and then the manifest, readers reload when the manifest changes.
+'''
+import os
+import json
+import time
+import asyncio
+import threading
+from hashlib import md5
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import portalocker
+from agno.knowledge.document import Document
+from agno.knowledge.embedder import Embedder
+from agno.knowledge.reranker.base import Reranker
+from agno.vectordb.base import VectorDb
+
+from utils.logger import get_logger
+from utils.config import KB_LOCAL_VECTOR_DIR
+
+# Initialize logger
+logger = get_logger()
+
+class LocalVectorDb(VectorDb):
+    '''
+    Vector database persisted in a memory-mapped NumPy file, with the interface of the agno vector databases.
+    '''
+
+    def __init__(
+            self,
+            collection: str,
+            embedder: Optional[Embedder] = None,
+            path: str = KB_LOCAL_VECTOR_DIR,
+            reranker: Optional[Reranker] = None,
+            **kwargs: Any,
+            ):
+        '''
+        Args:
+            collection: Name of the collection, i.e. of its directory.
+            embedder: Embedder of the documents and queries. Defaults to the OpenAI embedder.
+            path: Root directory of the collections.
+            reranker: Optional reranker of the search results.
+        '''
+        super().__init__(**kwargs)
+        if embedder is None:
+            from agno.knowledge.embedder.openai import OpenAIEmbedder
+            embedder = OpenAIEmbedder()
+
+        self.collection = collection
+        self.embedder = embedder
+        self.dimensions = embedder.dimensions
+        self.reranker = reranker
+        self.directory = Path(path) / collection
+
+        self._lock = threading.RLock()
+        self._version: Optional[str] = None
+        self._vectors = np.zeros((0, self.dimensions or 0), dtype=np.float32)
+        self._records: List[Dict[str, Any]] = []
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    @property
+    def version(self) -> Optional[str]:
+        '''
+        Version of the collection, changed by every write.
+        '''
+        self._load()
+        return self._version
+
+    def _load(self) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        '''
+        Return the vectors and records of the current version, reloaded if another process has written them.
+        '''
+        with self._lock:
+            for _ in range(3):
+                try:
+                    manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+                except FileNotFoundError:
+                    manifest = None
+
+                version = manifest["version"] if manifest else None
+                if version == self._version:
+                    break
+                try:
+                    if version is None:
+                        vectors, records = np.zeros((0, self.dimensions or 0), dtype=np.float32), []
+                    else:
+                        vectors = np.load(self.directory / f"vectors-{version}.npy", mmap_mode="r")
+                        with open(self.directory / f"records-{version}.jsonl", encoding="utf-8") as file:
+                            records = [json.loads(line) for line in file]
+                    self._vectors, self._records, self._version = vectors, records, version
+                    break
+                except FileNotFoundError:
+                    # The version was replaced by a writer in the meantime, read the new manifest
+                    logger.debug(f"Version {version} of {self.collection} was replaced, reloading")
+
+            return self._vectors, self._records
+
+    def _update(self, change) -> None:
+        '''
+        Apply a change to the records and vectors and write them as a new version.
+        The change gets the current vectors and records and returns the new ones.
+        '''
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with portalocker.Lock(str(self.directory / ".lock"), timeout=60), self._lock:
+            vectors, records = self._load()
+            vectors, records = change(np.asarray(vectors), list(records))
+
+            version = f"{time.time_ns()}"
+            np.save(self.directory / f"vectors-{version}.npy", np.ascontiguousarray(vectors, dtype=np.float32))
+            with open(self.directory / f"records-{version}.jsonl", "w", encoding="utf-8") as file:
+                for record in records:
+                    file.write(json.dumps(record) + "\n")
+
+            tmp_manifest = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_manifest.write_text(json.dumps({"version": version, "count": len(records)}), encoding="utf-8")
+            os.replace(tmp_manifest, self.manifest_path)
+
+            # Files of older versions that are still mapped by a reader are removed when it reloads
+            for old in self.directory.glob("*-*.*"):
+                if version not in old.name:
+                    try:
+                        old.unlink()
+                    except OSError:
+                        pass
+
+            self._load()
+
+    def _delete_where(self, predicate) -> bool:
+        def change(vectors, records):
+            keep = [i for i, record in enumerate(records) if not predicate(record)]
+            return vectors[keep] if len(records) else vectors, [records[i] for i in keep]
+
+        self._update(change)
+        return True
+
+    @staticmethod
+    def _matches(record: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+        '''
+        Check whether the metadata of a record has the values of the filters, a list value matches any of its items.
+        '''
+        if not filters:
+            return True
+        return all(
+            record["meta_data"].get(key) in value if isinstance(value, list) else record["meta_data"].get(key) == value
+            for key, value in filters.items()
+        )
+
+    def _insert(self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]]) -> None:
+        new_records = []
+        new_vectors = []
+        for document in documents:
+            cleaned_content = document.content.replace("\x00", "�")
+            base_id = document.id or md5(cleaned_content.encode()).hexdigest()
+            new_records.append({
+                "id": md5(f"{base_id}_{content_hash}".encode()).hexdigest(),
+                "name": document.name,
+                "meta_data": {**(document.meta_data or {}), **(filters or {})},
+                "content": cleaned_content,
+                "usage": document.usage,
+                "content_id": document.content_id,
+                "content_hash": content_hash,
+            })
+            vector = np.asarray(document.embedding, dtype=np.float32)
+            new_vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+
+        new_ids = {record["id"] for record in new_records}
+
+        def change(vectors, records):
+            keep = [i for i, record in enumerate(records) if record["id"] not in new_ids]
+            kept_vectors = vectors[keep] if len(records) else np.zeros((0, len(new_vectors[0])), dtype=np.float32)
+            return np.vstack([kept_vectors, np.stack(new_vectors)]), [records[i] for i in keep] + new_records
+
+        if new_records:
+            self._update(change)
+
+    def _search(self, embedding: List[float], limit: int, filters: Optional[Dict[str, Any]]) -> List[Document]:
+        vectors, records = self._load()
+        if not records:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = vectors @ (query / (np.linalg.norm(query) or 1.0))
+        if filters:
+            scores = np.where([self._matches(record, filters) for record in records], scores, -np.inf)
+
+        limit = min(limit, len(records))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            Document(
+                name=records[i]["name"],
+                meta_data=records[i]["meta_data"],
+                content=records[i]["content"],
+                embedder=self.embedder,
+                usage=records[i].get("usage"),
+                content_id=records[i].get("content_id"),
+            )
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+    def create(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def async_create(self) -> None:
+        self.create()
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    async def async_exists(self) -> bool:
+        return self.exists()
+
+    def name_exists(self, name: str) -> bool:
+        return any(record["name"] == name for record in self._load()[1])
+
+    async def async_name_exists(self, name: str) -> bool:
+        return self.name_exists(name)
+
+    def id_exists(self, id: str) -> bool:
+        return any(record["id"] == id for record in self._load()[1])
+
+    def content_hash_exists(self, content_hash: str) -> bool:
+        return any(record["content_hash"] == content_hash for record in self._load()[1])
+
+    def get_count(self) -> int:
+        return len(self._load()[1])
+
+    def insert(self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        for document in documents:
+            document.embed(embedder=self.embedder)
+        self._insert(content_hash, documents, filters)
+
+    async def async_insert(
+        self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None
+    ) -> None:
+        await asyncio.gather(*(document.async_embed(embedder=self.embedder) for document in documents))
+        await asyncio.to_thread(self._insert, content_hash, documents, filters)
+
+    def upsert(self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        self._delete_where(lambda record: record["content_hash"] == content_hash)
+        self.insert(content_hash, documents, filters)
+
+    async def async_upsert(
+        self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None
+    ) -> None:
+        await asyncio.to_thread(self._delete_where, lambda record: record["content_hash"] == content_hash)
+        await self.async_insert(content_hash, documents, filters)
+
+    def upsert_available(self) -> bool:
+        return True
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Any] = None) -> List[Document]:
+        results = self._search(self.embedder.get_embedding(query), limit, filters)
+        if self.reranker:
+            results = self.reranker.rerank(query=query, documents=results)
+        return results
+
+    async def async_search(self, query: str, limit: int = 5, filters: Optional[Any] = None) -> List[Document]:
+        embedding = await self.embedder.async_get_embedding(query)
+        results = await asyncio.to_thread(self._search, embedding, limit, filters)
+        if self.reranker:
+            results = self.reranker.rerank(query=query, documents=results)
+        return results
+
+    def drop(self) -> None:
+        self._delete_where(lambda record: True)
+
+    async def async_drop(self) -> None:
+        await asyncio.to_thread(self.drop)
+
+    def delete(self) -> bool:
+        return self._delete_where(lambda record: True)
+
+    def delete_by_id(self, id: str) -> bool:
+        return self._delete_where(lambda record: record["id"] == id)
+
+    def delete_by_name(self, name: str) -> bool:
+        return self._delete_where(lambda record: record["name"] == name)
+
+    def delete_by_metadata(self, metadata: Dict[str, Any]) -> bool:
+        return self._delete_where(lambda record: self._matches(record, metadata))
+
+    def delete_by_content_id(self, content_id: str) -> bool:
+        return self._delete_where(lambda record: record.get("content_id") == content_id)
+
+    def update_metadata(self, content_id: str, metadata: Dict[str, Any]) -> None:
+        def change(vectors, records):
+            for record in records:
+                if record.get("content_id") == content_id:
+                    record["meta_data"] = {**record["meta_data"], **metadata}
+            return vectors, records
+
+        self._update(change)
+
+    def get_supported_search_types(self) -> List[str]:
+        return ["vector"]
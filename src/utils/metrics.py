@@ -0,0 +1,396 @@
+'''
+This module provides the latency metrics of the hot paths, rendered in the Prometheus text format.
+Histograms time the agent tools, the phases of the data tools (HTTP fetch, HTML parse, TOON serialization,
+KMeans fits, knowledge searches), the LLM calls and the workflow steps.
+The counters of the caches, the routing and the tracing are exported as gauges next to them.
+Metrics are kept per process: with several workers, a scrape of /metrics returns the metrics of one worker.
+'''
+import re
+import time
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from utils.logger import get_logger
+from utils.config import (
+    METRICS,
+    METRICS_PATH,
+    METRICS_PREFIX,
+    METRICS_BUCKETS,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+        )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(part for part in parts if part))
+
+class _Metric:
+    '''
+    Metric with labels, the values of every label combination are kept under a lock.
+    '''
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = _metric_name(METRICS_PREFIX, name)
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], **extra: Any) -> Dict[str, Any]:
+        return {**dict(zip(self.labelnames, key)), **extra}
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, Any], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples()]
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    '''
+    Monotonic counter, e.g. the tokens of the LLM calls.
+    '''
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        if METRICS != 'true':
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, Any], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}_total", self._labels(key), value
+
+class Histogram(_Metric):
+    '''
+    Histogram of durations in seconds, with cumulative buckets.
+    '''
+    type = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = METRICS_BUCKETS,
+            ):
+        '''
+        Args:
+            name: Name of the metric, prefixed with METRICS_PREFIX.
+            documentation: Help text of the metric.
+            labelnames: Names of the labels, every observation sets all of them.
+            buckets: Upper bounds of the buckets in seconds, +Inf is added.
+        '''
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(map(float, buckets))) + (float("inf"),)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if METRICS != 'true':
+            return
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        '''
+        Observe the duration of the block, also when it raises.
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get(self, **labels: Any) -> Dict[str, float]:
+        '''
+        Number and sum of the observations of a label combination.
+        '''
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return {"count": entry[2], "sum": entry[1]} if entry is not None else {"count": 0, "sum": 0.0}
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, Any], float]]:
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", self._labels(key, le=_format_value(bound)), cumulative
+            yield f"{self.name}_sum", self._labels(key), round(total, 6)
+            yield f"{self.name}_count", self._labels(key), count
+
+class MetricsRegistry:
+    '''
+    Metrics of the process and collectors of the existing stats, rendered together for /metrics.
+    '''
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs: Any) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        '''
+        Export the numbers of a stats() function as gauges named <prefix>_<name>_<key>.
+        Nested dicts are flattened, other values are skipped.
+        '''
+        with self._lock:
+            self._collectors[name] = collector
+
+    def _collect(self, name: str, collector: Callable[[], Dict[str, Any]]) -> List[str]:
+        try:
+            stats = collector()
+        except Exception as e:
+            logger.warning(f"Error collecting the {name} metrics: {e}")
+            return []
+
+        lines = []
+        pending = [((name,), stats)]
+        while pending:
+            path, value = pending.pop(0)
+            if isinstance(value, dict):
+                pending += [(path + (str(key),), item) for key, item in value.items()]
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric = _metric_name(METRICS_PREFIX, *path)
+                lines += [f"# TYPE {metric} gauge", f"{metric} {_format_value(value)}"]
+        return lines
+
+    def render(self) -> str:
+        '''
+        Render all metrics in the Prometheus text exposition format.
+        '''
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        for name, collector in collectors:
+            lines += self._collect(name, collector)
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        '''
+        Reset the values of the metrics, e.g. between benchmark scenarios.
+        '''
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+# Process-wide metrics
+metrics = MetricsRegistry()
+
+TOOL_LATENCY = metrics.histogram("tool_duration_seconds", "Duration of the agent tool calls.", ["tool"])
+PHASE_LATENCY = metrics.histogram(
+    "phase_duration_seconds",
+    "Duration of the phases of the data tools: http_fetch, html_parse, toon_serialize, kmeans_fit and knowledge_search.",
+    ["phase"],
+    )
+LLM_LATENCY = metrics.histogram("llm_duration_seconds", "Duration of the LLM calls.", ["provider", "model", "stream"])
+LLM_TTFT = metrics.histogram("llm_time_to_first_token_seconds", "Time to the first chunk of the streamed LLM calls.", ["provider", "model"])
+LLM_TOKENS = metrics.counter("llm_tokens", "Tokens of the LLM calls.", ["provider", "model", "direction"])
+STEP_LATENCY = metrics.histogram("workflow_step_duration_seconds", "Duration of the workflow steps.", ["step"])
+
+def timed(histogram: Histogram, **labels: Any) -> Callable[[Callable], Callable]:
+    '''
+    Decorator observing the duration of every call of a sync or async function.
+    The signature is kept, so agno still builds the schema of decorated tools.
+
+    Args:
+        histogram: The histogram of the durations.
+        labels: Labels of the observations, e.g. tool="get_next_page".
+    '''
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+def timed_tool(name: str) -> Callable[[Callable], Callable]:
+    '''
+    Decorator observing the duration of an agent tool, applied below @tool.
+
+    Args:
+        name: Name of the tool, the sync and async variants of a tool share it.
+    '''
+    return timed(TOOL_LATENCY, tool=name)
+
+class TimedModelMixin:
+    '''
+    Model mixin observing the duration, the time to first token and the tokens of every LLM call.
+    '''
+
+    def _metric_labels(self) -> Dict[str, str]:
+        return {"provider": str(getattr(self, "provider", None) or type(self).__name__), "model": str(getattr(self, "id", ""))}
+
+    def _record_usage(self, response: Any) -> None:
+        usage = getattr(response, "response_usage", None)
+        if usage is None:
+            return
+        labels = self._metric_labels()
+        LLM_TOKENS.inc(usage.input_tokens or 0, direction="input", **labels)
+        LLM_TOKENS.inc(usage.output_tokens or 0, direction="output", **labels)
+
+    def invoke(self, *args, **kwargs):
+        with LLM_LATENCY.time(stream="false", **self._metric_labels()):
+            response = super().invoke(*args, **kwargs)
+        self._record_usage(response)
+        return response
+
+    async def ainvoke(self, *args, **kwargs):
+        with LLM_LATENCY.time(stream="false", **self._metric_labels()):
+            response = await super().ainvoke(*args, **kwargs)
+        self._record_usage(response)
+        return response
+
+    def invoke_stream(self, *args, **kwargs):
+        labels = self._metric_labels()
+        start = time.perf_counter()
+        first_token = True
+        with LLM_LATENCY.time(stream="true", **labels):
+            for response in super().invoke_stream(*args, **kwargs):
+                if first_token and (response.content or response.tool_calls):
+                    first_token = False
+                    LLM_TTFT.observe(time.perf_counter() - start, **labels)
+                self._record_usage(response)
+                yield response
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        labels = self._metric_labels()
+        start = time.perf_counter()
+        first_token = True
+        with LLM_LATENCY.time(stream="true", **labels):
+            async for response in super().ainvoke_stream(*args, **kwargs):
+                if first_token and (response.content or response.tool_calls):
+                    first_token = False
+                    LLM_TTFT.observe(time.perf_counter() - start, **labels)
+                self._record_usage(response)
+                yield response
+
+def timed_step(step: Any) -> Any:
+    '''
+    Observe the duration of every execution of a workflow step.
+    The execute methods are wrapped on the instance: the workflow maps the steps by their exact class.
+
+    Args:
+        step: The agno workflow Step.
+    '''
+    execute, aexecute = step.execute, step.aexecute
+    execute_stream, aexecute_stream = step.execute_stream, step.aexecute_stream
+
+    def timed_execute(*args, **kwargs):
+        with STEP_LATENCY.time(step=step.name):
+            return execute(*args, **kwargs)
+
+    async def timed_aexecute(*args, **kwargs):
+        with STEP_LATENCY.time(step=step.name):
+            return await aexecute(*args, **kwargs)
+
+    def timed_execute_stream(*args, **kwargs):
+        with STEP_LATENCY.time(step=step.name):
+            yield from execute_stream(*args, **kwargs)
+
+    async def timed_aexecute_stream(*args, **kwargs):
+        with STEP_LATENCY.time(step=step.name):
+            async for event in aexecute_stream(*args, **kwargs):
+                yield event
+
+    step.execute, step.aexecute = timed_execute, timed_aexecute
+    step.execute_stream, step.aexecute_stream = timed_execute_stream, timed_aexecute_stream
+    return step
+
+@functools.lru_cache(maxsize=None)
+def timed_model(model_class: type) -> type:
+    '''
+    Subclass of a model class observing the LLM calls.
+    '''
+    return type(f"Timed{model_class.__name__}", (TimedModelMixin, model_class), {})
+
+def add_metrics_route(app: Any, path: str = METRICS_PATH) -> Any:
+    '''
+    Add the route of the Prometheus metrics to a FastAPI app.
+    The route is matched first, so that it also takes precedence with path="/metrics",
+    which the AgentOS app uses for its usage metrics.
+
+    Args:
+        app: The FastAPI app, e.g. the app of the AgentOS.
+        path: Path of the route.
+    '''
+    from fastapi.responses import Response
+
+    def get_metrics() -> Response:
+        return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+    app.add_api_route(path, get_metrics, methods=["GET"], include_in_schema=False)
+    app.router.routes.insert(0, app.router.routes.pop())
+    return app
@@ -0,0 +1,226 @@
+'''
+This module provides a shared on-disk cache for the play by play pages of Basketball Reference.
+The parsed frames are stored as Parquet files keyed by (date, home_team).
+Finished games are cached forever, games still in progress expire after a TTL.
+'''
+import io
+import os
+import re
+import time
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.logger import get_logger
+from utils.async_io import fetch_text, get_text
+from utils.metrics import timed, PHASE_LATENCY
+from utils.config import (
+    PBP_CACHE_DIR,
+    PBP_CACHE_TTL,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+PBP_URL = "https://www.basketball-reference.com/boxscores/pbp/{date}0{home_team}.html"
+SCOREBOARD_URL = "https://www.basketball-reference.com/boxscores/?month={month}&day={day}&year={year}"
+
+# Parquet schema metadata key that marks a cached game as finished
+_FINAL_KEY = b"pbp_final"
+
+def get_pbp_url(date: str, home_team: str) -> str:
+    '''
+    Build the Basketball Reference play by play url for a given game.
+    '''
+    return PBP_URL.format(date=date, home_team=home_team)
+
+def parse_scoreboard_html(html: str) -> List[Tuple[str, str]]:
+    '''
+    Parse the daily scoreboard page into a list of (home_team, away_team) abbreviations.
+    Each game summary block links the away team first and the home team second.
+    '''
+    games = []
+    for block in html.split('class="game_summary')[1:]:
+        teams = re.findall(r'href="/teams/([A-Z]{3})/\d{4}\.html"', block)
+        if len(teams) >= 2:
+            games.append((teams[1], teams[0]))
+
+    return games
+
+@timed(PHASE_LATENCY, phase="html_parse")
+def parse_play_by_play_html(html) -> pd.DataFrame:
+    '''
+    Parse a play by play page (url, path or file-like object) into a flat DataFrame.
+    '''
+    return pd.read_html(html)[0].droplevel(0, axis=1)
+
+def is_game_final(date: str, df: pd.DataFrame) -> bool:
+    '''
+    Decide whether a game is finished and its play by play can be cached forever.
+
+    Games older than yesterday are always considered final. For recent games the last
+    row has to mark the end of the 4th quarter or of an overtime with an untied score.
+    '''
+    try:
+        if datetime.strptime(date, "%Y%m%d").date() < (datetime.now() - timedelta(days=1)).date():
+            return True
+    except ValueError:
+        return False
+
+    if df.empty:
+        return False
+
+    last_row = " ".join(df.iloc[-1].dropna().astype(str))
+    if "End of 4th quarter" not in last_row and "overtime" not in last_row:
+        return False
+
+    scores = df["Score"].astype(str).str.extract(r"^(\d+)-(\d+)$").dropna()
+    if scores.empty:
+        return False
+
+    away_score, home_score = scores.iloc[-1]
+    return away_score != home_score
+
+class PlayByPlayCache:
+    '''
+    Parquet backed cache for parsed play by play frames.
+    '''
+
+    def __init__(self, cache_dir: str = PBP_CACHE_DIR, ttl: int = PBP_CACHE_TTL, suffix: str = ""):
+        '''
+        Args:
+            cache_dir: Directory where the Parquet files are stored.
+            ttl: Time-to-live in seconds for games that are still in progress.
+            suffix: Suffix of the file names, to store derived tables next to the raw frames.
+        '''
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.suffix = f".{suffix}" if suffix else ""
+
+    def _path(self, date: str, home_team: str) -> Path:
+        return self.cache_dir / f"{date}_{home_team.upper()}{self.suffix}.parquet"
+
+    def get(self, date: str, home_team: str) -> Optional[pd.DataFrame]:
+        '''
+        Return the cached frame of a game or None if it is missing or expired.
+        '''
+        path = self._path(date, home_team)
+        if not path.exists():
+            return None
+
+        try:
+            table = pq.read_table(path, memory_map=True)
+        except Exception as e:
+            logger.error(f"Error reading play by play cache {path}: {e}")
+            return None
+
+        metadata = table.schema.metadata or {}
+        if metadata.get(_FINAL_KEY) != b"1" and time.time() - path.stat().st_mtime > self.ttl:
+            logger.info(f"Play by play cache expired for {date} {home_team}")
+            return None
+
+        return table.to_pandas()
+
+    def put(self, date: str, home_team: str, df: pd.DataFrame, final: Optional[bool] = None) -> None:
+        '''
+        Store a frame in the cache. The file is written atomically so concurrent readers never see partial data.
+
+        Args:
+            final: Whether the game is finished. Detected from the raw play by play frame if omitted.
+        '''
+        path = self._path(date, home_team)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if final is None:
+            final = is_game_final(date, df)
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _FINAL_KEY: b"1" if final else b"0"})
+
+        # Unique per writer, the threads of a process may store the same game concurrently
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, date: str, home_team: str) -> None:
+        '''
+        Remove a game from the cache.
+        '''
+        self._path(date, home_team).unlink(missing_ok=True)
+
+# Process-wide cache used by agents, workflows and skill scripts
+pbp_cache = PlayByPlayCache()
+
+def get_play_by_play(date: str, home_team: str) -> pd.DataFrame:
+    '''
+    Get the play by play frame of a game, served from the cache when possible.
+
+    Args:
+        date: The date of the game in YYYYMMDD format.
+        home_team: The home team abbreviation.
+    '''
+    df = pbp_cache.get(date, home_team)
+    if df is not None:
+        return df
+
+    url = get_pbp_url(date, home_team)
+    df = parse_play_by_play_html(io.StringIO(get_text(url)))
+    logger.info(f"Successfully fetched play by play from {url}")
+
+    try:
+        pbp_cache.put(date, home_team, df)
+    except Exception as e:
+        logger.error(f"Error writing play by play cache: {e}")
+
+    return df
+
+async def aget_play_by_play(date: str, home_team: str, timings: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    '''
+    Async variant of get_play_by_play. The page is fetched with the pooled HTTP client,
+    parsing and cache file I/O run in worker threads.
+
+    Args:
+        date: The date of the game in YYYYMMDD format.
+        home_team: The home team abbreviation.
+        timings: Filled with cached (0 or 1), fetch_ms and parse_ms if given, e.g. for progress events.
+    '''
+    timings = {} if timings is None else timings
+    df = await asyncio.to_thread(pbp_cache.get, date, home_team)
+    timings.update(cached=float(df is not None), fetch_ms=0.0, parse_ms=0.0)
+    if df is not None:
+        return df
+
+    url = get_pbp_url(date, home_team)
+    start = time.perf_counter()
+    html = await fetch_text(url)
+    timings["fetch_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    df = await asyncio.to_thread(parse_play_by_play_html, io.StringIO(html))
+    timings["parse_ms"] = (time.perf_counter() - start) * 1000
+    logger.info(f"Successfully fetched play by play from {url}")
+
+    try:
+        await asyncio.to_thread(pbp_cache.put, date, home_team, df)
+    except Exception as e:
+        logger.error(f"Error writing play by play cache: {e}")
+
+    return df
+
+async def aget_games_for_date(date: str) -> List[Tuple[str, str]]:
+    '''
+    Get the (home_team, away_team) pairs of all games played on a date.
+
+    Args:
+        date: The date in YYYYMMDD format.
+    '''
+    day = datetime.strptime(date, "%Y%m%d")
+    url = SCOREBOARD_URL.format(month=day.month, day=day.day, year=day.year)
+    html = await fetch_text(url)
+    return parse_scoreboard_html(html)
@@ -0,0 +1,167 @@
+'''
+This module parses the raw play by play of Basketball Reference into a typed, columnar event table.
+All columns are extracted with vectorized regular expressions, the parsed tables are cached as Parquet
+next to the raw frames, so that tools and workflows can filter and aggregate without re-parsing strings.
+'''
+import time
+import asyncio
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.pbp_cache import (
+    PlayByPlayCache,
+    get_play_by_play,
+    aget_play_by_play,
+    is_game_final,
+    )
+from utils.logger import get_logger
+from utils.config import PBP_CACHE_DIR
+
+# Initialize logger
+logger = get_logger()
+
+# Regex for player names as written by Basketball Reference (e.g. "A. Sengun", "W. Carter Jr.")
+PLAYER = r"[A-Z]\. [^\s(),]+(?: (?:Jr\.|Sr\.|II|III|IV))?"
+
+# Event types in the order they are matched, the first matching pattern wins
+EVENT_PATTERNS = {
+    "free_throw_made": r"makes (?:technical |clear path |flagrant )?free throw",
+    "free_throw_missed": r"misses (?:technical |clear path |flagrant )?free throw",
+    "field_goal_made": r"makes [23]-pt",
+    "field_goal_missed": r"misses [23]-pt",
+    "offensive_rebound": r"^Offensive rebound",
+    "defensive_rebound": r"^Defensive rebound",
+    "turnover": r"^Turnover",
+    "foul": r"foul by|[Ff]oul \(",
+    "violation": r"^Violation",
+    "timeout": r"timeout",
+    "substitution": r"enters the game",
+    "jump_ball": r"^Jump ball",
+}
+EVENT_TYPES = list(EVENT_PATTERNS) + ["other"]
+
+# The acting player: shooter, rebounder, player with the turnover or the foul, substitute
+ACTOR = rf"^({PLAYER}) (?:makes|misses|enters)|(?:rebound|Turnover|foul|Violation) by ({PLAYER})"
+
+def _clock_to_seconds(clock: pd.Series) -> pd.Series:
+    parts = clock.str.extract(r"^(\d+):(\d+(?:\.\d+)?)$").astype(float)
+    return (parts[0] * 60 + parts[1]).fillna(0).astype("int16")
+
+def parse_events(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Turn a raw play by play frame into a typed event table with one row per play.
+
+    The raw frame has the columns Time, <away>, away points, Score, home points, <home>,
+    with quarter header and "Start of ..." rows mixed into the data.
+
+    Returns:
+        A DataFrame with the columns period, seconds_remaining, team, player, event_type,
+        shot_value, points, away_score, home_score and description. The categories of the
+        team column are [away_team, home_team].
+    '''
+    time_col, away_col, away_pts, score_col, home_pts, home_col = df.columns[:6]
+    text = df[away_col].astype("string")
+
+    period_start = text.str.extract(r"^Start of (\d)(?:st|nd|rd|th) (quarter|overtime)")
+    period = period_start[0].astype(float) + np.where(period_start[1].eq("overtime").fillna(False), 4, 0)
+    period = period.ffill().fillna(1)
+
+    score = df[score_col].astype("string").str.extract(r"^(\d+)-(\d+)$")
+    is_event = score[0].notna()
+
+    away_event = df[away_col].notna() & df[home_col].isna()
+    description = df[away_col].where(away_event, df[home_col]).astype("string")[is_event]
+
+    event_type = np.select(
+        [description.str.contains(pattern, regex=True).fillna(False) for pattern in EVENT_PATTERNS.values()],
+        list(EVENT_PATTERNS),
+        default="other",
+        )
+    actor = description.str.extract(ACTOR)
+    is_field_goal = np.isin(event_type, ["field_goal_made", "field_goal_missed"])
+    shot_value = np.select(
+        [
+            np.isin(event_type, ["free_throw_made", "free_throw_missed"]),
+            is_field_goal & description.str.contains("3-pt", regex=False).fillna(False).to_numpy(),
+            is_field_goal,
+        ],
+        [1, 3, 2],
+        default=0,
+        )
+
+    events = pd.DataFrame({
+        "period": period[is_event].astype("int8"),
+        "seconds_remaining": _clock_to_seconds(df.loc[is_event, time_col].astype("string")),
+        "team": pd.Categorical(np.where(away_event[is_event], away_col, home_col), categories=[away_col, home_col]),
+        "player": actor[0].fillna(actor[1]).astype("category"),
+        "event_type": pd.Categorical(event_type, categories=EVENT_TYPES),
+        "shot_value": shot_value.astype("int8"),
+        "points": df.loc[is_event, away_pts].where(away_event[is_event], df.loc[is_event, home_pts]).astype("string")
+                    .str.extract(r"\+(\d)")[0].astype(float).fillna(0).astype("int8"),
+        "away_score": score.loc[is_event, 0].astype("int16"),
+        "home_score": score.loc[is_event, 1].astype("int16"),
+        "description": description,
+    }).reset_index(drop=True)
+
+    return events
+
+def get_teams(events: pd.DataFrame):
+    '''
+    Return the (away_team, home_team) abbreviations of an event table.
+    '''
+    away_team, home_team = events["team"].cat.categories
+    return away_team, home_team
+
+# Cache for the parsed event tables, stored next to the raw frames
+events_cache = PlayByPlayCache(cache_dir=PBP_CACHE_DIR, suffix="events")
+
+def get_game_events(date: str, home_team: str) -> pd.DataFrame:
+    '''
+    Get the typed event table of a game, served from the cache when possible.
+
+    Args:
+        date: The date of the game in YYYYMMDD format.
+        home_team: The home team abbreviation.
+    '''
+    events = events_cache.get(date, home_team)
+    if events is not None:
+        return events
+
+    df = get_play_by_play(date, home_team)
+    events = parse_events(df)
+
+    try:
+        events_cache.put(date, home_team, events, final=is_game_final(date, df))
+    except Exception as e:
+        logger.error(f"Error writing play by play events cache: {e}")
+
+    return events
+
+async def aget_game_events(date: str, home_team: str, timings: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    '''
+    Async variant of get_game_events.
+
+    Args:
+        date: The date of the game in YYYYMMDD format.
+        home_team: The home team abbreviation.
+        timings: Filled with cached (0 or 1), fetch_ms, parse_ms and events_ms if given, e.g. for progress events.
+    '''
+    timings = {} if timings is None else timings
+    events = await asyncio.to_thread(events_cache.get, date, home_team)
+    if events is not None:
+        timings.update(cached=1.0, fetch_ms=0.0, parse_ms=0.0, events_ms=0.0)
+        return events
+
+    df = await aget_play_by_play(date, home_team, timings=timings)
+    start = time.perf_counter()
+    events = await asyncio.to_thread(parse_events, df)
+    timings["events_ms"] = (time.perf_counter() - start) * 1000
+
+    try:
+        await asyncio.to_thread(events_cache.put, date, home_team, events, is_game_final(date, df))
+    except Exception as e:
+        logger.error(f"Error writing play by play events cache: {e}")
+
+    return events
@@ -0,0 +1,270 @@
+'''
+This module compacts a play by play frame into a structured game summary for the report agent.
+Instead of ~500 raw rows the agent gets the box score, quarter scores, scoring runs, lead changes,
+largest leads, clutch time events and scoring droughts, all computed with vectorized pandas.
+'''
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.pbp_parser import PLAYER, parse_events, get_teams
+from utils.table_format import to_table, to_toon
+from utils.config import (
+    PBP_RAW_ROW_BUDGET,
+    PBP_DROUGHT_SECONDS,
+    )
+
+# Stats credited to the player named in the description rather than to the acting player,
+# and whether they go to the team listed with the play or to its opponent
+SECONDARY_PATTERNS = {
+    "AST": (rf"assist by ({PLAYER})", False),
+    "STL": (rf"steal by ({PLAYER})", True),
+    "BLK": (rf"block by ({PLAYER})", True),
+}
+
+BOX_SCORE_COLUMNS = ["PTS", "FGM", "FGA", "3PM", "3PA", "FTM", "FTA", "REB", "AST", "STL", "BLK", "TOV", "PF"]
+
+def prepare_events(events: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Add the seconds elapsed since tip-off and the home margin to a typed event table.
+    '''
+    period = events["period"].astype(int)
+    period_length = np.where(period <= 4, 720, 300)
+    period_offset = np.minimum(period - 1, 4) * 720 + np.maximum(period - 5, 0) * 300
+
+    return events.assign(
+        elapsed=period_offset + period_length - events["seconds_remaining"].astype(int),
+        margin=events["home_score"].astype(int) - events["away_score"].astype(int),
+        )
+
+def format_clock(period: int, seconds_remaining: int) -> str:
+    '''
+    Format a game clock like "Q4 2:35" or "OT1 0:12".
+    '''
+    label = f"Q{period}" if period <= 4 else f"OT{period - 4}"
+    return f"{label} {seconds_remaining // 60}:{seconds_remaining % 60:02d}"
+
+def box_score(events: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Compute the player box score (PTS, FG, 3P, FT, REB, AST, STL, BLK, TOV, PF) from the events.
+    '''
+    event_type = events["event_type"].astype(str)
+    is_three = events["shot_value"] == 3
+
+    stats = pd.DataFrame({
+        "team": events["team"].astype(str),
+        "player": events["player"].astype(str),
+        "PTS": events["points"].astype(int),
+        "FGM": event_type == "field_goal_made",
+        "FGA": event_type.isin(["field_goal_made", "field_goal_missed"]),
+        "3PM": (event_type == "field_goal_made") & is_three,
+        "3PA": event_type.isin(["field_goal_made", "field_goal_missed"]) & is_three,
+        "FTM": event_type == "free_throw_made",
+        "FTA": event_type.isin(["free_throw_made", "free_throw_missed"]),
+        "REB": event_type.isin(["offensive_rebound", "defensive_rebound"]),
+        "TOV": event_type == "turnover",
+        "PF": event_type == "foul",
+    })[events["player"].notna()]
+    stats = stats.astype({column: int for column in BOX_SCORE_COLUMNS if column in stats})
+
+    away_team, home_team = get_teams(events)
+    other_team = events["team"].astype(str).map({away_team: home_team, home_team: away_team})
+
+    secondary = []
+    for stat, (pattern, opponent) in SECONDARY_PATTERNS.items():
+        player = events["description"].str.extract(pattern)[0]
+        team = other_team if opponent else events["team"].astype(str)
+        secondary.append(pd.DataFrame({"team": team, "player": player, stat: 1})[player.notna()])
+
+    box = pd.concat([stats, *secondary], ignore_index=True)
+    box = box.groupby(["team", "player"]).sum(numeric_only=True)
+    box = box.reindex(columns=BOX_SCORE_COLUMNS, fill_value=0).fillna(0).astype(int).reset_index()
+
+    return box.sort_values(["team", "PTS"], ascending=[True, False]).reset_index(drop=True)
+
+def quarter_scores(events: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Compute the points of both teams per period.
+    '''
+    scores = events.pivot_table(
+        index="team", columns="period", values="points", aggfunc="sum", fill_value=0, observed=False,
+        )
+    scores.columns = [format_clock(p, 0).split()[0] for p in scores.columns]
+    scores["Total"] = scores.sum(axis=1)
+    return scores.reset_index()
+
+def top_scorers(events: pd.DataFrame, n: int = 3) -> pd.DataFrame:
+    '''
+    Find the n top scorers of both teams, without the other box score stats.
+    '''
+    points = events[events["player"].notna()].astype({"team": str, "player": str, "points": int})
+    points = points.groupby(["team", "player"], as_index=False)["points"].sum()
+    points = points.sort_values(["team", "points"], ascending=[True, False])
+    return points.groupby("team").head(n).rename(columns={"points": "PTS"}).reset_index(drop=True)
+
+def scoring_runs(events: pd.DataFrame, min_points: int = 8) -> pd.DataFrame:
+    '''
+    Find the unanswered scoring runs of at least min_points, with the largest run of each period.
+    '''
+    scoring = events[events["points"] > 0].astype({"team": str, "points": int})
+    run_id = (scoring["team"] != scoring["team"].shift()).cumsum()
+    runs = scoring.groupby(run_id).agg(
+        team=("team", "first"),
+        period=("period", "first"),
+        start=("seconds_remaining", "first"),
+        end=("seconds_remaining", "last"),
+        points=("points", "sum"),
+        score_after=("away_score", "last"),
+        home_after=("home_score", "last"),
+        )
+    runs = runs[runs["points"] >= min_points]
+    runs = runs.loc[runs.groupby("period")["points"].idxmax()] if not runs.empty else runs
+
+    return pd.DataFrame({
+        "team": runs["team"],
+        "run": runs["points"].astype(str) + "-0",
+        "from": [format_clock(p, s) for p, s in zip(runs["period"], runs["start"])],
+        "to": [format_clock(p, s) for p, s in zip(runs["period"], runs["end"])],
+        "score_after": runs["score_after"].astype(str) + "-" + runs["home_after"].astype(str),
+    }).reset_index(drop=True)
+
+def lead_changes(events: pd.DataFrame) -> Dict[str, int]:
+    '''
+    Count the lead changes and the times the score was tied.
+    '''
+    sign = np.sign(events["margin"])
+    leader = sign[sign != 0]
+    tied = (sign == 0) & (sign.shift() != 0) & (events.index > 0)
+
+    return {
+        "lead_changes": int((leader != leader.shift()).sum() - 1) if not leader.empty else 0,
+        "times_tied": int(tied.sum()),
+    }
+
+def largest_leads(events: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Find the largest lead of each team and when it happened.
+    '''
+    away_team, home_team = get_teams(events)
+
+    rows = []
+    for team, margin in ((home_team, events["margin"]), (away_team, -events["margin"])):
+        idx = margin.idxmax()
+        if margin[idx] > 0:
+            rows.append({
+                "team": team,
+                "lead": int(margin[idx]),
+                "at": format_clock(events.at[idx, "period"], events.at[idx, "seconds_remaining"]),
+                "score": f"{events.at[idx, 'away_score']}-{events.at[idx, 'home_score']}",
+                })
+
+    return pd.DataFrame(rows, columns=["team", "lead", "at", "score"])
+
+def clutch_events(events: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Return the scoring events in clutch time (last 5 minutes of the 4th quarter or overtime, margin of 5 or less).
+    '''
+    _, home_team = get_teams(events)
+    points = events["points"].astype(int)
+    margin_before = (events["margin"] - np.where(events["team"] == home_team, points, -points)).abs()
+    clutch = (events["period"] >= 4) & (events["seconds_remaining"] <= 300) & (margin_before <= 5) & (events["points"] > 0)
+
+    return _event_table(events[clutch])
+
+def scoring_droughts(events: pd.DataFrame, min_seconds: int = PBP_DROUGHT_SECONDS) -> pd.DataFrame:
+    '''
+    Find the stretches of at least min_seconds in which a team did not score.
+    '''
+    scored = events[events["points"] > 0]
+    previous = scored.groupby("team", observed=True)[["elapsed", "period", "seconds_remaining"]].shift()
+    gap = scored["elapsed"] - previous["elapsed"]
+    drought = gap >= min_seconds
+
+    return pd.DataFrame({
+        "team": scored.loc[drought, "team"].astype(str),
+        "from": [format_clock(int(p), int(s)) for p, s in zip(previous.loc[drought, "period"], previous.loc[drought, "seconds_remaining"])],
+        "to": [format_clock(p, s) for p, s in zip(scored.loc[drought, "period"], scored.loc[drought, "seconds_remaining"])],
+        "seconds": gap[drought].astype(int),
+    }).reset_index(drop=True)
+
+def _event_table(events: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "clock": [format_clock(p, s) for p, s in zip(events["period"], events["seconds_remaining"])],
+        "team": events["team"].astype(str),
+        "play": events["description"],
+        "score": events["away_score"].astype(str) + "-" + events["home_score"].astype(str),
+    }).reset_index(drop=True)
+
+def summarize_play_by_play(df: pd.DataFrame, raw_row_budget: int = PBP_RAW_ROW_BUDGET) -> Dict[str, Any]:
+    '''
+    Compute a compact structured summary of a game from its raw play by play frame.
+    '''
+    return summarize_events(parse_events(df), raw_row_budget=raw_row_budget)
+
+def summarize_events(
+    events: pd.DataFrame,
+    raw_row_budget: int = PBP_RAW_ROW_BUDGET,
+    with_box_score: bool = True,
+) -> Dict[str, Any]:
+    '''
+    Compute a compact structured summary of a game from its typed event table.
+
+    Args:
+        events: The event table returned by utils.pbp_parser.parse_events.
+        raw_row_budget: Number of raw event rows (the last plays of the game) to include.
+        with_box_score: Whether to compute the box score, otherwise only the top scorers are included.
+
+    Returns:
+        A dictionary with the final score, box score, quarter scores, scoring runs,
+        lead changes, largest leads, clutch time events and scoring droughts.
+    '''
+    events = prepare_events(events)
+    away_team, home_team = get_teams(events)
+    last = events.iloc[-1]
+
+    summary = {
+        "away_team": away_team,
+        "home_team": home_team,
+        "final_score": f"{away_team} {last['away_score']} - {last['home_score']} {home_team}",
+        "periods": int(events["period"].max()),
+        **lead_changes(events),
+        "quarter_scores": quarter_scores(events),
+        **({"box_score": box_score(events)} if with_box_score else {"top_scorers": top_scorers(events)}),
+        "scoring_runs": scoring_runs(events),
+        "largest_leads": largest_leads(events),
+        "clutch_events": clutch_events(events),
+        "scoring_droughts": scoring_droughts(events),
+    }
+
+    if raw_row_budget > 0:
+        summary["last_plays"] = _event_table(events.tail(raw_row_budget))
+
+    return summary
+
+def render_summary(summary: Dict[str, Any]) -> str:
+    '''
+    Render a game summary as compact text, tables are written in TOON format.
+    '''
+    lines: List[str] = []
+    for key, value in summary.items():
+        if isinstance(value, pd.DataFrame):
+            if not value.empty:
+                lines.append(f"{key}:")
+                lines.append(to_toon(value))
+        else:
+            lines.append(f"{key}: {value}")
+
+    return "\n".join(lines)
+
+def render_statistics(events: pd.DataFrame) -> str:
+    '''
+    Render the statistics tables of a game report in markdown: quarter scores and box score of both teams.
+    '''
+    away_team, home_team = get_teams(events)
+    box = box_score(events)
+    sections = ["### Quarter Scores", to_table(quarter_scores(events), "markdown")]
+    for team in (away_team, home_team):
+        sections += [f"### {team} Box Score", to_table(box[box["team"] == team].drop(columns="team"), "markdown")]
+
+    return "\n\n".join(sections)
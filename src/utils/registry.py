@@ -0,0 +1,150 @@
+'''
+This module provides a registry that builds the agents, teams and workflows of the app on first use,
+and an ASGI wrapper that builds the AgentOS app on the first request instead of at import time.
+'''
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from utils.logger import get_logger
+
+# Initialize logger
+logger = get_logger()
+
+class ComponentRegistry:
+    '''
+    Registry of named factories, every component is built once and shared afterwards.
+    Factories may get other components from the registry.
+    '''
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        '''
+        Register the factory of a component.
+        '''
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        '''
+        Return a component, building it on first use.
+        '''
+        component = self._components.get(name)
+        if component is not None:
+            return component
+
+        with self._lock:
+            if name not in self._components:
+                if name not in self._factories:
+                    raise KeyError(f"No factory registered for component {name}")
+                self._components[name] = self._factories[name]()
+                logger.info(f"Built component {name}")
+
+            return self._components[name]
+
+    def is_built(self, name: str) -> bool:
+        return name in self._components
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> None:
+        '''
+        Build the given components, or all registered components, ahead of the first request.
+        '''
+        for name in names or list(self._factories):
+            self.get(name)
+
+# Process-wide registry of the app components
+registry = ComponentRegistry()
+
+class LazyASGIApp:
+    '''
+    ASGI app that builds the wrapped app on the first request, or at startup if warm_up is set.
+    The lifespan of the wrapped app runs in one task started at startup, from the build until shutdown:
+    it may run task groups (e.g. the MCP server of the AgentOS), which must be exited by the task that entered them.
+    '''
+
+    def __init__(self, factory: Callable[[], Any], warm_up: bool = False):
+        '''
+        Args:
+            factory: Returns the FastAPI app to serve.
+            warm_up: Whether to build the app at startup instead of on the first request.
+        '''
+        self.factory = factory
+        self.warm_up = warm_up
+        self._app: Optional[Any] = None
+        self._task: Optional[asyncio.Task] = None
+        self._build: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Future] = None
+
+    def _start(self) -> None:
+        '''
+        Start the task hosting the lifespan of the wrapped app, if it is not running.
+        '''
+        if self._task is None:
+            loop = asyncio.get_running_loop()
+            self._build, self._stop, self._ready = asyncio.Event(), asyncio.Event(), loop.create_future()
+            self._task = loop.create_task(self._run_lifespan())
+
+    async def _run_lifespan(self) -> None:
+        await self._build.wait()
+        if self._stop.is_set():
+            return
+
+        try:
+            app = self.factory()
+            async with app.router.lifespan_context(app):
+                self._app = app
+                self._ready.set_result(app)
+                await self._stop.wait()
+        except Exception as e:
+            if self._ready.done():
+                logger.error(f"Error in the lifespan of the app: {e}")
+                return
+            # The next request builds the app again
+            self._ready.set_exception(e)
+            self._task = None
+
+    async def get_app(self) -> Any:
+        if self._app is not None:
+            return self._app
+
+        self._start()
+        self._build.set()
+        return await asyncio.shield(self._ready)
+
+    async def _shutdown(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._build.set()
+        await self._task
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._start()
+                try:
+                    if self.warm_up:
+                        await self.get_app()
+                except Exception as e:
+                    logger.error(f"Error warming up the app: {e}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+
+            elif message["type"] == "lifespan.shutdown":
+                await self._shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        app = await self.get_app()
+        await app(scope, receive, send)
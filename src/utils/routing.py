@@ -0,0 +1,254 @@
+'''
+This module provides the adaptive routing of the team requests.
+Every first question of a session is classified with cheap heuristics (no model call): simple data retrievals
+("show me the 2024 team shooting clusters") are answered by the fast data agent (llm_fast, without reasoning model
+and reasoning tools), multi-step analyses are escalated to the team and its reasoning model.
+The routing decisions and the estimated latency saved are logged and counted.
+'''
+import re
+import time
+import uuid
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+from agno.agent import Agent
+from agno.run.agent import RunEvent
+from agno.run.base import RunStatus
+from agno.run.team import TeamRunInput, TeamRunOutput
+from agno.team import Team
+from agno.utils.events import (
+    create_team_run_started_event,
+    create_team_run_output_content_event,
+    create_team_run_completed_event,
+    )
+
+from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.session_history import aget_session, asave_team_run
+from utils.config import ROUTING, ROUTING_MAX_WORDS
+
+# Initialize logger
+logger = get_logger()
+
+# Questions that need reasoning, several steps or another member of the team
+ANALYSIS_CUES = re.compile(
+    r"\b(why|how come|explain\w*|analy[sz]\w*|compar\w*|versus|vs|better|best|worst|should|predict\w*|forecast\w*|"
+    r"trend\w*|impact\w*|insights?|recommend\w*|strateg\w*|evaluat\w*|assess\w*|correlat\w*|reports?|charts?|plot\w*|"
+    r"visuali[sz]\w*|graphs?|summar\w*|write|describe|interpret\w*|means?|define|definition|glossary)\b"
+)
+MULTI_STEP = re.compile(r"\b(and then|then|after that|afterwards|finally|next)\b|;")
+RETRIEVAL_VERBS = re.compile(r"^(please\s+)?(show|get|list|give|fetch|pull|display|load|return|what (are|were) the)\b")
+DATA_TERMS = re.compile(
+    r"\b(stats?|statistics|shooting|advanced|clusters?|clustering|play[- ]by[- ]play|pbp|box ?scores?|numbers|data|tables?)\b"
+)
+
+@dataclass(frozen=True)
+class RouteDecision:
+    '''
+    Route of a request: "data" (fast data agent) or "team", with the reason of the decision.
+    '''
+    route: str
+    reason: str
+
+def classify_request(question: str, max_words: int = ROUTING_MAX_WORDS) -> RouteDecision:
+    '''
+    Classify a question as a simple data retrieval or a multi-step analysis.
+
+    Args:
+        question: The question of the user.
+        max_words: Longer questions are escalated to the team.
+    '''
+    text = " ".join(question.lower().split())
+
+    if len(text.split()) > max_words:
+        return RouteDecision("team", "long request")
+    if text.count("?") > 1 or MULTI_STEP.search(text):
+        return RouteDecision("team", "multi-step request")
+    cue = ANALYSIS_CUES.search(text)
+    if cue:
+        return RouteDecision("team", f"analysis cue '{cue.group(0)}'")
+    if not DATA_TERMS.search(text):
+        return RouteDecision("team", "no data term")
+    if not RETRIEVAL_VERBS.search(text) and len(text.split()) > 8:
+        return RouteDecision("team", "no retrieval verb")
+    return RouteDecision("data", "data retrieval")
+
+class RoutingStats:
+    '''
+    Decisions per route and latency of the routes (moving average) of the current process.
+    The latency saved by a routed request is estimated against the average latency of the team.
+    '''
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Any] = {"data": 0, "team": 0, "fallbacks": 0, "saved_ms": 0.0}
+        self.latency_ms: Dict[str, Optional[float]] = {"data": None, "team": None}
+
+    def record(self, route: str, latency_ms: float) -> Optional[float]:
+        '''
+        Record the latency of a request and return the estimated latency saved, if the team latency is known.
+        '''
+        with self._lock:
+            self.counters[route] += 1
+            average = self.latency_ms[route]
+            self.latency_ms[route] = latency_ms if average is None else average + self.alpha * (latency_ms - average)
+
+            team_latency = self.latency_ms["team"]
+            if route != "data" or team_latency is None:
+                return None
+            saved = max(team_latency - latency_ms, 0.0)
+            self.counters["saved_ms"] += saved
+            return saved
+
+    def fallback(self) -> None:
+        with self._lock:
+            self.counters["fallbacks"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["latency_ms"] = {route: round(value, 1) if value is not None else None for route, value in self.latency_ms.items()}
+        stats["saved_ms"] = round(stats["saved_ms"], 1)
+        return stats
+
+# Process-wide routing counters
+routing_stats = RoutingStats()
+metrics.register_collector("routing", routing_stats.stats)
+
+@dataclass(init=False)
+class RoutedTeam(Team):
+    '''
+    Team that answers the simple data retrievals with its fast data agent instead of running the team.
+
+    Only the first run of a session is routed, follow-up questions depend on the conversation.
+    The routed answer is added to the team session, so that the follow-ups of the team see it.
+    '''
+    fast_agent: Optional[Agent] = None
+
+    def __init__(self, *args, fast_agent: Optional[Agent] = None, **kwargs):
+        '''
+        Args:
+            fast_agent: Agent answering the routed requests, e.g. the data agent on the fast model.
+        '''
+        super().__init__(*args, **kwargs)
+        self.fast_agent = fast_agent
+
+    def _deep_copy_field(self, field_name: str, field_value: Any) -> Any:
+        if field_name == "fast_agent":
+            return field_value.deep_copy()
+        return super()._deep_copy_field(field_name, field_value)
+
+    async def _route(self, input: Any, session_id: Optional[str], kwargs: Dict[str, Any]) -> RouteDecision:
+        if ROUTING != 'true' or self.fast_agent is None or not isinstance(input, str):
+            return RouteDecision("team", "routing disabled")
+        if any(kwargs.get(media) for media in ("images", "audio", "videos", "files")):
+            return RouteDecision("team", "media input")
+        if session_id is not None:
+            session = await aget_session(self, session_id)
+            if session is not None and session.runs:
+                return RouteDecision("team", "follow-up question")
+        return classify_request(input)
+
+    def _routed_output(self, input: str, session_id: str, user_id: Optional[str], decision: RouteDecision) -> TeamRunOutput:
+        return TeamRunOutput(
+            run_id=str(uuid.uuid4()),
+            team_id=self.id,
+            team_name=self.name,
+            session_id=session_id,
+            user_id=user_id,
+            input=TeamRunInput(input_content=input),
+            status=RunStatus.running,
+            metadata={"routing": {"route": decision.route, "reason": decision.reason, "agent": self.fast_agent.name}},
+        )
+
+    async def _save_routed_run(self, output: TeamRunOutput, content: str) -> None:
+        '''
+        Complete the routed run and add it to the team session.
+        '''
+        output.content = content
+        output.status = RunStatus.completed
+        await asave_team_run(self, output, content)
+
+    def _log(self, decision: RouteDecision, latency_ms: float) -> None:
+        saved = routing_stats.record(decision.route, latency_ms)
+        if decision.route == "data":
+            estimate = f", ~{saved:.0f} ms saved" if saved is not None else ""
+            logger.info(f"Routed to {self.fast_agent.name} ({decision.reason}) in {latency_ms:.0f} ms{estimate}")
+        else:
+            logger.info(f"Escalated to {self.name} ({decision.reason}) in {latency_ms:.0f} ms")
+
+    async def _arun_routed(self, input: Any, session_id: Optional[str], **kwargs: Any) -> TeamRunOutput:
+        decision = await self._route(input, session_id, kwargs)
+        start = time.perf_counter()
+
+        if decision.route == "data":
+            session_id = session_id or str(uuid.uuid4())
+            output = self._routed_output(input, session_id, kwargs.get("user_id"), decision)
+            try:
+                response = await self.fast_agent.arun(
+                    input, session_id=f"routed-{session_id}", user_id=kwargs.get("user_id"), stream=False,
+                    )
+                if response.status == RunStatus.error:
+                    raise RuntimeError(response.content)
+                output.member_responses = [response]
+                await self._save_routed_run(output, str(response.content or ""))
+                self._log(decision, (time.perf_counter() - start) * 1000)
+                return output
+            except Exception as e:
+                logger.warning(f"Routed run failed, escalating to {self.name}: {e}")
+                routing_stats.fallback()
+                decision = RouteDecision("team", "routed run failed")
+                start = time.perf_counter()
+
+        output = await super().arun(input, session_id=session_id, stream=False, **kwargs)
+        self._log(decision, (time.perf_counter() - start) * 1000)
+        return output
+
+    async def _astream_routed(self, input: Any, session_id: Optional[str], **kwargs: Any) -> AsyncIterator[Any]:
+        decision = await self._route(input, session_id, kwargs)
+        start = time.perf_counter()
+
+        if decision.route == "data":
+            session_id = session_id or str(uuid.uuid4())
+            output = self._routed_output(input, session_id, kwargs.get("user_id"), decision)
+            chunks = []
+            try:
+                async for event in self.fast_agent.arun(
+                        input, session_id=f"routed-{session_id}", user_id=kwargs.get("user_id"), stream=True,
+                        ):
+                    if getattr(event, "event", None) == RunEvent.run_error.value:
+                        raise RuntimeError(event.content)
+                    if getattr(event, "event", None) == RunEvent.run_content.value and event.content:
+                        if not chunks:
+                            yield create_team_run_started_event(from_run_response=output)
+                        chunks.append(str(event.content))
+                        yield create_team_run_output_content_event(from_run_response=output, content=event.content)
+
+                if not chunks:
+                    raise RuntimeError("empty answer")
+                await self._save_routed_run(output, "".join(chunks))
+                self._log(decision, (time.perf_counter() - start) * 1000)
+                yield create_team_run_completed_event(from_run_response=output)
+                return
+            except Exception as e:
+                # The team takes over as long as nothing has been streamed
+                if chunks:
+                    raise
+                logger.warning(f"Routed run failed, escalating to {self.name}: {e}")
+                routing_stats.fallback()
+                decision = RouteDecision("team", "routed run failed")
+                start = time.perf_counter()
+
+        async for event in super().arun(input, session_id=session_id, stream=True, **kwargs):
+            yield event
+        self._log(decision, (time.perf_counter() - start) * 1000)
+
+    def arun(self, input: Any, *, stream: Optional[bool] = None, session_id: Optional[str] = None, **kwargs: Any):  # type: ignore
+        if stream is None:
+            stream = self.stream or False
+
+        if stream:
+            return self._astream_routed(input, session_id, **kwargs)
+        return self._arun_routed(input, session_id, **kwargs)
@@ -0,0 +1,300 @@
+'''
+This module provides a local, partitioned Parquet store for the season tables of BasketIntelligence.
+The tables are snapshotted by an ingestion command and read back with memory-mapped Arrow reads,
+so the data agent tools do not depend on the upstream source on the hot path.
+The tables of the season in progress are fetched again once they are older than SEASON_STORE_TTL.
+The manifest is updated under a file lock, since the server workers share the store.
+
+Layout:
+    <SEASON_STORE_DIR>/<table>/season=<season>/data.parquet
+    <SEASON_STORE_DIR>/manifest.json
+
+Run `python src/utils/season_store.py --help` to ingest the seasons.
+'''
+import os
+import re
+import sys
+import json
+import uuid
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import portalocker
+import pyarrow.parquet as pq
+
+# Add src to path when the module is executed as a script
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from BasketIntelligence.create_season import CreateSeason
+
+from utils.logger import get_logger
+from utils.config import (
+    SEASON_STORE_DIR,
+    SEASON_STORE_OFFLINE,
+    SEASON_STORE_TTL,
+    )
+
+import typer
+app = typer.Typer()
+
+# Initialize logger
+logger = get_logger()
+
+# Tables of the store and the CreateSeason method that reads them from the upstream source
+SEASON_TABLES: Dict[str, str] = {
+    "team_shooting": "read_team_shooting",
+    "adv_stats": "read_adv_stats",
+}
+
+def get_current_season() -> int:
+    '''
+    Return the season currently in progress, named after the year in which it ends.
+    '''
+    today = datetime.now()
+    return today.year + 1 if today.month >= 10 else today.year
+
+# Season label: the ending year, or both years, e.g. "2024", "2023-24" or "2023/2024"
+SEASON_LABEL = re.compile(r"^\s*((?:19|20)\d{2})(?:\s*[-/]\s*((?:19|20)?\d{2}))?\s*$")
+
+def season_end_year(season: Any) -> int:
+    '''
+    Return the year in which a season ends, e.g. 2024 for "2024", "2023-24" or "2023/2024".
+    '''
+    match = SEASON_LABEL.match(str(season))
+    if match is None:
+        raise ValueError(f"Invalid season: {season!r}")
+    start, end = match.groups()
+    if end is None:
+        return int(start)
+    if len(end) == 4:
+        return int(end)
+    # Two-digit ending year, e.g. "1999-00" ends in 2000
+    year = int(start) // 100 * 100 + int(end)
+    return year + 100 if year < int(start) else year
+
+class SeasonStore:
+    '''
+    Partitioned Parquet store with a manifest of the fetch timestamps.
+    '''
+
+    def __init__(self, store_dir: str = SEASON_STORE_DIR, ttl: int = SEASON_STORE_TTL):
+        '''
+        Args:
+            store_dir: Root directory of the store.
+            ttl: Seconds after which the tables of the season in progress are stale, 0 to never refresh them on read.
+        '''
+        self.store_dir = Path(store_dir)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Preloaded tables with the fetch timestamp they were loaded at
+        self._frames: Dict[Tuple[str, str], Tuple[pd.DataFrame, Optional[str]]] = {}
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._manifest_version: Optional[Tuple[int, int, int]] = None
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.store_dir / "manifest.json"
+
+    def _path(self, table: str, season: str) -> Path:
+        return self.store_dir / table / f"season={season}" / "data.parquet"
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return {}
+
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+
+    def read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        '''
+        Return the manifest: {table: {season: {"fetched_at", "rows", "columns"}}}.
+        It is parsed again only when the file has been replaced, e.g. by another worker.
+        '''
+        try:
+            stat = self.manifest_path.stat()
+        except FileNotFoundError:
+            return {}
+
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if version != self._manifest_version:
+                self._manifest = self._load_manifest()
+                self._manifest_version = version
+            return self._manifest
+
+    def fetched_at(self, table: str, season: str) -> Optional[str]:
+        '''
+        Return the fetch timestamp of a table of a season, None if it is not in the manifest.
+        '''
+        return self.read_manifest().get(table, {}).get(str(season), {}).get("fetched_at")
+
+    def is_stale(self, table: str, season: str) -> bool:
+        '''
+        Check whether a table of the season in progress was fetched more than ttl seconds ago.
+        Completed seasons are never stale.
+        '''
+        if self.ttl <= 0 or season_end_year(season) < get_current_season():
+            return False
+
+        fetched_at = self.fetched_at(table, season)
+        if fetched_at is None:
+            return True
+        return (datetime.now(timezone.utc) - datetime.fromisoformat(fetched_at)).total_seconds() > self.ttl
+
+    def has(self, table: str, season: str) -> bool:
+        '''
+        Check whether a table of a season is in the store.
+        '''
+        return self._path(table, str(season)).exists()
+
+    def read(self, table: str, season: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        '''
+        Read a table of a season from the store, loading only the requested columns.
+        '''
+        frame, fetched_at = self._frames.get((table, str(season)), (None, None))
+        # A preloaded table is only served until the table is refreshed, e.g. by another worker
+        if frame is not None and fetched_at == self.fetched_at(table, season):
+            return frame[columns] if columns else frame.copy(deep=False)
+
+        arrow_table = pq.read_table(self._path(table, str(season)), columns=columns, memory_map=True, partitioning=None)
+        return arrow_table.to_pandas()
+
+    def write(self, table: str, season: str, df: pd.DataFrame) -> None:
+        '''
+        Write a table of a season to the store and record it in the manifest.
+        '''
+        season = str(season)
+        path = self._path(table, season)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Unique per writer, threads and workers may write the same table concurrently
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self._frames.pop((table, season), None)
+
+        # The read-modify-write of the manifest is serialized across the server workers
+        with portalocker.Lock(str(self.store_dir / ".manifest.lock"), timeout=60), self._lock:
+            manifest = self._load_manifest()
+            manifest.setdefault(table, {})[season] = {
+                "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "rows": len(df),
+                "columns": [str(column) for column in df.columns],
+            }
+            tmp_manifest = self.manifest_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            tmp_manifest.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            os.replace(tmp_manifest, self.manifest_path)
+
+    def preload(self) -> int:
+        '''
+        Load every table of the manifest into memory, e.g. in the server master process before the
+        workers are forked, so that the workers share the frames copy-on-write.
+
+        Returns:
+            The number of tables loaded.
+        '''
+        for table, seasons in self.read_manifest().items():
+            for season, entry in seasons.items():
+                if self.has(table, season):
+                    frame = pq.read_table(self._path(table, season), partitioning=None).to_pandas()
+                    self._frames[(table, season)] = (frame, entry.get("fetched_at"))
+
+        return len(self._frames)
+
+# Process-wide store used by the data agent tools
+season_store = SeasonStore()
+
+# One refresh of a table at a time in a process, the other readers wait for it
+_refresh_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_refresh_locks_guard = threading.Lock()
+
+def fetch_season_table(table: str, season: str) -> pd.DataFrame:
+    '''
+    Read a table of a season from the upstream source.
+    '''
+    return getattr(CreateSeason(str(season)), SEASON_TABLES[table])()
+
+def read_season_table(table: str, season: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    '''
+    Read a table of a season, from the local store first.
+    Missing tables, and stale tables of the season in progress, are fetched from the upstream source
+    and written to the store, unless SEASON_STORE_OFFLINE is set. A stale table is served if the refresh fails.
+
+    Args:
+        table: Name of the table, one of SEASON_TABLES.
+        season: The season to read.
+        columns: Columns to load. All columns are loaded if omitted.
+    '''
+    def fresh() -> bool:
+        return season_store.has(table, season) and (SEASON_STORE_OFFLINE == 'true' or not season_store.is_stale(table, season))
+
+    if fresh():
+        return season_store.read(table, season, columns=columns)
+
+    if SEASON_STORE_OFFLINE == 'true':
+        raise FileNotFoundError(f"Table {table} of season {season} is not in the local season store")
+
+    with _refresh_locks_guard:
+        refresh_lock = _refresh_locks.setdefault((table, str(season)), threading.Lock())
+
+    with refresh_lock:
+        # Refreshed by another thread in the meantime
+        if fresh():
+            return season_store.read(table, season, columns=columns)
+
+        try:
+            df = fetch_season_table(table, season)
+        except Exception as e:
+            if not season_store.has(table, season):
+                raise
+            logger.warning(f"Error refreshing {table} of season {season}, serving the stored table: {e}")
+            return season_store.read(table, season, columns=columns)
+
+        try:
+            season_store.write(table, season, df)
+        except Exception as e:
+            logger.error(f"Error writing {table} of season {season} to the season store: {e}")
+
+    return df[columns] if columns else df
+
+@app.command()
+def ingest(
+    start_season: int = typer.Option(
+        2015,
+        help="First season to ingest."
+        ),
+    end_season: Optional[int] = typer.Option(
+        None,
+        help="Last season to ingest, the current season if omitted."
+        ),
+    force: bool = typer.Option(
+        False,
+        help="Fetch completed seasons again even if they are already in the store."
+        ),
+):
+    '''
+    Snapshot the season tables into the local store.
+    Completed seasons are only fetched once, the current season is always refreshed.
+    '''
+    current_season = get_current_season()
+    if end_season is None:
+        end_season = current_season
+
+    for season in range(start_season, end_season + 1):
+        for table in SEASON_TABLES:
+            if season_store.has(table, str(season)) and season < current_season and not force:
+                continue
+
+            try:
+                df = fetch_season_table(table, str(season))
+                season_store.write(table, str(season), df)
+                logger.info(f"Ingested {table} of season {season} ({len(df)} rows)")
+            except Exception as e:
+                logger.error(f"Error ingesting {table} of season {season}: {e}")
+
+    logger.info("Season store ingestion complete.")
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,446 @@
+'''
+This module provides a semantic response cache in front of the team runs.
+The normalized question is embedded and looked up in a local vector index (SQLite file shared by the
+server workers), among the answers given to the same user for the same parameters (seasons, game dates, counts,
+teams, stats, positions, number of clusters).
+An answer above the similarity threshold is returned with its provenance instead of running the team.
+
+Answers about completed seasons never expire. Answers about the current season (or without a season)
+expire after SEMANTIC_CACHE_TTL and as soon as the season store is refreshed.
+'''
+import re
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+from agno.run.base import RunStatus
+from agno.run.team import TeamRunEvent, TeamRunInput, TeamRunOutput
+from agno.team import Team
+from agno.utils.events import (
+    create_team_run_started_event,
+    create_team_run_output_content_event,
+    create_team_run_completed_event,
+    )
+
+from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.season_store import season_store, get_current_season
+from utils.session_history import aget_session, asave_team_run
+from utils.knowledge_base import HashingEmbedder
+from utils.config import (
+    SEMANTIC_CACHE,
+    SEMANTIC_CACHE_PATH,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
+    SEMANTIC_CACHE_EMBEDDER,
+    SQLITE_BUSY_TIMEOUT_MS,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+# Team names and abbreviations mapped to the abbreviation
+NBA_TEAMS: Dict[str, str] = {
+    "hawks": "ATL", "celtics": "BOS", "nets": "BKN", "hornets": "CHA", "bulls": "CHI",
+    "cavaliers": "CLE", "cavs": "CLE", "mavericks": "DAL", "mavs": "DAL", "nuggets": "DEN",
+    "pistons": "DET", "warriors": "GSW", "rockets": "HOU", "pacers": "IND", "clippers": "LAC",
+    "lakers": "LAL", "grizzlies": "MEM", "heat": "MIA", "bucks": "MIL", "timberwolves": "MIN",
+    "wolves": "MIN", "pelicans": "NOP", "knicks": "NYK", "thunder": "OKC", "magic": "ORL",
+    "76ers": "PHI", "sixers": "PHI", "suns": "PHX", "blazers": "POR", "kings": "SAC",
+    "spurs": "SAS", "raptors": "TOR", "jazz": "UTA", "wizards": "WAS",
+}
+NBA_TEAMS.update({abbreviation.lower(): abbreviation for abbreviation in set(NBA_TEAMS.values())})
+
+# Seasons like "2024", "2023-24" or "2023/2024", named after the year in which they end
+SEASON = re.compile(r"\b((?:19|20)\d{2})(?:\s*[-/]\s*((?:19|20)?\d{2}))?\b")
+GAME_DATE = re.compile(r"\b((?:19|20)\d{6})\b")
+COUNT = re.compile(r"\b\d+\b")
+N_CLUSTER = re.compile(r"\b(\d{1,2})\s*(?:clusters|groups|k\b)|\bk\s*=\s*(\d{1,2})\b")
+FILLER = re.compile(r"\b(please|kindly|can you|could you|would you|tell me|give me|show me|the|a|an)\b")
+
+# Stat and position words mapped to one token, a question about another stat or position has another answer
+STATS: Dict[str, str] = {
+    "points": "PTS", "pts": "PTS", "ppg": "PTS", "scoring": "PTS", "scorer": "PTS", "scorers": "PTS",
+    "rebounds": "TRB", "rebound": "TRB", "rebounding": "TRB", "reb": "TRB", "trb": "TRB", "rpg": "TRB",
+    "orb": "ORB", "oreb": "ORB", "drb": "DRB", "dreb": "DRB",
+    "assists": "AST", "assist": "AST", "ast": "AST", "apg": "AST",
+    "steals": "STL", "steal": "STL", "stl": "STL", "blocks": "BLK", "block": "BLK", "blk": "BLK",
+    "turnovers": "TOV", "turnover": "TOV", "tov": "TOV", "fouls": "PF", "foul": "PF",
+    "minutes": "MP", "mp": "MP", "mpg": "MP",
+    "fg": "FG", "fga": "FGA", "fgm": "FG", "3p": "3P", "3pt": "3P", "3pm": "3P", "3pa": "3PA", "3par": "3PAr",
+    "threes": "3P", "three": "3P", "2p": "2P", "2pt": "2P", "2pa": "2PA", "twos": "2P",
+    "ft": "FT", "ftm": "FT", "fta": "FTA", "ftr": "FTr", "free": "FT",
+    "efg": "eFG", "ts": "TS", "usg": "USG", "usage": "USG",
+    "bpm": "BPM", "obpm": "OBPM", "dbpm": "DBPM", "vorp": "VORP", "ws": "WS", "ws48": "WS/48",
+    "ortg": "ORtg", "drtg": "DRtg", "net": "NRtg", "pace": "Pace", "plus": "+/-", "minus": "+/-",
+    "offensive": "OFF", "offense": "OFF", "defensive": "DEF", "defense": "DEF",
+    "percentage": "%", "percent": "%", "pct": "%", "attempts": "A", "attempted": "A", "made": "M", "makes": "M",
+    "wins": "W", "win": "W", "losses": "L", "loss": "L",
+}
+POSITIONS: Dict[str, str] = {
+    "point guard": "PG", "shooting guard": "SG", "small forward": "SF", "power forward": "PF",
+    "pg": "PG", "sg": "SG", "sf": "SF", "pf": "PF",
+    "guard": "G", "forward": "F", "wing": "W", "center": "C", "centre": "C", "big": "B",
+}
+POSITION = re.compile(r"\b(" + "|".join(sorted(map(re.escape, POSITIONS), key=len, reverse=True)) + r")s?\b")
+
+def extract_parameters(question: str) -> Dict[str, Any]:
+    '''
+    Extract the parameters that an answer depends on: the seasons, the game dates, the counts (e.g. the N of "top N"),
+    the teams, the stats, the positions and the number of clusters. Questions with other parameters never share an answer.
+    '''
+    text = question.lower()
+
+    dates = set(GAME_DATE.findall(text))
+    text_without_dates = GAME_DATE.sub(" ", text)
+
+    seasons = set()
+    for start, end in SEASON.findall(text_without_dates):
+        seasons.add(int(start[:2] + end[-2:]) if end else int(start))
+    counts = {int(count) for count in COUNT.findall(SEASON.sub(" ", text_without_dates))}
+
+    positions = {POSITIONS[position] for position in POSITION.findall(text)}
+    words = re.findall(r"[a-z0-9]+", POSITION.sub(" ", text))
+    teams = {NBA_TEAMS[word] for word in words if word in NBA_TEAMS}
+    stats = {STATS[word] for word in words if word in STATS}
+
+    n_cluster = next((int(a or b) for a, b in N_CLUSTER.findall(text)), None)
+
+    return {
+        "seasons": sorted(seasons),
+        "dates": sorted(dates),
+        "counts": sorted(counts),
+        "teams": sorted(teams),
+        "stats": sorted(stats),
+        "positions": sorted(positions),
+        "n_cluster": n_cluster,
+    }
+
+def normalize_question(question: str) -> str:
+    '''
+    Lowercase the question, unify the season notation and strip the punctuation, the articles and filler words.
+    '''
+    text = SEASON.sub(lambda m: str(int(m.group(1)[:2] + m.group(2)[-2:])) if m.group(2) else m.group(1), question.lower())
+    text = FILLER.sub(" ", text)
+    return " ".join(re.findall(r"[a-z0-9%]+", text))
+
+# Minimum similarity of a hit per embedder: the hashing embedder only matches the same wording
+THRESHOLDS = {"hashing": 0.97, "openai": 0.9}
+
+def get_threshold(name: str = SEMANTIC_CACHE_EMBEDDER) -> float:
+    '''
+    Return SEMANTIC_CACHE_THRESHOLD if set, else the threshold of the embedder.
+    '''
+    if SEMANTIC_CACHE_THRESHOLD:
+        return float(SEMANTIC_CACHE_THRESHOLD)
+    return THRESHOLDS.get(name, THRESHOLDS["hashing"])
+
+def get_embedder(name: str = SEMANTIC_CACHE_EMBEDDER) -> Any:
+    '''
+    Return the embedder of the cache: "hashing" (local) or "openai" (matches paraphrases, one API call per lookup).
+    '''
+    if name == "openai":
+        from agno.knowledge.embedder.openai import OpenAIEmbedder
+        return OpenAIEmbedder()
+
+    return HashingEmbedder()
+
+class SemanticCache:
+    '''
+    Vector index of the answers in a SQLite file, with hit-rate counters of the current process.
+    '''
+
+    def __init__(
+            self,
+            path: str = SEMANTIC_CACHE_PATH,
+            threshold: Optional[float] = None,
+            ttl: int = SEMANTIC_CACHE_TTL,
+            embedder: Optional[Any] = None,
+            ):
+        '''
+        Args:
+            path: The SQLite file of the index, shared by the server workers.
+            threshold: Minimum cosine similarity of a cached question to return its answer. Defaults to `get_threshold()`.
+            ttl: Seconds after which answers about the current season expire.
+            embedder: Object with a get_embedding(text) method. Defaults to SEMANTIC_CACHE_EMBEDDER.
+        '''
+        self.path = Path(path)
+        self.threshold = threshold if threshold is not None else get_threshold()
+        self.ttl = ttl
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "expired": 0, "stores": 0}
+
+    @property
+    def embedder(self) -> Any:
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        try:
+            if not self._initialized:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS answers (
+                        id INTEGER PRIMARY KEY,
+                        scope TEXT NOT NULL,
+                        user_id TEXT,
+                        parameters TEXT NOT NULL,
+                        question TEXT NOT NULL,
+                        embedding BLOB NOT NULL,
+                        answer TEXT NOT NULL,
+                        provenance TEXT NOT NULL,
+                        data_version TEXT,
+                        created_at REAL NOT NULL,
+                        expires_at REAL,
+                        hits INTEGER NOT NULL DEFAULT 0
+                    )
+                    """
+                )
+                # Files created before the answers were keyed by user
+                columns = [row[1] for row in connection.execute("PRAGMA table_info(answers)")]
+                if "user_id" not in columns:
+                    connection.execute("ALTER TABLE answers ADD COLUMN user_id TEXT")
+                connection.execute("CREATE INDEX IF NOT EXISTS answers_lookup ON answers (scope, parameters)")
+                self._initialized = True
+
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.get_embedding(normalize_question(question)), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    @staticmethod
+    def data_version(parameters: Dict[str, Any]) -> Optional[str]:
+        '''
+        Return the latest fetch timestamp of the season store tables for the seasons of the question,
+        or None if all its seasons are completed and the answer never expires.
+        '''
+        current_season = get_current_season()
+        seasons = [str(season) for season in parameters["seasons"] if season >= current_season]
+        if parameters["seasons"] and not seasons:
+            return None
+
+        seasons = seasons or [str(current_season)]
+        fetched_at = [
+            entry["fetched_at"]
+            for table in season_store.read_manifest().values()
+            for season, entry in table.items()
+            if season in seasons
+        ]
+        return max(fetched_at, default="")
+
+    def lookup(self, scope: str, question: str, user_id: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        '''
+        Return the cached answer to a question and its provenance, None on a miss.
+
+        Args:
+            scope: The team or agent the answer comes from.
+            question: The question of the user.
+            user_id: The user asking, answers may depend on the memories of the user.
+        '''
+        self._count("lookups")
+        parameters = extract_parameters(question)
+        vector = self._embed(question)
+        now = time.time()
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, embedding, answer, provenance, data_version, expires_at FROM answers "
+                "WHERE scope = ? AND user_id IS ? AND parameters = ?",
+                (scope, user_id, json.dumps(parameters)),
+            ).fetchall()
+            rows = [row for row in rows if len(row[1]) == vector.nbytes]
+            if not rows:
+                self._count("misses")
+                return None
+
+            similarities = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self._count("misses")
+                return None
+
+            entry_id, _, answer, provenance, data_version, expires_at = rows[best]
+            if expires_at is not None and (now > expires_at or data_version != self.data_version(parameters)):
+                connection.execute("DELETE FROM answers WHERE id = ?", (entry_id,))
+                self._count("expired")
+                self._count("misses")
+                return None
+
+            connection.execute("UPDATE answers SET hits = hits + 1 WHERE id = ?", (entry_id,))
+
+        self._count("hits")
+        provenance = {**json.loads(provenance), "similarity": round(float(similarities[best]), 3)}
+        logger.info(f"Semantic cache hit for {scope} (similarity {provenance['similarity']}): {question[:80]}")
+        return answer, provenance
+
+    def store(self, scope: str, question: str, answer: str, provenance: Dict[str, Any], user_id: Optional[str] = None) -> None:
+        '''
+        Store the answer to a question.
+
+        Args:
+            scope: The team or agent the answer comes from.
+            question: The question of the user.
+            answer: The answer of the run.
+            provenance: Where the answer comes from, e.g. the run and session ids.
+            user_id: The user asking, the answer is only returned to the same user.
+        '''
+        parameters = extract_parameters(question)
+        data_version = self.data_version(parameters)
+        now = time.time()
+        expires_at = None if data_version is None else now + self.ttl
+        provenance = {
+            **provenance,
+            "question": question,
+            "cached_at": datetime.fromtimestamp(now, timezone.utc).isoformat(timespec="seconds"),
+        }
+
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO answers (scope, user_id, parameters, question, embedding, answer, provenance, data_version, "
+                "created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    scope,
+                    user_id,
+                    json.dumps(parameters),
+                    question,
+                    self._embed(question).tobytes(),
+                    answer,
+                    json.dumps(provenance),
+                    data_version,
+                    now,
+                    expires_at,
+                ),
+            )
+        self._count("stores")
+
+    def invalidate(self, scope: Optional[str] = None) -> int:
+        '''
+        Delete the cached answers of a scope, or all answers. Returns the number of deleted answers.
+        '''
+        with self._connect() as connection:
+            if scope is None:
+                return connection.execute("DELETE FROM answers").rowcount
+            return connection.execute("DELETE FROM answers WHERE scope = ?", (scope,)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        '''
+        Return the counters of the current process and the hit rate.
+        '''
+        with self._lock:
+            counters = dict(self.counters)
+        counters["hit_rate"] = round(counters["hits"] / counters["lookups"], 3) if counters["lookups"] else 0.0
+        return counters
+
+# Process-wide cache used by the team
+semantic_cache = SemanticCache()
+metrics.register_collector("semantic_cache", semantic_cache.stats)
+
+class CachedTeam(Team):
+    '''
+    Team that answers repeated questions from the semantic cache.
+
+    Only the async runs used by the AgentOS are cached, and only the first run of a session is looked up
+    and stored, since follow-up questions depend on the conversation. The answers are cached per user,
+    since they may depend on the memories of the user. Answers from the cache are added to the session
+    like the runs of the team, so that follow-up questions get them in their history.
+    '''
+
+    def _cached_output(
+            self, input: str, answer: str, provenance: Dict[str, Any], session_id: Optional[str], user_id: Optional[str],
+            ) -> TeamRunOutput:
+        return TeamRunOutput(
+            run_id=f"cached-{provenance.get('run_id')}",
+            team_id=self.id,
+            team_name=self.name,
+            session_id=session_id or str(uuid.uuid4()),
+            user_id=user_id,
+            input=TeamRunInput(input_content=input),
+            content=f"{answer}\n\n_Cached answer from {provenance['cached_at']} to: \"{provenance['question']}\"._",
+            status=RunStatus.completed,
+            metadata={"semantic_cache": provenance},
+        )
+
+    async def _is_cacheable(self, input: Any, session_id: Optional[str], kwargs: Dict[str, Any]) -> bool:
+        if SEMANTIC_CACHE != 'true' or not isinstance(input, str):
+            return False
+        if any(kwargs.get(media) for media in ("images", "audio", "videos", "files")):
+            return False
+        if session_id is None:
+            return True
+
+        session = await aget_session(self, session_id)
+        return session is None or not session.runs
+
+    def _store(self, question: str, content: Any, run_id: Optional[str], session_id: Optional[str], user_id: Optional[str]) -> None:
+        if isinstance(content, str) and content:
+            semantic_cache.store(
+                self.id, question, content, {"run_id": run_id, "session_id": session_id, "team_id": self.id}, user_id=user_id,
+                )
+
+    async def _arun_cached(self, input: Any, session_id: Optional[str], **kwargs: Any) -> TeamRunOutput:
+        if not await self._is_cacheable(input, session_id, kwargs):
+            return await super().arun(input, session_id=session_id, stream=False, **kwargs)
+
+        hit = await asyncio.to_thread(semantic_cache.lookup, self.id, input, kwargs.get("user_id"))
+        if hit is not None:
+            output = self._cached_output(input, *hit, session_id=session_id, user_id=kwargs.get("user_id"))
+            await asave_team_run(self, output, output.content)
+            return output
+
+        output = await super().arun(input, session_id=session_id, stream=False, **kwargs)
+        if output.status == RunStatus.completed:
+            await asyncio.to_thread(self._store, input, output.content, output.run_id, output.session_id, kwargs.get("user_id"))
+        return output
+
+    async def _astream_cached(self, input: Any, session_id: Optional[str], **kwargs: Any) -> AsyncIterator[Any]:
+        if not await self._is_cacheable(input, session_id, kwargs):
+            async for event in super().arun(input, session_id=session_id, stream=True, **kwargs):
+                yield event
+            return
+
+        hit = await asyncio.to_thread(semantic_cache.lookup, self.id, input, kwargs.get("user_id"))
+        if hit is not None:
+            output = self._cached_output(input, *hit, session_id=session_id, user_id=kwargs.get("user_id"))
+            yield create_team_run_started_event(from_run_response=output)
+            yield create_team_run_output_content_event(from_run_response=output, content=output.content)
+            await asave_team_run(self, output, output.content)
+            yield create_team_run_completed_event(from_run_response=output)
+            return
+
+        async for event in super().arun(input, session_id=session_id, stream=True, **kwargs):
+            if getattr(event, "event", None) == TeamRunEvent.run_completed.value and event.team_id == self.id:
+                await asyncio.to_thread(self._store, input, event.content, event.run_id, event.session_id, kwargs.get("user_id"))
+            yield event
+
+    def arun(self, input: Any, *, stream: Optional[bool] = None, session_id: Optional[str] = None, **kwargs: Any):  # type: ignore
+        if stream is None:
+            stream = self.stream or False
+
+        if stream:
+            return self._astream_cached(input, session_id, **kwargs)
+        return self._arun_cached(input, session_id, **kwargs)
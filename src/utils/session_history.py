@@ -0,0 +1,155 @@
+'''
+This module configures how much session history the agents and the team send to their models.
+Only the last runs are replayed, older runs are covered by a rolling session summary,
+consumed tool results are stripped from the history and the context of a run is kept within a token budget.
+The context tokens of every run are recorded per session, so that the growth of long sessions can be monitored.
+'''
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from agno.compression.manager import CompressionManager
+from agno.db.base import AsyncBaseDb
+from agno.models.message import Message
+from agno.session.team import TeamSession
+
+from utils.logger import get_logger
+from utils.config import (
+    HISTORY_NUM_RUNS,
+    HISTORY_MAX_TOOL_CALLS,
+    HISTORY_SESSION_SUMMARIES,
+    HISTORY_TOKEN_BUDGET,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+class SessionTokenMeter:
+    '''
+    Bounded in-memory record of the tokens used per session.
+    '''
+
+    def __init__(self, max_sessions: int = 1024, token_budget: int = HISTORY_TOKEN_BUDGET):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self._sessions: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, session_id: str, input_tokens: int, output_tokens: int) -> Dict[str, int]:
+        '''
+        Add the tokens of a run to its session and return the updated session stats.
+        '''
+        with self._lock:
+            stats = self._sessions.pop(session_id, None) or {
+                "runs": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "last_input_tokens": 0,
+                "max_input_tokens": 0,
+                "runs_over_budget": 0,
+            }
+            stats["runs"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["last_input_tokens"] = input_tokens
+            stats["max_input_tokens"] = max(stats["max_input_tokens"], input_tokens)
+            if self.token_budget and input_tokens > self.token_budget:
+                stats["runs_over_budget"] += 1
+
+            self._sessions[session_id] = stats
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+            return dict(stats)
+
+    def get(self, session_id: str) -> Optional[Dict[str, int]]:
+        '''
+        Return the stats of a session, None if the session has no recorded runs.
+        '''
+        with self._lock:
+            stats = self._sessions.get(session_id)
+            return dict(stats) if stats is not None else None
+
+# Process-wide meter shared by all agents and the team
+session_token_meter = SessionTokenMeter()
+
+def record_session_tokens(run_output: Any, session: Any) -> None:
+    '''
+    Post hook of the agents and the team: record the tokens of the run for its session.
+    '''
+    metrics = getattr(run_output, "metrics", None)
+    if metrics is None or session is None:
+        return
+
+    stats = session_token_meter.record(session.session_id, metrics.input_tokens or 0, metrics.output_tokens or 0)
+    if HISTORY_TOKEN_BUDGET and stats["last_input_tokens"] > HISTORY_TOKEN_BUDGET:
+        logger.warning(
+            f"Session {session.session_id} used {stats['last_input_tokens']} input tokens in run {stats['runs']}, "
+            f"above the budget of {HISTORY_TOKEN_BUDGET}"
+        )
+
+async def aget_session(team: Any, session_id: str) -> Any:
+    '''
+    Load the session of an agent or a team without blocking the event loop.
+    `aget_session` of agno requires an async db, the sync SqliteDb is read in a thread.
+    '''
+    if isinstance(team.db, AsyncBaseDb):
+        return await team.aget_session(session_id=session_id)
+    return await asyncio.to_thread(team.get_session, session_id=session_id)
+
+async def asave_session(team: Any, session: Any) -> None:
+    '''
+    Save the session of an agent or a team without blocking the event loop, the sync SqliteDb is written in a thread.
+    '''
+    if isinstance(team.db, AsyncBaseDb):
+        await team.asave_session(session)
+    else:
+        await asyncio.to_thread(team.save_session, session)
+
+async def asave_team_run(team: Any, output: Any, content: str) -> None:
+    '''
+    Add a run answered without the team model (e.g. routed or cached) to the team session,
+    with the question and the answer as messages, so that the follow-up questions get it in their history.
+    '''
+    output.messages = [
+        Message(role="user", content=output.input.input_content),
+        Message(role="assistant", content=content),
+        ]
+    if team.db is None:
+        return
+
+    session = await aget_session(team, output.session_id)
+    if session is None:
+        session = TeamSession(session_id=output.session_id, team_id=team.id, user_id=output.user_id, created_at=int(time.time()))
+    session.upsert_run(output)
+    await asave_session(team, session)
+
+def get_history_settings(team: bool = False) -> Dict[str, Any]:
+    '''
+    Return the history settings passed to an Agent or a Team.
+
+    Args:
+        team: Whether the settings are for a Team, whose members also get the last team runs.
+    '''
+    settings: Dict[str, Any] = {
+        "add_history_to_context": True,
+        "num_history_runs": HISTORY_NUM_RUNS,
+        "max_tool_calls_from_history": HISTORY_MAX_TOOL_CALLS,
+        "post_hooks": [record_session_tokens],
+    }
+
+    if HISTORY_SESSION_SUMMARIES == 'true':
+        settings["enable_session_summaries"] = True
+        settings["add_session_summary_to_context"] = True
+
+    if HISTORY_TOKEN_BUDGET > 0:
+        # Tool results of the current run are compressed once the context exceeds the budget
+        settings["compress_tool_results"] = True
+        settings["compression_manager"] = CompressionManager(compress_token_limit=HISTORY_TOKEN_BUDGET)
+
+    if team:
+        settings["num_team_history_runs"] = HISTORY_NUM_RUNS
+
+    return settings
@@ -0,0 +1,214 @@
+'''
+This module provides a SQL toolkit for the agents, backed by an embedded DuckDB engine.
+The tables are views over the local Parquet files (season store and play-by-play cache), so one aggregate
+query can replace several pandas tool calls and only the result rows are sent back to the model.
+'''
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import duckdb
+import pandas as pd
+from agno.tools import Toolkit
+
+from utils.logger import get_logger
+from utils.table_format import to_toon
+from utils.config import (
+    SEASON_STORE_DIR,
+    PBP_CACHE_DIR,
+    SQL_MAX_ROWS,
+    SQL_CACHE_SIZE,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+def normalize_sql(query: str) -> str:
+    '''
+    Normalize a query for the cache key: surrounding whitespace, trailing semicolons and line breaks are removed.
+    '''
+    return " ".join(query.strip().rstrip(";").split())
+
+class StatsSqlTools(Toolkit):
+    '''
+    Read-only SQL tools over the local basketball data.
+
+    Views:
+        <table> of the season store (e.g. team_shooting, adv_stats) with a season column,
+        game_events with the parsed play-by-play events and the columns date and home_team.
+    '''
+
+    def __init__(
+        self,
+        season_store_dir: str = SEASON_STORE_DIR,
+        pbp_cache_dir: str = PBP_CACHE_DIR,
+        max_rows: int = SQL_MAX_ROWS,
+        cache_size: int = SQL_CACHE_SIZE,
+        **kwargs,
+    ):
+        '''
+        Args:
+            season_store_dir: Root directory of the season store.
+            pbp_cache_dir: Directory of the play-by-play cache.
+            max_rows: Maximum number of rows returned per query.
+            cache_size: Number of query results kept in memory.
+        '''
+        self.season_store_dir = Path(season_store_dir)
+        self.pbp_cache_dir = Path(pbp_cache_dir)
+        self.max_rows = max_rows
+        self.cache_size = cache_size
+
+        # The queries are written by the model: file access is limited to the data directories
+        self._connection = duckdb.connect(":memory:")
+        allowed = ", ".join(f"'{path.resolve().as_posix()}/'" for path in (self.season_store_dir, self.pbp_cache_dir))
+        self._connection.execute(f"SET allowed_directories = [{allowed}]")
+        self._connection.execute("SET enable_external_access = false")
+        self._connection.execute("SET lock_configuration = true")
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple] = None
+        self._cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+
+        super().__init__(
+            name="stats_sql_tools",
+            tools=[self.list_tables, self.describe_table, self.run_sql_query],
+            **kwargs,
+        )
+
+    def _data_version(self) -> Tuple:
+        '''
+        Version of the underlying files: the season store manifest and the play-by-play cache directory.
+        '''
+        manifest = self.season_store_dir / "manifest.json"
+        return (
+            manifest.stat().st_mtime_ns if manifest.exists() else None,
+            self.pbp_cache_dir.stat().st_mtime_ns if self.pbp_cache_dir.exists() else None,
+        )
+
+    def _view_sources(self) -> Dict[str, str]:
+        '''
+        Return the SELECT statement of every view whose files exist.
+        '''
+        sources = {}
+        if self.season_store_dir.exists():
+            for table_dir in sorted(self.season_store_dir.iterdir()):
+                if table_dir.is_dir() and any(table_dir.glob("season=*/*.parquet")):
+                    sources[table_dir.name] = (
+                        f"SELECT * FROM read_parquet('{table_dir.resolve().as_posix()}/season=*/*.parquet', "
+                        "hive_partitioning = true, union_by_name = true)"
+                    )
+
+        if any(self.pbp_cache_dir.glob("*.events.parquet")):
+            sources["game_events"] = (
+                "SELECT regexp_extract(filename, '(\\d{8})_(\\w+)\\.events', 1) AS date, "
+                "regexp_extract(filename, '(\\d{8})_(\\w+)\\.events', 2) AS home_team, "
+                "* EXCLUDE (filename) "
+                f"FROM read_parquet('{self.pbp_cache_dir.resolve().as_posix()}/*.events.parquet', filename = true, union_by_name = true)"
+            )
+
+        return sources
+
+    def _refresh(self) -> None:
+        '''
+        Recreate the views and clear the query cache when the underlying files have changed.
+        Must be called with the lock held.
+        '''
+        version = self._data_version()
+        if version == self._version:
+            return
+
+        existing = {row[0] for row in self._connection.execute(
+            "SELECT view_name FROM duckdb_views() WHERE NOT internal").fetchall()}
+        sources = self._view_sources()
+        for name in existing - set(sources):
+            self._connection.execute(f'DROP VIEW "{name}"')
+        for name, select in sources.items():
+            self._connection.execute(f'CREATE OR REPLACE VIEW "{name}" AS {select}')
+
+        self._cache.clear()
+        self._version = version
+
+    def list_tables(self) -> str:
+        '''
+        Use this function to list the tables available for SQL queries with their columns.
+
+        Returns:
+            str: One line per table with its column names and types.
+        '''
+        with self._lock:
+            self._refresh()
+            columns = self._connection.execute(
+                "SELECT table_name, column_name, data_type FROM information_schema.columns ORDER BY table_name, ordinal_position"
+            ).df()
+
+        if columns.empty:
+            return "No tables available. Ingest the season data or fetch a game first."
+
+        return "\n".join(
+            f"{table}: " + ", ".join(f"{row.column_name} {row.data_type}" for row in group.itertuples())
+            for table, group in columns.groupby("table_name", sort=True)
+        )
+
+    def describe_table(self, table: str) -> str:
+        '''
+        Use this function to get the schema and summary statistics of a table.
+
+        Args:
+            table (str): Name of the table, as returned by list_tables.
+
+        Returns:
+            str: The summary of every column (type, min, max, distinct values, null percentage).
+        '''
+        with self._lock:
+            self._refresh()
+            try:
+                summary = self._connection.execute(f'SUMMARIZE "{table}"').df()
+            except duckdb.Error as e:
+                return f"Error describing table {table}: {e}"
+
+        return to_toon(summary[["column_name", "column_type", "min", "max", "approx_unique", "null_percentage"]])
+
+    def run_sql_query(self, query: str, limit: Optional[int] = None) -> str:
+        '''
+        Use this function to run a read-only SQL query (DuckDB dialect) on the basketball data.
+        Aggregate, filter and join in SQL so that only the rows needed for the answer are returned.
+
+        Args:
+            query (str): A single SELECT statement.
+            limit (Optional[int]): Maximum number of rows to return. Capped by the configured maximum.
+
+        Returns:
+            str: The result rows in TOON format, with a note if the result was truncated.
+        '''
+        limit = min(limit or self.max_rows, self.max_rows)
+
+        try:
+            statements = duckdb.extract_statements(query)
+        except duckdb.Error as e:
+            return f"Error parsing query: {e}"
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            return "Error: only a single SELECT statement is allowed."
+
+        key = (normalize_sql(query), limit)
+        with self._lock:
+            self._refresh()
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+            try:
+                # Fetch one row more than the limit to detect a truncated result
+                df: pd.DataFrame = self._connection.execute(
+                    f"SELECT * FROM ({query.strip().rstrip(';')}\n) LIMIT {limit + 1}").df()
+            except duckdb.Error as e:
+                return f"Error running query: {e}"
+
+            result = to_toon(df.head(limit))
+            if len(df) > limit:
+                result += f"\n\nResult truncated to {limit} rows. Aggregate or filter the query to get fewer rows."
+
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return result
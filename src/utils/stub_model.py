@@ -0,0 +1,77 @@
+'''
+This module provides a stub LLM provider for load tests and offline runs.
+It answers every request with a short canned text after a fixed latency, without any network call,
+so that the throughput of the server itself can be measured (set llm=stub and llm_reasoning=stub).
+'''
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.response import ModelResponse
+
+from utils.config import STUB_LLM_LATENCY_MS
+
+@dataclass
+class StubModel(Model):
+    '''
+    Model that echoes the last user message after STUB_LLM_LATENCY_MS milliseconds.
+    '''
+    id: str = "stub"
+    name: str = "StubModel"
+    provider: str = "Stub"
+    latency_ms: int = STUB_LLM_LATENCY_MS
+    supports_native_structured_outputs: bool = True
+
+    def _response(self, messages: List[Message], response_format: Optional[Any] = None) -> ModelResponse:
+        user_message = next((message for message in reversed(messages) if message.role == "user"), None)
+        question = str(user_message.content) if user_message is not None else ""
+        content = f"Stub answer to: {question[:200]}"
+
+        # Structured outputs (e.g. the session summaries) get the answer in every text field
+        if isinstance(response_format, type) and hasattr(response_format, "model_fields"):
+            content = json.dumps({
+                name: content for name, field in response_format.model_fields.items() if field.annotation is str
+            })
+
+        # Token usage estimated with 4 characters per token
+        input_tokens = sum(len(str(message.content or "")) for message in messages) // 4
+        output_tokens = len(content) // 4
+
+        return ModelResponse(
+            role="assistant",
+            content=content,
+            response_usage=Metrics(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+                ),
+            )
+
+    def invoke(self, messages: List[Message], assistant_message: Message, **kwargs) -> ModelResponse:
+        time.sleep(self.latency_ms / 1000)
+        return self._response(messages, kwargs.get("response_format"))
+
+    async def ainvoke(self, messages: List[Message], assistant_message: Message, **kwargs) -> ModelResponse:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._response(messages, kwargs.get("response_format"))
+
+    def invoke_stream(self, messages: List[Message], assistant_message: Message, **kwargs) -> Iterator[ModelResponse]:
+        time.sleep(self.latency_ms / 1000)
+        yield self._response(messages, kwargs.get("response_format"))
+
+    async def ainvoke_stream(
+        self, messages: List[Message], assistant_message: Message, **kwargs
+    ) -> AsyncIterator[ModelResponse]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        yield self._response(messages, kwargs.get("response_format"))
+
+    def _parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
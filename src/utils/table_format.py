@@ -0,0 +1,189 @@
+'''
+This module serializes the DataFrames of the tools and the workflow for the models, column by column.
+Every column is converted to strings at once with the conversion of its dtype, then the rows are joined,
+instead of checking the type of every cell of every row.
+
+Formats:
+- toon: `data[N]{col1,col2}:` followed by the rows indented by two spaces, the output of `pandas_toon`,
+- csv: a header line followed by the rows,
+- markdown: a markdown table.
+
+Missing values are written as empty cells. `iter_table` yields the table in chunks of rows, so that a large
+table can be passed on before it is fully serialized, and `read_table` parses the three formats back.
+'''
+import io
+import re
+import csv
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("toon", "csv", "markdown")
+
+# Rows serialized at once by iter_table
+CHUNK_ROWS = 256
+
+_NUMBER = re.compile(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$|^-?inf$")
+
+def _check_format(format: str) -> None:
+    if format not in FORMATS:
+        raise ValueError(f"Unknown table format '{format}', expected one of {', '.join(FORMATS)}")
+
+def _text(value, format: str) -> str:
+    '''
+    Convert a cell of a text (or mixed) column.
+    '''
+    if value is None or value is pd.NA or value != value:
+        return ""
+    if type(value) is not str:
+        value = ("true" if value else "false") if isinstance(value, (bool, np.bool_)) else str(value)
+    if format == "markdown":
+        return value.replace("|", "\\|").replace("\n", " ") if "|" in value or "\n" in value else value
+    if "," in value or '"' in value or "\n" in value or value != value.strip():
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def column_values(df: pd.DataFrame) -> List[np.ndarray]:
+    '''
+    The values of every column: numpy arrays for the numbers and booleans, object arrays for the other columns.
+    '''
+    return [
+        column.to_numpy() if isinstance(column.dtype, np.dtype) and column.dtype.kind in "biuf"
+        else column.to_numpy(dtype=object)
+        for _, column in df.items()
+        ]
+
+def column_cells(values: np.ndarray, format: str = "toon") -> List[str]:
+    '''
+    Convert the values of a column to the strings of its cells with one conversion per dtype, missing values are empty.
+    '''
+    kind = values.dtype.kind
+    if kind == "b":
+        return np.where(values, "true", "false").tolist()
+    if kind in "iu":
+        return list(map(str, values.tolist()))
+    if kind == "f":
+        cells = list(map(repr, values.tolist()))
+        for index in np.flatnonzero(np.isnan(values)).tolist():
+            cells[index] = ""
+        return cells
+
+    return [_text(value, format) for value in values.tolist()]
+
+def _join_rows(columns: List[List[str]], format: str) -> List[str]:
+    if format == "toon":
+        return ["  " + ",".join(row) for row in zip(*columns)]
+    if format == "csv":
+        return [",".join(row) for row in zip(*columns)]
+    return ["| " + " | ".join(row) + " |" for row in zip(*columns)]
+
+def iter_rows(df: pd.DataFrame, format: str = "toon", chunk_rows: int = CHUNK_ROWS) -> Iterator[List[str]]:
+    '''
+    Serialize the rows of a DataFrame chunk by chunk, one string per row without line break.
+    The rows after the last chunk consumed are not serialized.
+    '''
+    _check_format(format)
+    values = column_values(df)
+    for start in range(0, len(df), chunk_rows):
+        yield _join_rows([column_cells(column[start:start + chunk_rows], format) for column in values], format)
+
+def table_rows(df: pd.DataFrame, format: str = "toon") -> List[str]:
+    '''
+    Serialize the rows of a DataFrame, one string per row without line break.
+    '''
+    _check_format(format)
+    return _join_rows([column_cells(column, format) for column in column_values(df)], format)
+
+def table_header(df: pd.DataFrame, rows: int, format: str = "toon", table_name: str = "data") -> str:
+    '''
+    Header of a serialized table of the given number of rows.
+    '''
+    _check_format(format)
+    names = [str(column) for column in df.columns]
+    if format == "toon":
+        return f"{table_name}[{rows}]{{{','.join(names)}}}:"
+    if format == "csv":
+        return ",".join(_text(name, format) for name in names)
+    names = [_text(name, format) for name in names]
+    return "| " + " | ".join(names) + " |\n|" + "|".join("---" for _ in names) + "|"
+
+def to_table(df: pd.DataFrame, format: str = "toon", table_name: str = "data") -> str:
+    '''
+    Serialize a DataFrame in the given format.
+
+    Args:
+        df: The table.
+        format: "toon", "csv" or "markdown".
+        table_name: Name of the table in the TOON header.
+    '''
+    return "\n".join([table_header(df, len(df), format, table_name)] + table_rows(df, format))
+
+def to_toon(df: pd.DataFrame, table_name: str = "data") -> str:
+    '''
+    Serialize a DataFrame in TOON format, like `DataFrame.to_toon` of `pandas_toon`.
+    '''
+    return to_table(df, "toon", table_name)
+
+def iter_table(
+    df: pd.DataFrame,
+    format: str = "toon",
+    chunk_rows: int = CHUNK_ROWS,
+    table_name: str = "data",
+) -> Iterator[str]:
+    '''
+    Serialize a DataFrame chunk by chunk, the header first. The chunks joined are the output of `to_table`.
+
+    Args:
+        df: The table.
+        format: "toon", "csv" or "markdown".
+        chunk_rows: Number of rows serialized per chunk.
+        table_name: Name of the table in the TOON header.
+    '''
+    yield table_header(df, len(df), format, table_name)
+    for rows in iter_rows(df, format, chunk_rows):
+        yield "\n" + "\n".join(rows)
+
+def _parse_column(cells: pd.Series) -> pd.Series:
+    '''
+    Type the cells of a parsed column: numbers, booleans or text, empty cells are missing.
+    '''
+    missing = cells == ""
+    present = cells[~missing]
+    if present.empty:
+        return pd.Series([None] * len(cells), index=cells.index, dtype=object)
+    if present.str.fullmatch(_NUMBER).all():
+        return pd.to_numeric(cells.where(~missing, None))
+    if present.isin(["true", "false"]).all():
+        values = cells.map({"true": True, "false": False})
+        return values if not missing.any() else values.astype(object).where(~missing, None)
+    return cells.astype(object).where(~missing, None)
+
+def read_table(text: str, format: str = "toon") -> pd.DataFrame:
+    '''
+    Parse a table serialized by `to_table` or `iter_table` back to a DataFrame.
+    '''
+    _check_format(format)
+    lines = text.strip("\n").split("\n")
+    if format == "toon":
+        match = re.fullmatch(r"\w+\[(\d+)\]\{(.*)\}:", lines[0])
+        if match is None:
+            raise ValueError(f"Invalid TOON header: {lines[0]}")
+        columns = match.group(2).split(",") if match.group(2) else []
+        # The continuation lines of a quoted cell with line breaks are not indented
+        rows = list(csv.reader(io.StringIO("\n".join(line[2:] if line.startswith("  ") else line for line in lines[1:]))))
+        if len(rows) != int(match.group(1)):
+            raise ValueError(f"The TOON header declares {match.group(1)} rows, found {len(rows)}")
+    elif format == "csv":
+        columns, *rows = list(csv.reader(io.StringIO("\n".join(lines))))
+    else:
+        split = re.compile(r"(?<!\\)\|")
+        columns, *rows = [
+            [cell.strip().replace("\\|", "|") for cell in split.split(line.strip())[1:-1]]
+            for index, line in enumerate(lines) if index != 1
+            ]
+
+    cells = pd.DataFrame(rows, columns=range(len(columns)), dtype=object).fillna("")
+    df = pd.DataFrame({index: _parse_column(cells[index]) for index in range(len(columns))})
+    df.columns = columns
+    return df
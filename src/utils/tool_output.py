@@ -0,0 +1,246 @@
+'''
+This module renders the DataFrames returned by the agent tools within a row and token budget.
+Columns can be projected, rows beyond the budget are elided and can be fetched page by page
+with the `get_next_page` tool, so the size of a tool result does not grow with the size of the table.
+'''
+import os
+import re
+import json
+import time
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from agno.tools import tool
+
+from utils.logger import get_logger
+from utils.metrics import PHASE_LATENCY, timed_tool
+from utils.table_format import iter_rows, table_header
+from utils.config import (
+    TOOL_OUTPUT_FORMAT,
+    TOOL_OUTPUT_MAX_ROWS,
+    TOOL_OUTPUT_MAX_TOKENS,
+    TOOL_CURSOR_CACHE_SIZE,
+    TOOL_CURSOR_DIR,
+    TOOL_CURSOR_TTL,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+def estimate_tokens(text: str) -> int:
+    '''
+    Estimate the number of tokens of a text (4 characters per token).
+    '''
+    return len(text) // 4
+
+def project_columns(
+    df: pd.DataFrame,
+    columns: Optional[List[str]],
+    key_columns: Sequence[str] = (),
+) -> Tuple[pd.DataFrame, List[str]]:
+    '''
+    Keep only the requested columns, matched case-insensitively. The key columns are always kept.
+
+    Returns:
+        The projected DataFrame and the requested columns that do not exist.
+    '''
+    if not columns:
+        return df, []
+
+    lookup = {str(column).lower(): column for column in df.columns}
+    selected = [lookup[column.lower()] for column in columns if column.lower() in lookup]
+    missing = [column for column in columns if column.lower() not in lookup]
+    if not selected:
+        return df, missing
+
+    keys = [column for column in key_columns if column in df.columns and column not in selected]
+    return df[keys + selected], missing
+
+def fit_rows(df: pd.DataFrame, max_tokens: int, format: str = TOOL_OUTPUT_FORMAT) -> Tuple[int, str]:
+    '''
+    Serialize the first rows of a DataFrame that fit in the token budget (4 characters per token), at least one row.
+    The rows are serialized chunk by chunk until the budget is exceeded, the rest of the table is not serialized.
+
+    Returns:
+        The number of rows and the serialized page.
+    '''
+    # The header of the whole table is at least as long as the header of the page
+    header_length = len(table_header(df, len(df), format)) + 1
+    lines: List[str] = []
+    length = header_length
+    for chunk in iter_rows(df, format):
+        lines += chunk
+        length += sum(map(len, chunk)) + len(chunk)
+        if length // 4 > max_tokens:
+            break
+
+    lengths = np.cumsum([len(line) + 1 for line in lines]) + header_length
+    rows = min(len(lines), max(1, int(np.searchsorted(lengths // 4, max_tokens, side="right"))))
+    return rows, "\n".join([table_header(df, rows, format)] + lines[:rows])
+
+class CursorStore:
+    '''
+    Bounded store of the tool results that have more pages.
+    Results are kept in memory and in a directory shared by the server workers,
+    so that the next page can be fetched from any worker.
+    '''
+
+    def __init__(
+            self,
+            max_entries: int = TOOL_CURSOR_CACHE_SIZE,
+            store_dir: Optional[str] = TOOL_CURSOR_DIR,
+            ttl: int = TOOL_CURSOR_TTL,
+            ):
+        '''
+        Args:
+            max_entries: Maximum number of results kept in memory.
+            store_dir: Directory shared by the workers, None to keep the results in memory only.
+            ttl: Seconds after which unused results are deleted from the directory.
+        '''
+        self.max_entries = max_entries
+        self.store_dir = Path(store_dir) if store_dir else None
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[pd.DataFrame, int, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, cursor: str) -> Path:
+        return self.store_dir / f"{cursor}.parquet"
+
+    def _write(self, cursor: str, df: pd.DataFrame, offset: int, max_rows: int, max_tokens: int) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        arrow_table = arrow_table.replace_schema_metadata({
+            **(arrow_table.schema.metadata or {}),
+            b"cursor": json.dumps([offset, max_rows, max_tokens]).encode(),
+        })
+
+        tmp_path = self._path(cursor).with_suffix(f".{os.getpid()}.tmp")
+        pq.write_table(arrow_table, tmp_path)
+        os.replace(tmp_path, self._path(cursor))
+
+        # Delete the results that were never paged through
+        expired = time.time() - self.ttl
+        for path in self.store_dir.glob("*.parquet"):
+            try:
+                if path.stat().st_mtime < expired:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _read(self, cursor: str) -> Optional[Tuple[pd.DataFrame, int, int, int]]:
+        path = self._path(cursor)
+        try:
+            arrow_table = pq.read_table(path)
+            path.unlink()
+        except FileNotFoundError:
+            return None
+
+        offset, max_rows, max_tokens = json.loads(arrow_table.schema.metadata[b"cursor"])
+        return arrow_table.to_pandas(), offset, max_rows, max_tokens
+
+    def put(self, df: pd.DataFrame, offset: int, max_rows: int, max_tokens: int) -> str:
+        cursor = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._entries[cursor] = (df, offset, max_rows, max_tokens)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if self.store_dir is not None:
+            try:
+                self._write(cursor, df, offset, max_rows, max_tokens)
+            except Exception as e:
+                logger.warning(f"Cursor {cursor} is only available in this worker: {e}")
+
+        return cursor
+
+    def pop(self, cursor: str) -> Optional[Tuple[pd.DataFrame, int, int, int]]:
+        with self._lock:
+            entry = self._entries.pop(cursor, None)
+
+        # Cursors are generated hex strings, anything else is not looked up on disk
+        if self.store_dir is None or not re.fullmatch(r"[0-9a-f]{12}", cursor):
+            return entry
+
+        if entry is not None:
+            self._path(cursor).unlink(missing_ok=True)
+            return entry
+
+        return self._read(cursor)
+
+# Process-wide cursor store used by the data agent tools
+cursor_store = CursorStore()
+
+def format_tool_output(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None,
+    key_columns: Sequence[str] = (),
+    max_rows: int = TOOL_OUTPUT_MAX_ROWS,
+    max_tokens: int = TOOL_OUTPUT_MAX_TOKENS,
+    offset: int = 0,
+    paginate: bool = True,
+    format: str = TOOL_OUTPUT_FORMAT,
+) -> str:
+    '''
+    Render a DataFrame in TOON (or csv, markdown) format within a row and token budget.
+
+    Args:
+        df: The tool result.
+        columns: Columns to keep. All columns are kept if omitted.
+        key_columns: Columns kept in any case, e.g. the name of the team or player.
+        max_rows: Maximum number of rows of the page.
+        max_tokens: Token budget of the page, the number of rows is reduced until it fits.
+        offset: First row of the page.
+        paginate: Whether to store the remaining rows for get_next_page.
+        format: "toon", "csv" or "markdown".
+
+    Returns:
+        The page in the given format, followed by a note on the elided rows and columns.
+    '''
+    available = list(map(str, df.columns))
+    df, missing = project_columns(df, columns, key_columns)
+
+    rows = max(1, min(max_rows, len(df) - offset))
+    with PHASE_LATENCY.time(phase="toon_serialize"):
+        rows, page = fit_rows(df.iloc[offset:offset + rows], max_tokens, format)
+
+    notes = []
+    end = min(offset + rows, len(df))
+    remaining = len(df) - end
+    if remaining > 0 or offset > 0:
+        notes.append(f"Showing rows {offset + 1}-{end} of {len(df)}, {remaining} rows elided.")
+    if remaining > 0 and paginate:
+        cursor = cursor_store.put(df, end, max_rows, max_tokens)
+        notes.append(f'Call get_next_page with cursor "{cursor}" for the next rows.')
+    if missing:
+        notes.append(f"Unknown columns: {', '.join(missing)}. Available columns: {', '.join(available)}.")
+    elif not columns and remaining > 0 and offset == 0:
+        notes.append("Pass `columns` to return only the columns relevant to the question.")
+
+    if not notes:
+        return page
+
+    return f"{page}\n\n{' '.join(notes)}"
+
+@tool(
+    name="get_next_page",
+    description="Get the next rows of a tool result that was truncated, using the cursor given in the result.",
+    stop_after_tool_call=False
+    )
+@timed_tool("get_next_page")
+def get_next_page(cursor: str) -> str:
+    '''
+    Return the next page of a truncated tool result.
+    '''
+    entry = cursor_store.pop(cursor)
+    if entry is None:
+        return f"Cursor {cursor} is unknown or expired, call the original tool again."
+
+    df, offset, max_rows, max_tokens = entry
+    return format_tool_output(df, offset=offset, max_rows=max_rows, max_tokens=max_tokens)
@@ -0,0 +1,419 @@
+'''
+This module provides the tracing of the agent runs with low overhead.
+The spans of the agno instrumentation (OpenInference) are sampled and exported in a background thread:
+- head sampling: only TRACING_HEAD_SAMPLE_RATE of the runs are recorded,
+- tail sampling: a recorded run is exported if it has an error, is slower than TRACING_SLOW_MS
+  or falls in TRACING_TAIL_SAMPLE_RATE,
+- the spans wait for export in a bounded queue, spans that do not fit are dropped and counted.
+The spans are exported to the MLflow tracking server, an OTLP collector (e.g. Arize Phoenix),
+a local SQLite database or JSON lines files for offline use.
+'''
+import os
+import json
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.trace import StatusCode
+
+from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.config import (
+    TRACING_EXPORTER,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_PATH,
+    TRACING_HEAD_SAMPLE_RATE,
+    TRACING_TAIL_SAMPLE_RATE,
+    TRACING_SLOW_MS,
+    TRACING_QUEUE_SIZE,
+    TRACING_BATCH_SIZE,
+    TRACING_EXPORT_INTERVAL_MS,
+    TRACING_MAX_OPEN_TRACES,
+    MLFLOW_TRACK_SERVER,
+    MLFLOW_EXPERIMENT_NAME,
+    SQLITE_BUSY_TIMEOUT_MS,
+    )
+
+# Initialize logger
+logger = get_logger()
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    '''
+    Tail sampling of the recorded runs: errors and slow runs are always kept, the others are sampled.
+    '''
+    sample_rate: float = TRACING_TAIL_SAMPLE_RATE
+    slow_ms: float = TRACING_SLOW_MS
+    keep_errors: bool = True
+
+    def decide(self, root: ReadableSpan, spans: Sequence[ReadableSpan]) -> str:
+        '''
+        Return why the run is kept ("error", "slow" or "sampled") or "sampled_out".
+        '''
+        if self.keep_errors and any(span.status.status_code == StatusCode.ERROR for span in spans):
+            return "error"
+        if root.end_time is not None and (root.end_time - root.start_time) / 1e6 >= self.slow_ms:
+            return "slow"
+        # The upper half of the trace id, independent of the head sampling on the lower half
+        if (root.context.trace_id >> 64) / 2 ** 64 < self.sample_rate:
+            return "sampled"
+        return "sampled_out"
+
+class SampledBatchSpanProcessor(SpanProcessor):
+    '''
+    Span processor collecting the spans of every run until its root span ends, then exporting
+    the runs kept by the sampling policy in batches from a background thread.
+    '''
+
+    def __init__(
+            self,
+            exporter: SpanExporter,
+            policy: Optional[SamplingPolicy] = None,
+            queue_size: int = TRACING_QUEUE_SIZE,
+            batch_size: int = TRACING_BATCH_SIZE,
+            export_interval_ms: int = TRACING_EXPORT_INTERVAL_MS,
+            max_open_traces: int = TRACING_MAX_OPEN_TRACES,
+            ):
+        '''
+        Args:
+            exporter: Exporter of the kept spans, called from the background thread only.
+            policy: Tail sampling policy.
+            queue_size: Spans waiting for export, the spans of a run that does not fit are dropped.
+            batch_size: Spans per export call.
+            export_interval_ms: Maximum wait of a span in the queue.
+            max_open_traces: Runs in progress, the spans of the oldest run are dropped above it.
+        '''
+        self.exporter = exporter
+        self.policy = policy or SamplingPolicy()
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.export_interval = export_interval_ms / 1000
+        self.max_open_traces = max_open_traces
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._open: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        self._queue: Deque[ReadableSpan] = deque()
+        self._exporting = 0
+        self._flush_requested = False
+        self._shutdown = False
+        self._pid: Optional[int] = None
+        self._worker: Optional[threading.Thread] = None
+        self.counters: Dict[str, int] = {
+            "spans": 0, "kept_error": 0, "kept_slow": 0, "kept_sampled": 0, "sampled_out": 0,
+            "exported_spans": 0, "export_failures": 0, "dropped_queue_full": 0, "dropped_evicted": 0,
+        }
+
+    def _ensure_worker(self) -> None:
+        '''
+        Start the export thread, again in a forked worker. Must be called with the lock held.
+        '''
+        if self._pid != os.getpid():
+            self._queue.clear()
+            self._open.clear()
+            self._exporting = 0
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._worker.start()
+
+    def on_start(self, span: Any, parent_context: Any = None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if not span.context.trace_flags.sampled or self._shutdown:
+            return
+
+        trace_id = span.context.trace_id
+        with self._lock:
+            self.counters["spans"] += 1
+            spans = self._open.get(trace_id)
+            if spans is None:
+                spans = self._open[trace_id] = []
+            else:
+                self._open.move_to_end(trace_id)
+            spans.append(span)
+
+            if span.parent is not None and not span.parent.is_remote:
+                if len(self._open) > self.max_open_traces:
+                    _, evicted = self._open.popitem(last=False)
+                    self.counters["dropped_evicted"] += len(evicted)
+                return
+            del self._open[trace_id]
+
+        decision = self.policy.decide(span, spans)
+        with self._lock:
+            if decision == "sampled_out":
+                self.counters["sampled_out"] += 1
+                return
+            self.counters[f"kept_{decision}"] += 1
+            if len(self._queue) + len(spans) > self.queue_size:
+                self.counters["dropped_queue_full"] += len(spans)
+                return
+
+            self._ensure_worker()
+            self._queue.extend(spans)
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.notify()
+
+    def _next_batch(self) -> Optional[List[ReadableSpan]]:
+        '''
+        Wait for a full batch, the export interval or a flush. Returns None on shutdown with an empty queue.
+        '''
+        with self._lock:
+            if len(self._queue) < self.batch_size and not (self._flush_requested or self._shutdown):
+                self._wakeup.wait(self.export_interval)
+            if not self._queue:
+                self._flush_requested = False
+                self._wakeup.notify_all()
+                return None if self._shutdown else []
+
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._exporting += 1
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                continue
+
+            try:
+                result = self.exporter.export(batch)
+            except Exception as e:
+                logger.warning(f"Span export failed: {e}")
+                result = SpanExportResult.FAILURE
+
+            with self._lock:
+                self._exporting -= 1
+                if result == SpanExportResult.SUCCESS:
+                    self.counters["exported_spans"] += len(batch)
+                else:
+                    self.counters["export_failures"] += 1
+                self._wakeup.notify_all()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        '''
+        Export the queued spans and wait until they are exported.
+        '''
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid():
+                return True
+            self._flush_requested = True
+            self._wakeup.notify_all()
+            return self._wakeup.wait_for(lambda: not self._queue and not self._exporting, timeout_millis / 1000)
+
+    def shutdown(self) -> None:
+        self.force_flush()
+        with self._lock:
+            self._shutdown = True
+            self._wakeup.notify_all()
+            worker = self._worker if self._pid == os.getpid() else None
+        if worker is not None:
+            worker.join(timeout=5)
+        self.exporter.shutdown()
+
+    def stats(self) -> Dict[str, int]:
+        '''
+        Counters of the sampling, the export and the dropped spans of the current process.
+        '''
+        with self._lock:
+            return {**self.counters, "queued_spans": len(self._queue), "open_traces": len(self._open)}
+
+def span_record(span: ReadableSpan) -> Dict[str, Any]:
+    '''
+    Flat record of a span for the local exporters.
+    '''
+    return {
+        "trace_id": f"{span.context.trace_id:032x}",
+        "span_id": f"{span.context.span_id:016x}",
+        "parent_id": f"{span.parent.span_id:016x}" if span.parent is not None else None,
+        "name": span.name,
+        "start_time": span.start_time,
+        "duration_ms": round((span.end_time - span.start_time) / 1e6, 3) if span.end_time else None,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+        "events": [{"name": event.name, "timestamp": event.timestamp, "attributes": dict(event.attributes or {})} for event in span.events],
+    }
+
+class SqliteSpanExporter(SpanExporter):
+    '''
+    Exporter writing the spans to a local SQLite database (WAL mode, shared by the server workers).
+    '''
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS spans (trace_id TEXT, span_id TEXT PRIMARY KEY, parent_id TEXT, name TEXT, "
+                "start_time INTEGER, duration_ms REAL, status TEXT, attributes TEXT, events TEXT)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS spans_trace ON spans (trace_id)")
+        return self._connection
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        rows = []
+        for span in spans:
+            record = span_record(span)
+            rows.append((
+                record["trace_id"], record["span_id"], record["parent_id"], record["name"], record["start_time"],
+                record["duration_ms"], record["status"], json.dumps(record["attributes"], default=str),
+                json.dumps(record["events"], default=str),
+            ))
+        connection = self._connect()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+class JsonLinesSpanExporter(SpanExporter):
+    '''
+    Exporter appending the spans to a JSON lines file per process.
+    '''
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lines = "".join(json.dumps(span_record(span), default=str) + "\n" for span in spans)
+        with open(self.directory / f"spans-{os.getpid()}.jsonl", "a", encoding="utf-8") as file:
+            file.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+class MlflowSpanExporter(SpanExporter):
+    '''
+    Exporter sending the spans to the OTLP endpoint of the MLflow tracking server, as mlflow.agno.autolog does.
+    The tracking server and the experiment are resolved on the first export, in the background thread.
+    '''
+
+    def __init__(self, track_server: str = MLFLOW_TRACK_SERVER, experiment_name: str = MLFLOW_EXPERIMENT_NAME):
+        self.track_server = track_server
+        self.experiment_name = experiment_name
+        self._exporter: Optional[SpanExporter] = None
+
+    def _otlp_exporter(self) -> SpanExporter:
+        if self._exporter is None:
+            import mlflow
+            from mlflow.tracing.utils.otlp import MLFLOW_EXPERIMENT_ID_HEADER
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            if self.track_server == "databricks":
+                mlflow.set_tracking_uri("databricks")
+                experiment = mlflow.set_experiment(f"/{self.experiment_name}")
+            else:
+                mlflow.set_tracking_uri("http://localhost:5000")
+                experiment = mlflow.set_experiment(self.experiment_name)
+
+            self._exporter = OTLPSpanExporter(
+                endpoint=f"{mlflow.get_tracking_uri().rstrip('/')}/v1/traces",
+                headers={MLFLOW_EXPERIMENT_ID_HEADER: experiment.experiment_id},
+            )
+            logger.info(f"Exporting the traces to MLflow experiment {self.experiment_name} at {mlflow.get_tracking_uri()}")
+        return self._exporter
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        return self._otlp_exporter().export(spans)
+
+    def shutdown(self) -> None:
+        if self._exporter is not None:
+            self._exporter.shutdown()
+
+def get_exporter(name: str = TRACING_EXPORTER) -> SpanExporter:
+    '''
+    Return the span exporter: "mlflow", "otlp" (TRACING_OTLP_ENDPOINT), "sqlite", "file" or "console".
+    '''
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=TRACING_OTLP_ENDPOINT)
+    if name == "sqlite":
+        return SqliteSpanExporter(os.path.join(TRACING_PATH, "traces.db"))
+    if name == "file":
+        return JsonLinesSpanExporter(TRACING_PATH)
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter()
+
+    return MlflowSpanExporter()
+
+def create_tracer_provider(
+        processor: SpanProcessor,
+        head_sample_rate: float = TRACING_HEAD_SAMPLE_RATE,
+        ) -> TracerProvider:
+    '''
+    Tracer provider recording the head sampled runs, with the spans passed to the processor.
+    '''
+    provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(head_sample_rate)),
+        resource=Resource.create({"service.name": "agno_os_basketball_ai"}),
+    )
+    provider.add_span_processor(processor)
+    return provider
+
+# Span processor of the current process, set up by setup_tracing
+_processor: Optional[SampledBatchSpanProcessor] = None
+
+def setup_tracing(exporter: str = TRACING_EXPORTER, policy: Optional[SamplingPolicy] = None) -> Optional[SampledBatchSpanProcessor]:
+    '''
+    Instrument agno with the sampled, batched tracing pipeline. Nothing is exported before the first kept run.
+
+    Args:
+        exporter: The span exporter: "mlflow", "otlp", "sqlite", "file" or "console".
+        policy: The tail sampling policy, defaults to the TRACING_* settings.
+
+    Returns:
+        The span processor with the tracing counters, or None if the instrumentation is not available.
+    '''
+    global _processor
+    if _processor is not None:
+        return _processor
+
+    from opentelemetry import trace as trace_api
+    from openinference.instrumentation.agno import AgnoInstrumentor
+
+    processor = SampledBatchSpanProcessor(get_exporter(exporter), policy=policy)
+    provider = create_tracer_provider(processor)
+    try:
+        AgnoInstrumentor().instrument(tracer_provider=provider)
+    except Exception as e:
+        logger.warning(f"Tracing is disabled, the agno instrumentation failed: {e}")
+        return None
+
+    trace_api.set_tracer_provider(provider)
+    atexit.register(processor.shutdown)
+    _processor = processor
+    logger.info(
+        f"Tracing to {exporter}: {TRACING_HEAD_SAMPLE_RATE:.0%} of the runs recorded, "
+        f"{processor.policy.sample_rate:.0%} exported with the errors and runs slower than {processor.policy.slow_ms:.0f} ms"
+    )
+    return processor
+
+def tracing_stats() -> Dict[str, int]:
+    '''
+    Tracing counters of the current process, empty if tracing is not set up.
+    '''
+    return _processor.stats() if _processor is not None else {}
+
+metrics.register_collector("tracing", tracing_stats)
@@ -1,11 +1,17 @@
 '''
 This module defines a workflow to generate game reports for NBA games using Agno's workflow and agent capabilities.
 '''
+import asyncio
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
 import pandas as pd
-import pandas_toon
 
-from agno.workflow import Step, Workflow, StepInput, StepOutput
+from agno.workflow import Parallel, Step, Workflow, StepInput, StepOutput
 from agno.agent import Agent
+from agno.run.agent import RunContentEvent
+from agno.run.workflow import CustomEvent, StepCompletedEvent, StepStartedEvent, WorkflowRunEvent
 
 import sys
 import os
@@ -13,16 +19,27 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from utils.logger import get_logger
-from utils.mlflow_tracer import setup_mlflow_tracer
+from utils.pbp_cache import (
+    get_play_by_play,
+    aget_play_by_play,
+    aget_games_for_date,
+    )
+from utils.async_io import close as close_async_executors
+from utils.pbp_parser import get_game_events, aget_game_events
+from utils.pbp_summary import summarize_events, render_summary, render_statistics
+from utils.tool_output import format_tool_output
+from utils.metrics import timed_step
 from utils.config import (
     llm,
     get_llm_config,
-    sqlite_db,
     llm_catalog,
-    MLFLOW_TRACING,
-    MLFLOW_TRACK_SERVER,
-    MLFLOW_EXPERIMENT_NAME,
-    DATABRICKS_HOST,
+    PBP_COMPACTION,
+    PBP_RAW_ROW_BUDGET,
+    PBP_RAW_MAX_TOKENS,
+    BATCH_MAX_CONNECTIONS,
+    BATCH_MAX_PARALLEL,
+    REPORT_OUTPUT_DIR,
+    TRACING,
     )
 
 import typer
@@ -43,33 +60,170 @@ def get_input_message(date: str, home_team: str, away_team: str):
         
         - Game summary
         - Game highlights
-        - Game statistics
+        - Key numbers of the game (top scorers, runs, leads)
 
-        Format the response using markdown and include tables where appropriate.
+        Format the response using markdown. The statistics tables are appended to the report, do not write them.
         '''
     
     return message
 
+@dataclass
+class SearchPhaseEvent(CustomEvent):
+    '''
+    Progress event of the workflow: the play by play of the game is fetched and parsed.
+    '''
+    event: str = WorkflowRunEvent.custom_event.value
+    date: Optional[str] = None
+    home_team: Optional[str] = None
+    events: int = 0
+    cached: bool = False
+    fetch_ms: float = 0.0
+    parse_ms: float = 0.0
+    events_ms: float = 0.0
+
 def read_game_stats(step_input: StepInput):
     '''
-    This function reads the game statistics from Basketball Reference.
+    This function reads the game statistics from Basketball Reference (sync runs of the workflow).
     '''
+    date = step_input.additional_data.get("date")
+    home_team = step_input.additional_data.get("home_team")
+
+    try:
+        events = get_game_events(date, home_team)
+        logger.info(f"Successfully fetched game stats for {date} {home_team}")
 
-    try: 
-        input_message = step_input.input
+    except Exception as e:
+        logger.error(f"Error fetching game stats: {e}")
+        return StepOutput(content=f"Error fetching the play by play of {date} {home_team}: {e}", success=False, stop=True)
+
+    if PBP_COMPACTION == 'true':
+        return StepOutput(content=f"Fetched {len(events)} play by play events for {date} {home_team}.")
+
+    df = get_play_by_play(date, home_team)
+    return StepOutput(content=format_tool_output(df, max_rows=len(df), max_tokens=PBP_RAW_MAX_TOKENS, paginate=False))
+
+async def aread_game_stats(step_input: StepInput):
+    '''
+    Async variant of read_game_stats (async runs of the workflow).
+    A progress event with the fetch and parse timings is sent as soon as the play by play is parsed.
+    '''
+    try:
         date = step_input.additional_data.get("date")
         home_team = step_input.additional_data.get("home_team")
-     
-        url=f"https://www.basketball-reference.com/boxscores/pbp/{date}0{home_team}.html"
 
-        df = pd.read_html(url)[0].droplevel(0, axis=1)
+        timings = {}
+        events = await aget_game_events(date, home_team, timings=timings)
+
+        logger.info(f"Successfully fetched game stats for {date} {home_team}")
 
-        logger.info(f"Successfully fetched game stats from {url}")
-    
     except Exception as e:
         logger.error(f"Error fetching game stats: {e}")
+        yield StepOutput(content=f"Error fetching the play by play of {date} {home_team}: {e}", success=False, stop=True)
+        return
+
+    yield SearchPhaseEvent(
+        date=date,
+        home_team=home_team,
+        events=len(events),
+        cached=bool(timings["cached"]),
+        **{key: round(timings[key], 1) for key in ("fetch_ms", "parse_ms", "events_ms")},
+        )
+
+    if PBP_COMPACTION == 'true':
+        yield StepOutput(content=f"Fetched {len(events)} play by play events for {date} {home_team}.")
+        return
+
+    df = await aget_play_by_play(date, home_team)
+    yield StepOutput(content=format_tool_output(df, max_rows=len(df), max_tokens=PBP_RAW_MAX_TOKENS, paginate=False))
+
+def get_report_data(step_input: StepInput, events: Optional[pd.DataFrame]) -> str:
+    '''
+    Return the game data of the writing phase: the compact summary of the play by play events without the box score,
+    or the raw play by play of the search phase if the compaction is disabled.
+    '''
+    if events is None:
+        return step_input.get_step_content("Search Phase")
+
+    raw_row_budget = step_input.additional_data.get("raw_row_budget", PBP_RAW_ROW_BUDGET)
+    return render_summary(summarize_events(events, raw_row_budget=raw_row_budget, with_box_score=False))
+
+def writing_phase(agent: Agent) -> Tuple[Callable, Callable]:
+    '''
+    Create the sync and async executors of the writing phase: the report agent writes the report text, its tokens are streamed.
+    Its input is a compact summary of the play by play without the box score, which is rendered in parallel.
+    '''
+
+    def write_report(step_input: StepInput):
+        events = None
+        if PBP_COMPACTION == 'true':
+            events = get_game_events(step_input.additional_data.get("date"), step_input.additional_data.get("home_team"))
+        data = get_report_data(step_input, events)
+
+        yield from agent.run(f"{step_input.input}\n\nGame data:\n{data}", stream=True, stream_events=True)
+
+    async def awrite_report(step_input: StepInput):
+        events = None
+        if PBP_COMPACTION == 'true':
+            events = await aget_game_events(step_input.additional_data.get("date"), step_input.additional_data.get("home_team"))
+        data = await asyncio.to_thread(get_report_data, step_input, events)
+
+        async for event in agent.arun(f"{step_input.input}\n\nGame data:\n{data}", stream=True, stream_events=True):
+            yield event
+
+    return write_report, awrite_report
+
+def build_statistics(step_input: StepInput):
+    '''
+    This function renders the statistics tables of the report (quarter scores, box scores) while the report is written.
+    '''
+    try:
+        events = get_game_events(step_input.additional_data.get("date"), step_input.additional_data.get("home_team"))
+        statistics = render_statistics(events)
+
+    except Exception as e:
+        logger.error(f"Error computing game statistics: {e}")
+        return StepOutput(content="", success=False)
+
+    return StepOutput(content=statistics)
+
+async def abuild_statistics(step_input: StepInput):
+    '''
+    Async variant of build_statistics.
+    '''
+    try:
+        events = await aget_game_events(step_input.additional_data.get("date"), step_input.additional_data.get("home_team"))
+        statistics = await asyncio.to_thread(render_statistics, events)
+
+    except Exception as e:
+        logger.error(f"Error computing game statistics: {e}")
+        return StepOutput(content="", success=False)
+
+    return StepOutput(content=statistics)
+
+def dual_step(name: str, executor: Callable, aexecutor: Callable) -> Step:
+    '''
+    Step running the sync executor in the sync runs of the workflow and the async executor in its async runs.
+    The sync execute methods of a step of the sync executor are set on the instance: the workflow maps the steps
+    by their exact class.
+    '''
+    step = Step(name=name, executor=aexecutor)
+    sync_step = Step(name=name, executor=executor, step_id=step.step_id)
+    step.execute, step.execute_stream = sync_step.execute, sync_step.execute_stream
+    return step
+
+def assemble_report(step_input: StepInput):
+    '''
+    This function appends the statistics tables to the report text.
+    '''
+    sections = step_input.get_step_content("Report Phase")
+    if not isinstance(sections, dict):
+        return StepOutput(content=sections)
+
+    report = sections.get("Writing Phase", "")
+    if sections.get("Statistics Phase"):
+        report += f"\n\n## Game Statistics\n\n{sections['Statistics Phase']}"
 
-    return StepOutput(content=df.to_toon())
+    return StepOutput(content=report)
 
 def get_report_agent() -> Agent:
     '''
@@ -84,7 +238,10 @@ def get_report_agent() -> Agent:
                 description='''You are an expert in generating game report for NBA games.''',
                 instructions=['''
                           Describe the game like a game report in the newspaper.
-                          The data needed for the report will be provided from the previous step.
+                          The data needed for the report is provided after the request.
+                          It is a compact summary of the play by play: final score, quarter scores, top scorers,
+                          scoring runs, lead changes, largest leads, clutch time plays and scoring droughts.
+                          The statistics tables (quarter scores, box scores) are appended to your report, do not write them.
                           '''],
                 )
     return agent
@@ -94,19 +251,147 @@ def get_report_agent() -> Agent:
 def game_report_workflow():
     '''
     Define the workflow to generate game reports.
+    Run it with stream=True and stream_events=True to get the progress events and the tokens of the report.
+    The steps have sync and async executors: `run` and `print_response` fetch and write in the calling thread,
+    `arun` and `aprint_response` without blocking the event loop.
     '''
     report_agent = get_report_agent()
 
+    # The report text is written while the statistics tables are computed
     workflow = Workflow(
         name="Create Game Report",
         steps=[
-            Step(name="Search Phase", executor=read_game_stats),
-            Step(name="Writing Phase", agent=report_agent),
+            timed_step(dual_step("Search Phase", read_game_stats, aread_game_stats)),
+            Parallel(
+                timed_step(dual_step("Writing Phase", *writing_phase(report_agent))),
+                timed_step(dual_step("Statistics Phase", build_statistics, abuild_statistics)),
+                name="Report Phase",
+                ),
+            timed_step(Step(name="Assembly Phase", executor=assemble_report)),
         ]
     )
 
     return workflow
 
+def parse_games(games: str) -> List[Tuple[str, str]]:
+    '''
+    Parse a comma separated list of games in HOME:AWAY format (e.g. "HOU:ORL,LAL:BOS").
+    '''
+    pairs = []
+    for game in games.split(","):
+        home_team, _, away_team = game.strip().upper().partition(":")
+        if not home_team or not away_team:
+            raise typer.BadParameter(f"Invalid game '{game}', expected HOME:AWAY")
+        pairs.append((home_team, away_team))
+
+    return pairs
+
+async def stream_game_report(date: str, home_team: str, away_team: str) -> str:
+    '''
+    Generate the report of a game and print it while it is written.
+    The progress of the workflow is printed to stderr, the report text to stdout as its tokens arrive,
+    followed by the statistics tables.
+
+    Returns:
+        The complete report.
+    '''
+    workflow = game_report_workflow()
+    written, report = "", ""
+
+    async for event in workflow.arun(
+            input=get_input_message(date, home_team, away_team),
+            additional_data={"date": date, "home_team": home_team},
+            stream=True,
+            stream_events=True,
+            ):
+        if isinstance(event, SearchPhaseEvent):
+            source = "from the cache" if event.cached else (
+                f"fetched in {event.fetch_ms:.0f} ms, parsed in {event.parse_ms + event.events_ms:.0f} ms")
+            typer.echo(f"Play by play of {date} {home_team}: {event.events} events {source}", err=True)
+        elif isinstance(event, StepStartedEvent) and not written:
+            typer.echo(f"{event.step_name}...", err=True)
+        elif isinstance(event, RunContentEvent) and isinstance(event.content, str):
+            written += event.content
+            typer.echo(event.content, nl=False)
+        elif isinstance(event, StepCompletedEvent) and event.step_name == "Assembly Phase":
+            report = str(event.content)
+            typer.echo(report[len(written):] if report.startswith(written) else f"\n\n{report}")
+
+    await close_async_executors()
+
+    return report
+
+async def generate_batch_reports(
+        date: str,
+        games: Optional[List[Tuple[str, str]]] = None,
+        output_dir: str = REPORT_OUTPUT_DIR,
+        max_connections: int = BATCH_MAX_CONNECTIONS,
+        max_parallel: int = BATCH_MAX_PARALLEL,
+        ) -> List[Path]:
+    '''
+    Generate the reports of several games played on the same date.
+
+    All play by play pages are fetched concurrently (bounded by max_connections) to warm the cache,
+    then the workflow runs for every game with at most max_parallel writing phases at a time.
+    Each report is written to disk as soon as it is finished.
+
+    Args:
+        date: Date of the games in YYYYMMDD format.
+        games: List of (home_team, away_team) pairs. All games of the date are used if omitted.
+        output_dir: Directory where the markdown reports are written.
+        max_connections: Maximum number of concurrent play by play fetches.
+        max_parallel: Maximum number of concurrent report writing runs.
+
+    Returns:
+        The paths of the reports that were written.
+    '''
+    if not games:
+        games = await aget_games_for_date(date)
+        logger.info(f"Found {len(games)} games on {date}")
+
+    fetch_semaphore = asyncio.Semaphore(max_connections)
+    write_semaphore = asyncio.Semaphore(max_parallel)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    async def fetch(home_team: str, away_team: str) -> bool:
+        async with fetch_semaphore:
+            try:
+                await aget_play_by_play(date, home_team)
+                return True
+            except Exception as e:
+                logger.error(f"Error fetching game stats for {away_team} at {home_team}: {e}")
+                return False
+
+    async def write(home_team: str, away_team: str) -> Path:
+        async with write_semaphore:
+            workflow = game_report_workflow()
+            response = await workflow.arun(
+                input=get_input_message(date, home_team, away_team),
+                additional_data={"date": date, "home_team": home_team},
+                )
+
+        path = Path(output_dir) / f"{date}_{away_team}_at_{home_team}.md"
+        await asyncio.to_thread(path.write_text, str(response.content), encoding="utf-8")
+        logger.info(f"Report written to {path}")
+        return path
+
+    fetched = await asyncio.gather(*(fetch(home_team, away_team) for home_team, away_team in games))
+    tasks = [
+        write(home_team, away_team)
+        for (home_team, away_team), ok in zip(games, fetched) if ok
+        ]
+
+    paths = []
+    for task in asyncio.as_completed(tasks):
+        try:
+            paths.append(await task)
+        except Exception as e:
+            logger.error(f"Error generating game report: {e}")
+
+    await close_async_executors()
+
+    return paths
+
 @app.command()
 def main(
     date: str = typer.Option(
@@ -120,37 +405,54 @@ def main(
     away_team: str = typer.Option(
         "ORL", 
         help="Abbreviation of the away team (e.g., BOS for Boston Celtics)."
-        )
+        ),
+    games: Optional[str] = typer.Option(
+        None,
+        help="Batch mode: comma separated games in HOME:AWAY format (e.g., HOU:ORL,LAL:BOS)."
+        ),
+    all_games: bool = typer.Option(
+        False,
+        help="Batch mode: create reports for all games played on the date."
+        ),
+    output_dir: str = typer.Option(
+        REPORT_OUTPUT_DIR,
+        help="Batch mode: directory where the reports are written."
+        ),
+    max_connections: int = typer.Option(
+        BATCH_MAX_CONNECTIONS,
+        help="Batch mode: maximum number of concurrent play by play fetches."
+        ),
+    max_parallel: int = typer.Option(
+        BATCH_MAX_PARALLEL,
+        help="Batch mode: maximum number of reports written in parallel."
+        ),
 ):
     '''
     Entry point for typer app command.
     '''
-    
-    input_message = get_input_message(date, home_team, away_team)
-
-    workflow = game_report_workflow()
 
-    workflow.print_response(
-        input=input_message,
-        additional_data={"date": date, "home_team": home_team},
-        markdown=True
-        )
+    if games or all_games:
+        paths = asyncio.run(generate_batch_reports(
+            date=date,
+            games=parse_games(games) if games else None,
+            output_dir=output_dir,
+            max_connections=max_connections,
+            max_parallel=max_parallel,
+            ))
+        logger.info(f"Created {len(paths)} game reports in {output_dir}")
+        return
+    
+    asyncio.run(stream_game_report(date, home_team, away_team))
 
 if __name__ == "__main__":
     # Set NO_PROXY to avoid proxy for localhost connections
     os.environ["NO_PROXY"] = "localhost, 127.0.0.1"
     os.environ["no_proxy"] = "localhost, 127.0.0.1"
 
-    # Set up mlflow tracer
-    if MLFLOW_TRACING == 'true':
-        setup_mlflow_tracer(
-            track_server=MLFLOW_TRACK_SERVER,
-            experiment_name=MLFLOW_EXPERIMENT_NAME
-                        )
-        if MLFLOW_TRACK_SERVER == "databricks":
-            logger.info(f"Initialized mlflow trace to Databricks: {DATABRICKS_HOST}")
-        else:
-            logger.info("Initialized mlflow trace to http://localhost:5000")
+    # Set up the sampled tracing of the agent runs, exported in the background
+    if TRACING == 'true':
+        from utils.tracing import setup_tracing
+        setup_tracing()
     
     # Run Typer App 
     app()
\ No newline at end of file
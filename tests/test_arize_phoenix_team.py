@@ -1,4 +1,5 @@
 import os
+import sys
 import asyncio
 
 from agno.agent import Agent
@@ -7,25 +8,17 @@ from agno.models.openai import OpenAIChat
 from agno.tools.python import PythonTools
 from agno.tools.local_file_system import LocalFileSystemTools
 
-from openinference.instrumentation.agno import AgnoInstrumentor
-#from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk import trace as trace_sdk
-from opentelemetry import trace as trace_api
-from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
-
 from dotenv import load_dotenv
 load_dotenv()
 
-#endpoint = "http://127.0.0.1:6006/v1/traces"
-tracer_provider = trace_sdk.TracerProvider()
-#tracer_provider.add_span_processor(SimpleSpanProcessor(OTLPSpanExporter(endpoint)))
-# Optionally, you can also print the spans to the console.
-tracer_provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 
-trace_api.set_tracer_provider(tracer_provider=tracer_provider)
+from utils.tracing import SamplingPolicy, setup_tracing
 
-# Start instrumenting agno
-AgnoInstrumentor().instrument()
+# Instrument agno, every run is exported in the background.
+# setup_tracing(exporter="otlp") sends the spans to Arize Phoenix at TRACING_OTLP_ENDPOINT
+setup_tracing(exporter="console", policy=SamplingPolicy(sample_rate=1.0))
 
 # Create agents
 python_agent = Agent(
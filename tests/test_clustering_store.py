@@ -0,0 +1,111 @@
+'''
+This module tests the persistent clustering store.
+'''
+import os
+import sys
+
+import pandas as pd
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import utils.clustering_store as clustering_module
+from utils.clustering_store import ClusteringStore, compute_name, get_season_clustering, hash_frame, precompute
+from utils.season_store import SeasonStore
+
+def test_get_or_compute(tmp_path):
+    '''
+    A result is computed once, then served from memory and from disk after a restart.
+    '''
+    stats = pd.DataFrame({"Team": ["HOU", "ORL", "LAL"], "3P%": [0.35, 0.33, 0.37]})
+    calls = []
+
+    def compute(season, n_cluster):
+        calls.append((season, n_cluster))
+        return pd.DataFrame({"Team": stats["Team"], "cluster": [0, 1, 0]})
+
+    store = ClusteringStore(store_dir=str(tmp_path), max_entries=1)
+    first = store.get_or_compute("team_shooting", "2024", 2, stats, compute)
+    second = store.get_or_compute("team_shooting", "2024", 2, stats, compute)
+    assert calls == [("2024", 2)]
+    assert first.equals(second)
+
+    restarted = ClusteringStore(store_dir=str(tmp_path), max_entries=1)
+    third = restarted.get_or_compute("team_shooting", "2024", 2, stats, compute)
+    assert calls == [("2024", 2)]
+    assert third.equals(first)
+
+    # Changed input stats get a new content hash and are recomputed
+    changed = stats.assign(**{"3P%": [0.36, 0.33, 0.37]})
+    assert hash_frame(changed) != hash_frame(stats)
+    restarted.get_or_compute("team_shooting", "2024", 2, changed, compute)
+    assert len(calls) == 2
+    assert len(restarted._memory) == 1
+
+def test_preload(tmp_path):
+    '''
+    The results on disk are loaded into memory, up to the size of the memory LRU.
+    '''
+    store = ClusteringStore(store_dir=str(tmp_path))
+    for n_cluster in [2, 3, 4]:
+        store.put("team_shooting", "2024", n_cluster, "abc123", pd.DataFrame({"Team": ["HOU"], "cluster": [n_cluster]}))
+
+    restarted = ClusteringStore(store_dir=str(tmp_path), max_entries=2)
+    assert restarted.preload() == 2
+    assert set(restarted._memory) == {("team_shooting", "2024", 3, "abc123"), ("team_shooting", "2024", 4, "abc123")}
+
+def test_matches_the_library_join(tmp_path, monkeypatch):
+    '''
+    The clusters of the library are joined on the team or the player like the tools did before the store,
+    and the result is stored under the hash of the stats salted with the library function.
+    '''
+    shooting = pd.DataFrame({"Team": ["HOU", "ORL", "LAL", "BOS"], "3P%": [0.30, 0.31, 0.40, 0.41]})
+    adv_stats = pd.DataFrame({"Player": ["A", "B", "C"], "Age": [21, 30, 25], "BPM": [1.5, -0.5, 4.0]})
+    tables = {"team_shooting": shooting, "adv_stats": adv_stats}
+
+    # Library results in another row order, without a team and without a player
+    def k_means_team_shooting_clustering(season, n_cluster):
+        return pd.DataFrame({"Team": ["LAL", "HOU", "ORL"], "cluster": [1, 0, 0]})
+
+    def k_means_player_clustering(season, n_cluster):
+        return pd.DataFrame({"Player": ["C", "A"], "cluster": [0, 1]})
+
+    monkeypatch.setattr(clustering_module, "read_season_table", lambda table, season: tables[table])
+    monkeypatch.setattr(clustering_module, "clustering_store", ClusteringStore(store_dir=str(tmp_path)))
+    monkeypatch.setitem(clustering_module.FEATURE_SETS["team_shooting"], "cluster", k_means_team_shooting_clustering)
+    monkeypatch.setitem(clustering_module.FEATURE_SETS["player_adv_stats"], "cluster", k_means_player_clustering)
+
+    # The previous implementation of the data agent tools
+    expected_teams = shooting.join(k_means_team_shooting_clustering("2024", 2).set_index("Team"), on="Team")
+    expected_players = adv_stats.merge(k_means_player_clustering("2024", 2), on="Player", how="inner")
+
+    pd.testing.assert_frame_equal(get_season_clustering("team_shooting", "2024", 2), expected_teams)
+    pd.testing.assert_frame_equal(get_season_clustering("player_adv_stats", "2024", 2), expected_players)
+
+    salt = compute_name(k_means_team_shooting_clustering)
+    assert clustering_module.clustering_store.get("team_shooting", "2024", 2, hash_frame(shooting, salt=salt)) is not None
+
+def test_precompute_every_stored_season(tmp_path, monkeypatch):
+    '''
+    The precompute clusters every season of the season store.
+    '''
+    store = SeasonStore(store_dir=str(tmp_path / "seasons"))
+    for season in ["2012", "2019", "2024"]:
+        store.write("team_shooting", season, pd.DataFrame({"Team": ["HOU"], "3P%": [0.35]}))
+    calls = []
+
+    def k_means_team_shooting_clustering(season, n_cluster):
+        calls.append((season, n_cluster))
+        return pd.DataFrame({"Team": ["HOU"], "cluster": [0]})
+
+    monkeypatch.setattr(clustering_module, "season_store", store)
+    monkeypatch.setattr(clustering_module, "read_season_table", lambda table, season: store.read(table, season))
+    monkeypatch.setattr(clustering_module, "clustering_store", ClusteringStore(store_dir=str(tmp_path / "clusters")))
+    monkeypatch.setitem(clustering_module.FEATURE_SETS["team_shooting"], "cluster", k_means_team_shooting_clustering)
+
+    precompute(start_season=None, end_season=None, min_cluster=2, max_cluster=3)
+    assert calls == [("2012", 2), ("2012", 3), ("2019", 2), ("2019", 3), ("2024", 2), ("2024", 3)]
+
+    calls.clear()
+    precompute(start_season=2015, end_season=None, min_cluster=2, max_cluster=2)
+    assert calls == []
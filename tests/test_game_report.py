@@ -0,0 +1,112 @@
+'''
+This module tests the streamed game report workflow on the recorded play by play fixture.
+'''
+import os
+import sys
+import asyncio
+
+from agno.agent import Agent
+from agno.run.agent import RunContentEvent
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import utils.pbp_cache as pbp_cache_module
+import utils.pbp_parser as pbp_parser_module
+import workflow.generate_game_report as report_module
+from utils.pbp_cache import PlayByPlayCache, get_pbp_url
+from utils.stub_model import StubModel
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pbp_20251116_HOU.html")
+
+def offline_workflow(monkeypatch, tmp_path):
+    '''
+    The workflow with the fixture as play by play page, empty caches and a stub report agent.
+    '''
+    def get_text(url):
+        assert url == get_pbp_url("20251116", "HOU")
+        with open(FIXTURE, encoding="utf-8") as f:
+            return f.read()
+
+    async def fetch_text(url):
+        return get_text(url)
+
+    monkeypatch.setattr(pbp_cache_module, "get_text", get_text)
+    monkeypatch.setattr(pbp_cache_module, "fetch_text", fetch_text)
+    monkeypatch.setattr(pbp_cache_module, "pbp_cache", PlayByPlayCache(cache_dir=str(tmp_path)))
+    monkeypatch.setattr(pbp_parser_module, "events_cache", PlayByPlayCache(cache_dir=str(tmp_path), suffix="events"))
+    monkeypatch.setattr(report_module, "PBP_COMPACTION", "true")
+    monkeypatch.setattr(report_module, "get_report_agent", lambda: Agent(model=StubModel(id="report", latency_ms=0), telemetry=False))
+    return report_module.game_report_workflow()
+
+def test_streamed_report(monkeypatch, tmp_path):
+    '''
+    The progress of the search phase is sent before the report tokens, the statistics tables are appended.
+    '''
+    workflow = offline_workflow(monkeypatch, tmp_path)
+    calls = []
+    summarize_events = report_module.summarize_events
+    monkeypatch.setattr(report_module, "summarize_events", lambda *args, **kwargs: calls.append(kwargs) or summarize_events(*args, **kwargs))
+
+    async def stream():
+        return [event async for event in workflow.arun(
+            input=report_module.get_input_message("20251116", "HOU", "ORL"),
+            additional_data={"date": "20251116", "home_team": "HOU"},
+            stream=True,
+            stream_events=True,
+            )]
+
+    events = asyncio.run(stream())
+    progress = [index for index, event in enumerate(events) if isinstance(event, report_module.SearchPhaseEvent)]
+    tokens = [index for index, event in enumerate(events) if isinstance(event, RunContentEvent) and event.content]
+    assert len(progress) == 1 and tokens and progress[0] < tokens[0]
+
+    search = events[progress[0]]
+    assert (search.events, search.cached) == (441, False)
+    assert search.to_dict()["event"] == "CustomEvent"
+
+    text = "".join(events[index].content for index in tokens)
+    report = events[-1].content
+    assert report.startswith(text)
+    assert "## Game Statistics" in report and "### ORL Box Score" in report
+    assert "| G. Harris | 32 |" in report
+
+    # The writing phase gets the summary without the box score
+    assert [call["with_box_score"] for call in calls] == [False]
+
+def test_report_without_streaming(monkeypatch, tmp_path):
+    '''
+    The same report is returned by a run without streaming, the second run is served from the cache.
+    '''
+    workflow = offline_workflow(monkeypatch, tmp_path)
+
+    async def run():
+        return await workflow.arun(
+            input=report_module.get_input_message("20251116", "HOU", "ORL"),
+            additional_data={"date": "20251116", "home_team": "HOU"},
+            )
+
+    first, second = asyncio.run(run()), asyncio.run(run())
+    assert "## Game Statistics" in first.content
+    assert first.content == second.content
+    assert [step.step_name for step in first.step_results[1].steps] == ["Writing Phase", "Statistics Phase"]
+
+def test_sync_run(monkeypatch, tmp_path):
+    '''
+    The sync run returns the same report as the async run, with and without streaming.
+    '''
+    workflow = offline_workflow(monkeypatch, tmp_path)
+    kwargs = dict(
+        input=report_module.get_input_message("20251116", "HOU", "ORL"),
+        additional_data={"date": "20251116", "home_team": "HOU"},
+        )
+
+    response = workflow.run(**kwargs)
+    assert "## Game Statistics" in response.content and "| G. Harris | 32 |" in response.content
+    assert [step.step_name for step in response.step_results[1].steps] == ["Writing Phase", "Statistics Phase"]
+    assert response.content == asyncio.run(workflow.arun(**kwargs)).content
+
+    events = list(workflow.run(**kwargs, stream=True, stream_events=True))
+    tokens = "".join(event.content for event in events if isinstance(event, RunContentEvent) and event.content)
+    assert tokens and events[-1].content.startswith(tokens)
+    assert events[-1].content == response.content
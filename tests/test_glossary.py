@@ -0,0 +1,95 @@
+'''
+This module tests the stat glossary index.
+'''
+import os
+import sys
+import asyncio
+
+from agno.db.sqlite import SqliteDb
+from agno.knowledge.knowledge import Knowledge
+from agno.vectordb.qdrant import Qdrant
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.glossary import GlossaryIndex, GlossaryTools, normalize_term, parse_glossary
+from utils.knowledge_base import BatchingEmbedder
+from utils.kb_ingest import KnowledgeIngestor, Source
+from test_kb_ingest import CountingEmbedder
+
+GLOSSARY_PAGE = """
+Glossary
+True Shooting Percentage
+Abbreviation
+TS%
+Definition
+A shooting percentage that factors in the value of three-point field goals and free throws.
+Formula
+PTS / (2 * (FGA + 0.44 * FTA))
+Usage Percentage
+Abbreviation: USG%
+Definition: The percentage of team plays used by a player while on the floor.
+Box Plus/Minus (BPM): A box score estimate of the points per 100 possessions a player contributed.
+"""
+
+def test_parse_glossary():
+    '''
+    Labelled blocks and one-line entries are extracted with their formula.
+    '''
+    entries = parse_glossary(GLOSSARY_PAGE, "glossary")
+    assert [(e.abbreviation, e.name) for e in entries] == [
+        ("TS%", "True Shooting Percentage"),
+        ("USG%", "Usage Percentage"),
+        ("BPM", "Box Plus/Minus"),
+    ]
+    assert entries[0].formula == "PTS / (2 * (FGA + 0.44 * FTA))"
+    assert entries[1].definition == "The percentage of team plays used by a player while on the floor."
+
+def test_normalize_term():
+    assert normalize_term("TS%") == normalize_term("ts pct") == normalize_term("TS Percentage") == "tspct"
+    assert normalize_term("usage rate") == normalize_term("Usage Percentage")
+
+def test_lookup_by_abbreviation_name_and_alias(tmp_path):
+    '''
+    The terms are found by abbreviation, name and alias, also asked as a question, and the index is shared through its file.
+    '''
+    index = GlossaryIndex(path=str(tmp_path / "glossary.json"))
+    assert index.update("glossary", parse_glossary(GLOSSARY_PAGE, "glossary"))
+    assert not index.update("glossary", parse_glossary(GLOSSARY_PAGE, "glossary"))
+
+    reader = GlossaryIndex(path=str(tmp_path / "glossary.json"))
+    for term in ["TS%", "ts pct", "true shooting", "True Shooting Percentage"]:
+        assert reader.lookup(term).abbreviation == "TS%"
+    assert reader.lookup("usage rate").abbreviation == "USG%"
+    assert reader.lookup("What is BPM?").abbreviation == "BPM"
+    assert reader.lookup("What does TS% stand for?").abbreviation == "TS%"
+    assert reader.lookup("PER") is None
+
+    # A phrase is only matched as a whole, not by one of its words
+    assert reader.lookup("defensive BPM") is None
+    assert reader.lookup("usage per game") is None
+    assert (reader.hits, reader.misses) == (7, 3)
+
+    tools = GlossaryTools(index=reader)
+    assert tools.lookup_stat_definition("TS%").startswith("TS% (True Shooting Percentage): A shooting percentage")
+    assert "Formula: PTS / (2 * (FGA + 0.44 * FTA))" in tools.lookup_stat_definition("TS%")
+    assert tools.lookup_stat_definition("PER") == "No glossary entry for 'PER'. Search the knowledge base instead."
+
+def test_glossary_built_during_ingestion(tmp_path):
+    '''
+    The ingestion indexes the terms of every source, and replaces them when the source changes.
+    '''
+    index = GlossaryIndex(path=str(tmp_path / "glossary.json"))
+    knowledge = Knowledge(
+        vector_db=Qdrant(collection="test", location=":memory:", embedder=BatchingEmbedder(embedder=CountingEmbedder())),
+        contents_db=SqliteDb(db_file=str(tmp_path / "contents.db")),
+    )
+    ingestor = KnowledgeIngestor(knowledge, chunk_size=200, glossary=index)
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", GLOSSARY_PAGE, "url")]))
+    assert stats["glossary_terms"] > 3
+    assert index.lookup("BPM").source == "glossary"
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", GLOSSARY_PAGE.replace("Box Plus/Minus (BPM)", "Player Efficiency Rating (PER)"), "url")]))
+    assert index.lookup("BPM") is None
+    assert index.lookup("PER").name == "Player Efficiency Rating"
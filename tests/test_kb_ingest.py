@@ -0,0 +1,78 @@
+'''
+This module tests the incremental knowledge base ingestion.
+'''
+import os
+import sys
+import asyncio
+from dataclasses import dataclass
+
+from agno.db.sqlite import SqliteDb
+from agno.knowledge.embedder import Embedder
+from agno.knowledge.knowledge import Knowledge
+from agno.vectordb.qdrant import Qdrant
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.knowledge_base import BatchingEmbedder
+from utils.kb_ingest import KnowledgeIngestor, Source, extract_page
+
+@dataclass
+class CountingEmbedder(Embedder):
+    '''
+    Deterministic embedder counting its API calls.
+    '''
+    dimensions: int = 4
+    calls: int = 0
+
+    def get_embedding_and_usage(self, text):
+        self.calls += 1
+        return [float(len(text) % 5 + 1), 1.0, 1.0, 1.0], None
+
+    async def async_get_embeddings_batch_and_usage(self, texts):
+        self.calls += 1
+        return [[float(len(text) % 5 + 1), 1.0, 1.0, 1.0] for text in texts], [None] * len(texts)
+
+def test_extract_page():
+    '''
+    The visible text and the links to the same site are extracted.
+    '''
+    html = (
+        '<html><script>var x = 1;</script><body><h1>Glossary</h1><p>BPM: Box Plus/Minus</p>'
+        '<a href="/stats/help/faq#top">FAQ</a><a href="https://example.com/x">Other</a></body></html>'
+    )
+    text, links = extract_page(html, "https://www.nba.com/stats/help/glossary")
+    assert text == "Glossary\nBPM: Box Plus/Minus\nFAQ\nOther"
+    assert links == ["https://www.nba.com/stats/help/faq"]
+
+def test_incremental_ingestion(tmp_path):
+    '''
+    Chunks are embedded in batches, unchanged sources are skipped and only the changed chunks are re-embedded.
+    '''
+    embedder = CountingEmbedder()
+    knowledge = Knowledge(
+        vector_db=Qdrant(collection="test", location=":memory:", embedder=BatchingEmbedder(embedder=embedder, batch_size=4)),
+        contents_db=SqliteDb(db_file=str(tmp_path / "contents.db")),
+    )
+    ingestor = KnowledgeIngestor(knowledge, chunk_size=40)
+    text = "\n".join(f"Line {i} of the stat glossary." for i in range(8))
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", text, "url"), Source("faq", "Short page.", "url")]))
+    assert stats["docs"] == 2
+    assert stats["chunks_embedded"] == 9
+    assert stats["embed_batches"] == embedder.calls == 3
+    assert knowledge.vector_db.get_count() == 9
+    assert knowledge.vector_db.embedder.stats()["prefetched_embeddings"] == 0
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", text, "url")]))
+    assert stats["docs_unchanged"] == 1
+    assert embedder.calls == 3
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", text.replace("Line 7", "Row 7"), "url")]))
+    assert (stats["chunks_embedded"], stats["chunks_kept"], stats["chunks_deleted"]) == (1, 7, 1)
+    assert embedder.calls == 4
+    assert knowledge.vector_db.get_count() == 9
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", text.replace("Line 7", "Row 7").replace("Line 0", "Row 0").replace("Line 1", "Row 1"), "url")]))
+    assert stats["chunks_deleted"] == 2
+    assert knowledge.vector_db.get_count() == 9
@@ -0,0 +1,108 @@
+'''
+This module tests the shared HTTP clients of the LLM providers.
+'''
+import os
+import sys
+import asyncio
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import utils.llm_clients as llm_clients_module
+from utils.llm_clients import LLMClientRegistry, get_provider_limits, pooled
+
+class FakeModel:
+    '''
+    Stand-in of an agno model: the SDK client is built on the http_client set at that time.
+    '''
+
+    def __init__(self, id: str):
+        self.id = id
+        self.timeout = None
+        self.http_client = None
+        self.client = None
+        self.async_client = None
+
+    def get_async_client(self):
+        self.async_client = FakeSdkClient(self.http_client, self.timeout)
+        return self.async_client
+
+    def get_client(self):
+        self.client = FakeSdkClient(self.http_client, self.timeout)
+        return self.client
+
+    async def ainvoke(self, *args, **kwargs):
+        await asyncio.sleep(0.01)
+        return self.id
+
+class FakeSdkClient:
+    def __init__(self, http_client, timeout):
+        self._client = self.http_client = http_client
+        self.timeout = timeout
+
+    def is_closed(self):
+        return False
+
+def test_models_share_the_http_client_of_their_provider(monkeypatch):
+    '''
+    The models of a provider share its clients, which are configured with the provider limits.
+    '''
+    monkeypatch.setitem(llm_clients_module.LLM_PROVIDER_LIMITS, "fake", {"timeout": 30, "max_connections": 4})
+    registry = LLMClientRegistry()
+    monkeypatch.setattr(llm_clients_module, "llm_clients", registry)
+
+    model_class = pooled(FakeModel, "fake")
+    assert pooled(FakeModel, "fake") is model_class
+    first, second = model_class("gpt-4.1"), model_class("o4-mini")
+
+    client = first.get_async_client()
+    assert client.http_client is second.get_async_client().http_client is registry.async_client("fake")
+    assert first.get_client().http_client is registry.sync_client("fake")
+    assert client.http_client is not registry.async_client("other")
+
+    # The SDK client is built once, the model does not keep the HTTP client
+    assert first.get_async_client() is client
+    assert first.http_client is None
+    assert first.timeout == 30
+    assert client.http_client._transport._pool._max_connections == 4
+
+def test_concurrency_limit_per_provider(monkeypatch):
+    '''
+    The model calls of a provider wait for a free slot.
+    '''
+    monkeypatch.setitem(llm_clients_module.LLM_PROVIDER_LIMITS, "fake", {"max_concurrency": 2})
+    registry = LLMClientRegistry()
+    monkeypatch.setattr(llm_clients_module, "llm_clients", registry)
+    models = [pooled(FakeModel, "fake")(f"model-{i}") for i in range(3)]
+
+    async def calls():
+        return await asyncio.gather(*(model.ainvoke() for model in models * 3))
+
+    assert asyncio.run(calls()) == [model.id for model in models] * 3
+    stats = registry.stats()["fake"]
+    assert (stats["calls"], stats["in_flight"], stats["max_in_flight"]) == (9, 0, 2)
+    assert stats["limits"] == {**stats["limits"], "max_concurrency": 2}
+    assert get_provider_limits("openai").max_concurrency == llm_clients_module.LLM_MAX_CONCURRENCY
+
+def test_async_clients_and_slots_per_event_loop(monkeypatch):
+    '''
+    Every event loop, e.g. of successive `asyncio.run` calls, gets its own async client and slots,
+    and the models build their SDK client again on the client of the new loop.
+    '''
+    monkeypatch.setitem(llm_clients_module.LLM_PROVIDER_LIMITS, "fake", {"max_concurrency": 1})
+    registry = LLMClientRegistry()
+    monkeypatch.setattr(llm_clients_module, "llm_clients", registry)
+    model = pooled(FakeModel, "fake")("gpt-4.1")
+
+    async def calls():
+        client = model.get_async_client()
+        assert model.get_async_client() is client
+        await asyncio.gather(*(model.ainvoke() for _ in range(3)))
+        return client.http_client
+
+    first = asyncio.run(calls())
+    second = asyncio.run(calls())
+    assert first is not second
+    assert second is not registry.async_client("fake")
+    assert len(registry._async_clients) == 1
+    assert registry.stats()["fake"]["calls"] == 6
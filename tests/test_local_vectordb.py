@@ -0,0 +1,125 @@
+'''
+This module tests the in-process vector database of the knowledge base.
+'''
+import os
+import sys
+import asyncio
+from dataclasses import dataclass
+
+from agno.db.sqlite import SqliteDb
+from agno.knowledge.document import Document
+from agno.knowledge.embedder import Embedder
+from agno.knowledge.knowledge import Knowledge
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.local_vectordb import LocalVectorDb
+from utils.kb_ingest import KnowledgeIngestor, Source
+
+WORDS = ["rebound", "assist", "turnover", "plus", "shooting", "usage"]
+
+@dataclass
+class KeywordEmbedder(Embedder):
+    '''
+    Deterministic embedder counting the known words of a text.
+    '''
+    dimensions: int = len(WORDS)
+
+    def get_embedding_and_usage(self, text):
+        return [float(text.lower().count(word)) + 0.01 for word in WORDS], None
+
+    def get_embedding(self, text):
+        return self.get_embedding_and_usage(text)[0]
+
+    async def async_get_embedding_and_usage(self, text):
+        return self.get_embedding_and_usage(text)
+
+    async def async_get_embedding(self, text):
+        return self.get_embedding(text)
+
+def documents():
+    return [
+        Document(id="reb", name="glossary", content="Rebound percentage: share of the rebounds.", meta_data={"topic": "rebound"}),
+        Document(id="ast", name="glossary", content="Assist ratio: assist per 100 possessions.", meta_data={"topic": "assist"}),
+        Document(id="tov", name="faq", content="Turnover ratio: turnover per 100 possessions.", meta_data={"topic": "turnover"}),
+    ]
+
+def test_insert_search_and_delete(tmp_path):
+    '''
+    The documents are found by similarity and filters, and deleted by metadata.
+    '''
+    db = LocalVectorDb(collection="test", embedder=KeywordEmbedder(), path=str(tmp_path))
+    db.create()
+    db.insert("hash", documents())
+
+    assert db.get_count() == 3
+    assert db.exists() and db.name_exists("faq") and db.content_hash_exists("hash")
+    assert [d.meta_data["topic"] for d in db.search("What is an assist?", limit=1)] == ["assist"]
+    assert [d.meta_data["topic"] for d in db.search("rebound", limit=5, filters={"topic": "turnover"})] == ["turnover"]
+
+    # Inserting the same documents again replaces them
+    db.insert("hash", documents())
+    assert db.get_count() == 3
+
+    db.delete_by_metadata({"topic": "assist"})
+    assert db.get_count() == 2
+    assert "assist" not in [d.meta_data["topic"] for d in asyncio.run(db.async_search("assist", limit=5))]
+
+    # A list value matches any of its items
+    db.delete_by_metadata({"topic": ["rebound", "turnover"]})
+    assert db.get_count() == 0
+
+def test_reload_across_instances(tmp_path):
+    '''
+    A reader (e.g. a server worker) sees the documents written by another instance (e.g. the ingestion).
+    '''
+    reader = LocalVectorDb(collection="test", embedder=KeywordEmbedder(), path=str(tmp_path))
+    assert reader.search("rebound") == []
+
+    writer = LocalVectorDb(collection="test", embedder=KeywordEmbedder(), path=str(tmp_path))
+    writer.insert("hash", documents())
+    assert reader.search("rebound", limit=1)[0].meta_data["topic"] == "rebound"
+
+    writer.delete_by_name("glossary")
+    assert [d.name for d in reader.search("rebound")] == ["faq"]
+
+def test_knowledge_with_local_backend(tmp_path):
+    '''
+    The ingestion and the knowledge search work the same as with Qdrant.
+    '''
+    knowledge = Knowledge(
+        vector_db=LocalVectorDb(collection="test", embedder=KeywordEmbedder(), path=str(tmp_path)),
+        contents_db=SqliteDb(db_file=str(tmp_path / "contents.db")),
+    )
+    ingestor = KnowledgeIngestor(knowledge, chunk_size=60)
+    text = "Rebound percentage: share of the rebounds.\nUsage rate: share of the plays used."
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", text, "url")]))
+    assert stats["chunks_embedded"] == 2
+
+    stats = asyncio.run(ingestor.ingest([Source("glossary", text.replace("plays", "usage plays"), "url")]))
+    assert (stats["chunks_embedded"], stats["chunks_kept"], stats["chunks_deleted"]) == (1, 1, 1)
+    assert knowledge.vector_db.get_count() == 2
+    assert "usage plays" in knowledge.search("usage", max_results=1)[0].content
+
+    # The removed chunks of a source are deleted with one write
+    writes = []
+    update = knowledge.vector_db._update
+    knowledge.vector_db._update = lambda change: (writes.append(change), update(change))[1]
+    stats = asyncio.run(ingestor.ingest([Source("glossary", "Rebound rate: share of the rebounds.\nUsage: plays used.", "url")]))
+    assert stats["chunks_deleted"] == 2
+    # The deletion and the insertion
+    assert len(writes) == 2
+    assert knowledge.vector_db.get_count() == stats["chunks_embedded"]
+
+def test_hashing_embedder_offline(tmp_path):
+    '''
+    The hashing embedder of the knowledge base finds the documents with the same wording, without API calls.
+    '''
+    from utils.knowledge_base import HashingEmbedder, get_embedder
+
+    assert isinstance(get_embedder("hashing"), HashingEmbedder)
+    vector_db = LocalVectorDb(collection="test", embedder=get_embedder("hashing"), path=str(tmp_path))
+    vector_db.insert("hash", documents())
+    assert vector_db.search("offensive rebound", limit=1)[0].meta_data["topic"] == "rebound"
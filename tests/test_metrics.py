@@ -0,0 +1,111 @@
+'''
+This module tests the latency metrics and their Prometheus route.
+'''
+import os
+import sys
+import asyncio
+
+from agno.agent import Agent
+from agno.tools import tool
+from agno.workflow import Step, StepOutput, Workflow
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.metrics import (
+    LLM_TOKENS,
+    LLM_TTFT,
+    STEP_LATENCY,
+    TOOL_LATENCY,
+    MetricsRegistry,
+    add_metrics_route,
+    timed_model,
+    timed_step,
+    timed_tool,
+    )
+from utils.stub_model import StubModel
+
+def test_render_histograms_and_collectors():
+    '''
+    Histograms are rendered with cumulative buckets, the numbers of the collectors as gauges.
+    '''
+    registry = MetricsRegistry()
+    histogram = registry.histogram("fetch_seconds", "Fetch duration.", ["phase"], buckets=[0.1, 1])
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, phase="http_fetch")
+    registry.register_collector("cache", lambda: {"hits": 3, "hit_rate": 0.75, "latency_ms": {"team": 120.5, "data": None}, "name": "x"})
+
+    lines = registry.render().splitlines()
+    assert 'basketball_ai_fetch_seconds_bucket{phase="http_fetch",le="0.1"} 1' in lines
+    assert 'basketball_ai_fetch_seconds_bucket{phase="http_fetch",le="1.0"} 2' in lines
+    assert 'basketball_ai_fetch_seconds_bucket{phase="http_fetch",le="+Inf"} 3' in lines
+    assert 'basketball_ai_fetch_seconds_count{phase="http_fetch"} 3' in lines
+    assert "basketball_ai_cache_hits 3" in lines
+    assert "basketball_ai_cache_latency_ms_team 120.5" in lines
+    assert not any(line.startswith(("basketball_ai_cache_name", "basketball_ai_cache_latency_ms_data")) for line in lines)
+
+def test_timed_tools_keep_their_schema():
+    '''
+    Timed tools keep the parameters of their schema, the sync and async variants are timed under the tool name.
+    '''
+    @tool(name="get_stats")
+    @timed_tool("get_stats")
+    def get_stats(season: str, n_cluster: int = 5) -> str:
+        return f"{season}:{n_cluster}"
+
+    @tool(name="get_stats")
+    @timed_tool("get_stats")
+    async def aget_stats(season: str, n_cluster: int = 5) -> str:
+        return f"{season}:{n_cluster}"
+
+    before = TOOL_LATENCY.get(tool="get_stats")["count"]
+    for function in (get_stats, aget_stats):
+        function.process_entrypoint()
+        assert list(function.parameters["properties"]) == ["season", "n_cluster"]
+    assert get_stats.entrypoint(season="2024") == "2024:5"
+    assert asyncio.run(aget_stats.entrypoint(season="2025", n_cluster=3)) == "2025:3"
+    assert TOOL_LATENCY.get(tool="get_stats")["count"] - before == 2
+
+def test_llm_calls_and_workflow_steps():
+    '''
+    The LLM calls record their tokens and the time to first token of streams, every workflow step its duration.
+    '''
+    agent = Agent(name="Agent", model=timed_model(StubModel)(id="metrics-stub", latency_ms=0), telemetry=False)
+    labels = {"provider": "Stub", "model": "metrics-stub"}
+
+    agent.run("Show me 2024 team shooting")
+    assert LLM_TOKENS.get(direction="output", **labels) > 0
+    assert LLM_TTFT.get(**labels)["count"] == 0
+
+    async def stream():
+        return [event async for event in agent.arun("Show me 2025 team shooting", stream=True)]
+
+    asyncio.run(stream())
+    assert LLM_TTFT.get(**labels)["count"] == 1
+
+    workflow = Workflow(
+        name="Metrics Workflow",
+        steps=[timed_step(Step(name="Metrics Step", executor=lambda step_input: StepOutput(content="done")))],
+        telemetry=False,
+        )
+    before = STEP_LATENCY.get(step="Metrics Step")["count"]
+    assert workflow.run(input="go").content == "done"
+    assert STEP_LATENCY.get(step="Metrics Step")["count"] - before == 1
+
+def test_metrics_route():
+    '''
+    The metrics are served in the Prometheus text format, before the other routes of the same path.
+    '''
+    app = FastAPI()
+
+    @app.get("/metrics")
+    def usage_metrics():
+        return {"usage": []}
+
+    client = TestClient(add_metrics_route(app, path="/metrics"))
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE basketball_ai_tool_duration_seconds histogram" in response.text
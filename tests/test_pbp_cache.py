@@ -0,0 +1,119 @@
+'''
+This module tests the shared play by play cache with a recorded Basketball Reference page.
+'''
+import os
+import sys
+import time
+import asyncio
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import utils.pbp_cache as pbp_cache_module
+from utils.pbp_cache import (
+    PlayByPlayCache,
+    aget_play_by_play,
+    is_game_final,
+    parse_play_by_play_html,
+    parse_scoreboard_html,
+    )
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pbp_20251116_HOU.html")
+
+def test_round_trip(tmp_path):
+    '''
+    A cached frame is read back unchanged.
+    '''
+    df = parse_play_by_play_html(FIXTURE)
+    cache = PlayByPlayCache(cache_dir=str(tmp_path), ttl=0)
+
+    assert cache.get("20251116", "HOU") is None
+    cache.put("20251116", "HOU", df)
+
+    cached = cache.get("20251116", "HOU")
+    assert cached is not None
+    assert cached.columns.tolist() == df.columns.tolist()
+    assert cached["Score"].tolist() == df["Score"].tolist()
+
+def test_concurrent_puts(tmp_path):
+    '''
+    Threads storing the same game at the same time never leave a partial file.
+    '''
+    df = parse_play_by_play_html(FIXTURE)
+    cache = PlayByPlayCache(cache_dir=str(tmp_path))
+
+    async def put_all():
+        await asyncio.gather(*(asyncio.to_thread(cache.put, "20251116", "HOU", df) for _ in range(8)))
+
+    asyncio.run(put_all())
+    assert cache.get("20251116", "HOU").equals(df)
+    assert not list(tmp_path.rglob("*.tmp"))
+
+def test_live_game_expires(tmp_path):
+    '''
+    Games in progress expire after the TTL, finished games never do.
+    '''
+    df = parse_play_by_play_html(FIXTURE)
+    today = time.strftime("%Y%m%d")
+    live = df.iloc[:50]
+    cache = PlayByPlayCache(cache_dir=str(tmp_path), ttl=0)
+
+    assert not is_game_final(today, live)
+    assert is_game_final(today, df)
+
+    cache.put(today, "HOU", live)
+    time.sleep(0.01)
+    assert cache.get(today, "HOU") is None
+
+    cache.put(today, "HOU", df)
+    time.sleep(0.01)
+    assert cache.get(today, "HOU") is not None
+
+def test_async_fetch_uses_cache(tmp_path, monkeypatch):
+    '''
+    The async variant fetches the page and serves later calls from the cache.
+    '''
+    fetched = []
+
+    async def fake_fetch_text(url):
+        fetched.append(url)
+        with open(FIXTURE) as f:
+            return f.read()
+
+    monkeypatch.setattr(pbp_cache_module, "fetch_text", fake_fetch_text)
+    monkeypatch.setattr(pbp_cache_module, "pbp_cache", PlayByPlayCache(cache_dir=str(tmp_path)))
+
+    async def fetch_twice():
+        return await asyncio.gather(
+            aget_play_by_play("20251116", "HOU"),
+            aget_play_by_play("20251116", "HOU"),
+            )
+
+    first, second = asyncio.run(fetch_twice())
+    n_fetched = len(fetched)
+    third = asyncio.run(aget_play_by_play("20251116", "HOU"))
+
+    assert len(fetched) == n_fetched
+    assert len(first) == len(second) == len(third)
+    assert fetched[0].endswith("/pbp/202511160HOU.html")
+
+def test_parse_scoreboard():
+    '''
+    Every game summary block yields a (home_team, away_team) pair.
+    '''
+    html = '''
+    <div class="game_summary expanded nohover">
+      <table class="teams"><tbody>
+        <tr class="loser"><td><a href="/teams/ORL/2026.html">Orlando</a></td><td class="right">106</td>
+        <td class="right gamelink"><a href="/boxscores/202511160HOU.html">Final</a></td></tr>
+        <tr class="winner"><td><a href="/teams/HOU/2026.html">Houston</a></td><td class="right">117</td></tr>
+      </tbody></table>
+    </div>
+    <div class="game_summary expanded nohover">
+      <table class="teams"><tbody>
+        <tr><td><a href="/teams/BOS/2026.html">Boston</a></td></tr>
+        <tr><td><a href="/teams/LAL/2026.html">LA Lakers</a></td></tr>
+      </tbody></table>
+    </div>
+    '''
+    assert parse_scoreboard_html(html) == [("HOU", "ORL"), ("LAL", "BOS")]
@@ -0,0 +1,51 @@
+'''
+This module tests the typed play by play parser.
+'''
+import os
+import sys
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.pbp_cache import PlayByPlayCache, parse_play_by_play_html
+from utils.pbp_parser import parse_events, get_teams
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pbp_20251116_HOU.html")
+
+def test_parse_events():
+    '''
+    Header rows are dropped and every play gets typed columns.
+    '''
+    df = parse_play_by_play_html(FIXTURE)
+    events = parse_events(df)
+
+    assert get_teams(events) == ("ORL", "HOU")
+    assert events["period"].tolist() == sorted(events["period"].tolist())
+    assert events["period"].max() == 4
+    assert str(events["event_type"].dtype) == "category"
+    assert str(events["seconds_remaining"].dtype) == "int16"
+    assert events["event_type"].eq("other").sum() == 0
+
+    first = events.iloc[0]
+    assert (first["period"], first["seconds_remaining"], first["team"]) == (1, 706, "ORL")
+    assert (first["player"], first["event_type"], first["shot_value"], first["points"]) == (
+        "W. Carter Jr.", "field_goal_made", 2, 2)
+
+    # The running score matches the points of each team
+    points = events.groupby("team", observed=True)["points"].sum()
+    assert points["ORL"] == events["away_score"].iloc[-1]
+    assert points["HOU"] == events["home_score"].iloc[-1]
+
+def test_events_cache_round_trip(tmp_path):
+    '''
+    The typed event table keeps its dtypes and team order in the Parquet cache.
+    '''
+    events = parse_events(parse_play_by_play_html(FIXTURE))
+    cache = PlayByPlayCache(cache_dir=str(tmp_path), suffix="events")
+
+    cache.put("20251116", "HOU", events, final=True)
+    cached = cache.get("20251116", "HOU")
+
+    assert get_teams(cached) == ("ORL", "HOU")
+    assert cached.dtypes.astype(str).tolist() == events.dtypes.astype(str).tolist()
+    assert (tmp_path / "20251116_HOU.events.parquet").exists()
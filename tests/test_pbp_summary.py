@@ -0,0 +1,65 @@
+'''
+This module tests the play by play compaction used by the game report workflow.
+'''
+import os
+import sys
+
+import pandas as pd
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.pbp_cache import parse_play_by_play_html
+from utils.pbp_parser import parse_events
+from utils.table_format import to_toon
+from utils.pbp_summary import (
+    prepare_events,
+    summarize_play_by_play,
+    render_summary,
+    lead_changes,
+    clutch_events,
+    )
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pbp_20251116_HOU.html")
+
+def close_game() -> pd.DataFrame:
+    '''
+    A short raw play by play of a close 4th quarter.
+    '''
+    rows = [
+        ["12:00.0"] + ["Start of 4th quarter"] * 5,
+        ["4:50.0", "P. Banchero makes 2-pt layup from 1 ft", "+2", "100-98", None, None],
+        ["4:20.0", None, None, "100-101", "+3", "F. VanVleet makes 3-pt jump shot from 26 ft (assist by A. Sengun)"],
+        ["3:10.0", "F. Wagner makes free throw 1 of 2", "+1", "101-101", None, None],
+        ["3:10.0", "F. Wagner misses free throw 2 of 2", None, "101-101", None, None],
+        ["2:55.0", None, None, "101-101", None, "Defensive rebound by A. Sengun"],
+        ["0:30.0", "J. Suggs makes 3-pt jump shot from 24 ft", "+3", "104-101", None, None],
+        ["0:00.0"] + ["End of 4th quarter"] * 5,
+    ]
+    return pd.DataFrame(rows, columns=["Time", "ORL", "Unnamed: 2_level_1", "Score", "Unnamed: 4_level_1", "HOU"])
+
+def test_lead_changes_and_clutch():
+    '''
+    Lead changes, ties and clutch time plays are detected.
+    '''
+    events = prepare_events(parse_events(close_game()))
+
+    assert lead_changes(events) == {"lead_changes": 2, "times_tied": 1}
+    assert len(clutch_events(events)) == 4
+
+def test_summary_matches_final_score():
+    '''
+    The box score adds up to the final score and the summary is much smaller than the raw frame.
+    '''
+    df = parse_play_by_play_html(FIXTURE)
+    summary = summarize_play_by_play(df)
+
+    box = summary["box_score"].groupby("team")["PTS"].sum()
+    quarters = summary["quarter_scores"].set_index("team")["Total"]
+    assert summary["final_score"] == f"ORL {box['ORL']} - {box['HOU']} HOU"
+    assert quarters.to_dict() == box.to_dict()
+
+    text = render_summary(summary)
+    assert len(text) < len(to_toon(df)) / 10
+    assert "last_plays" not in summary
+    assert len(summarize_play_by_play(df, raw_row_budget=10)["last_plays"]) == 10
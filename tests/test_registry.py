@@ -0,0 +1,93 @@
+'''
+This module tests the lazy component registry and the lazy ASGI app.
+'''
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import anyio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.registry import ComponentRegistry, LazyASGIApp
+
+def test_components_built_once():
+    '''
+    Components are built on first use, once, with their dependencies.
+    '''
+    registry = ComponentRegistry()
+    built = []
+    registry.register("knowledge_base", lambda: built.append("knowledge_base") or "kb")
+    registry.register("agent", lambda: built.append("agent") or f"agent({registry.get('knowledge_base')})")
+
+    assert built == []
+    assert registry.get("agent") == "agent(kb)"
+    assert registry.get("agent") == "agent(kb)"
+    assert sorted(built) == ["agent", "knowledge_base"]
+    assert registry.is_built("knowledge_base")
+
+def test_app_built_on_first_request():
+    '''
+    The wrapped app and its lifespan start on the first request and stop on shutdown.
+    '''
+    events = []
+
+    def factory():
+        @asynccontextmanager
+        async def lifespan(app):
+            events.append("startup")
+            yield
+            events.append("shutdown")
+
+        events.append("built")
+        app = FastAPI(lifespan=lifespan)
+        app.get("/health")(lambda: {"status": "ok"})
+        return app
+
+    with TestClient(LazyASGIApp(factory)) as client:
+        assert events == []
+        assert client.get("/health").json() == {"status": "ok"}
+        client.get("/health")
+        assert events == ["built", "startup"]
+
+    assert events == ["built", "startup", "shutdown"]
+
+def test_app_warm_up():
+    '''
+    With warm up the app is built at startup.
+    '''
+    built = []
+    app = LazyASGIApp(lambda: built.append(1) or FastAPI(), warm_up=True)
+
+    with TestClient(app):
+        assert built == [1]
+
+def test_app_lifespan_with_task_group():
+    '''
+    The lifespan of the wrapped app may run a task group, e.g. the MCP server of the AgentOS:
+    it is entered and exited by the same task, not by the first request.
+    '''
+    events = []
+
+    def factory():
+        @asynccontextmanager
+        async def lifespan(app):
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(anyio.sleep_forever)
+                events.append("startup")
+                yield
+                task_group.cancel_scope.cancel()
+            events.append("shutdown")
+
+        app = FastAPI(lifespan=lifespan)
+        app.get("/health")(lambda: {"status": "ok"})
+        return app
+
+    with TestClient(LazyASGIApp(factory)) as client:
+        assert client.get("/health").json() == {"status": "ok"}
+        assert events == ["startup"]
+
+    assert events == ["startup", "shutdown"]
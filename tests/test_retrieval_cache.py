@@ -0,0 +1,145 @@
+'''
+This module tests the retrieval cache and the query batching of the knowledge searches.
+'''
+import os
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agno.db.sqlite import SqliteDb
+from agno.knowledge.document import Document
+from agno.knowledge.embedder import Embedder
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.knowledge_base import BatchingEmbedder, CachedKnowledge
+from utils.local_vectordb import LocalVectorDb
+from utils.kb_ingest import KnowledgeIngestor, Source
+
+WORDS = ["rebound", "assist", "usage", "plus"]
+
+@dataclass
+class CountingEmbedder(Embedder):
+    '''
+    Deterministic keyword embedder counting its API calls.
+    '''
+    dimensions: int = len(WORDS)
+    calls: int = 0
+
+    def _embed(self, text):
+        return [float(text.lower().count(word)) + 0.01 for word in WORDS]
+
+    def get_embedding_and_usage(self, text):
+        self.calls += 1
+        return self._embed(text), None
+
+    async def async_get_embeddings_batch_and_usage(self, texts):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return [self._embed(text) for text in texts], [None] * len(texts)
+
+def create_knowledge(tmp_path, embedder):
+    return CachedKnowledge(
+        vector_db=LocalVectorDb(collection="test", embedder=BatchingEmbedder(embedder=embedder), path=str(tmp_path)),
+        contents_db=SqliteDb(db_file=str(tmp_path / "contents.db")),
+    )
+
+def test_search_results_are_cached(tmp_path):
+    '''
+    A repeated query is served from the cache, without embedding it again.
+    '''
+    embedder = CountingEmbedder()
+    knowledge = create_knowledge(tmp_path, embedder)
+    knowledge.vector_db.insert("hash", [
+        Document(name="glossary", content="Rebound percentage: share of the rebounds."),
+        Document(name="glossary", content="Usage rate: share of the plays used."),
+    ])
+    calls = embedder.calls
+
+    first = knowledge.search("Usage rate", max_results=1)
+    second = knowledge.search("  usage RATE ", max_results=1)
+    assert [d.content for d in first] == [d.content for d in second] == ["Usage rate: share of the plays used."]
+    assert embedder.calls == calls + 1
+
+    stats = knowledge.stats()
+    assert (stats["hits"], stats["misses"], stats["cached_results"]) == (1, 1, 1)
+
+    # Another number of results is another entry
+    knowledge.search("usage rate", max_results=2)
+    assert knowledge.stats()["misses"] == 2
+
+def test_cache_is_cleared_when_the_collection_changes(tmp_path):
+    '''
+    The ingestion of new contents clears the cached results.
+    '''
+    knowledge = create_knowledge(tmp_path, CountingEmbedder())
+    ingestor = KnowledgeIngestor(knowledge, chunk_size=60)
+
+    asyncio.run(ingestor.ingest([Source("glossary", "Rebound percentage: share of the rebounds.", "url")]))
+    assert [d.content for d in knowledge.search("usage", max_results=1)] == ["Rebound percentage: share of the rebounds."]
+
+    asyncio.run(ingestor.ingest([Source("faq", "Usage rate: share of the plays used.", "url")]))
+    assert [d.content for d in knowledge.search("usage", max_results=1)] == ["Usage rate: share of the plays used."]
+    assert knowledge.stats()["hits"] == 0
+
+def test_collection_version_is_checked_periodically(tmp_path, monkeypatch):
+    '''
+    The contents DB is not queried on every search, a change of another process is seen once the version is checked again.
+    '''
+    knowledge = create_knowledge(tmp_path, CountingEmbedder())
+    knowledge.vector_db.insert("hash", [Document(name="glossary", content="Rebound percentage: share of the rebounds.")])
+    queries = []
+    get_knowledge_contents = knowledge.contents_db.get_knowledge_contents
+    monkeypatch.setattr(
+        knowledge.contents_db, "get_knowledge_contents", lambda *args, **kwargs: queries.append(1) or get_knowledge_contents(*args, **kwargs),
+        )
+
+    for _ in range(3):
+        asyncio.run(knowledge.asearch("usage", max_results=1))
+    assert len(queries) == 1
+    assert knowledge.stats()["hits"] == 2
+
+    # Written by another process: the vector DB version changes
+    writer = LocalVectorDb(collection="test", embedder=CountingEmbedder(), path=str(tmp_path))
+    writer.insert("other", [Document(name="faq", content="Usage rate: share of the plays used.")])
+    assert [d.content for d in knowledge.search("usage", max_results=1)] == ["Rebound percentage: share of the rebounds."]
+
+    knowledge.version_ttl = 0
+    assert [d.content for d in knowledge.search("usage", max_results=1)] == ["Usage rate: share of the plays used."]
+
+def test_concurrent_queries_are_embedded_together():
+    '''
+    Concurrent queries are embedded with one API call, identical queries once, and then served from the cache.
+    '''
+    embedder = CountingEmbedder()
+    batching = BatchingEmbedder(embedder=embedder, batch_window_ms=20)
+
+    async def searches():
+        return await asyncio.gather(*(batching.async_get_embedding(query) for query in ["TS%", "BPM", "usage rate", "BPM"]))
+
+    embeddings = asyncio.run(searches())
+    assert embedder.calls == 1
+    assert embeddings[1] == embeddings[3] == embedder._embed("BPM")
+    assert batching.stats()["embedded_texts"] == 3
+
+    asyncio.run(searches())
+    assert embedder.calls == 1
+    assert batching.stats()["cache_hits"] == 4
+
+def test_prefetched_embeddings_are_dropped():
+    '''
+    The prefetched embeddings are served once, the unused ones are dropped, and the stats count the threaded calls.
+    '''
+    embedder = CountingEmbedder()
+    batching = BatchingEmbedder(embedder=embedder, cache_size=0)
+
+    assert asyncio.run(batching.aprefetch(["TS%", "BPM", "usage rate"])) == 1
+    assert batching.get_embedding("BPM") == embedder._embed("BPM")
+    assert batching.clear_prefetched() == 2
+    assert batching.stats()["prefetched_embeddings"] == 0
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(batching.get_embedding, [f"query {i}" for i in range(200)]))
+    assert batching.stats()["embedded_texts"] == 3 + 200
@@ -0,0 +1,86 @@
+'''
+This module tests the adaptive routing of the team requests.
+'''
+import os
+import sys
+import asyncio
+
+from agno.agent import Agent
+from agno.db.sqlite import SqliteDb
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.routing import RoutedTeam, classify_request, routing_stats
+from utils.stub_model import StubModel
+
+def test_classify_request():
+    '''
+    Simple data retrievals go to the data agent, analyses and multi-step requests to the team.
+    '''
+    for question in [
+        "Show me 2024 team shooting",
+        "Get the player advanced stats clusters for 2025 with 4 clusters",
+        "2024 team shooting clusters",
+        "List the play by play of the 20250105 LAL game",
+    ]:
+        assert classify_request(question).route == "data", question
+
+    assert classify_request("Why did the Celtics shoot better in 2024?").reason == "analysis cue 'why'"
+    assert classify_request("Compare the 2024 and 2025 team shooting").route == "team"
+    assert classify_request("Get the 2024 team shooting, then plot the clusters").reason == "multi-step request"
+    assert classify_request("Write a game report of the 20250105 LAL game").route == "team"
+    assert classify_request("Who is the best rebounder?").route == "team"
+    assert classify_request("Show me the stats " + "of the season " * 20).reason == "long request"
+
+def routed_team(tmp_path) -> RoutedTeam:
+    db = SqliteDb(db_file=str(tmp_path / "agno.db"))
+    return RoutedTeam(
+        name="Team",
+        id="team",
+        members=[Agent(name="Member", model=StubModel(id="member", latency_ms=0))],
+        model=StubModel(id="team", latency_ms=0),
+        db=db,
+        fast_agent=Agent(name="Fast Data Agent", model=StubModel(id="fast", latency_ms=0), db=db),
+    )
+
+def test_simple_requests_skip_the_team(tmp_path):
+    '''
+    The first simple request of a session is answered by the fast agent and added to the team session,
+    the follow-up questions and the analyses run the team.
+    '''
+    team = routed_team(tmp_path)
+    assert team.deep_copy().fast_agent.name == "Fast Data Agent"
+    before = routing_stats.stats()
+
+    output = asyncio.run(team.arun("Show me 2024 team shooting", session_id="s1"))
+    assert output.metadata["routing"] == {"route": "data", "reason": "data retrieval", "agent": "Fast Data Agent"}
+    assert output.content == "Stub answer to: Show me 2024 team shooting"
+    assert [run.run_id for run in team.get_session("s1").runs] == [output.run_id]
+
+    follow_up = asyncio.run(team.arun("Show me 2025 too", session_id="s1"))
+    assert follow_up.metadata is None or "routing" not in follow_up.metadata
+    assert len(team.get_session("s1").runs) == 2
+
+    async def stream():
+        return [event async for event in team.arun("Get the 2025 player advanced stats", session_id="s2", stream=True)]
+
+    events = asyncio.run(stream())
+    assert [event.event for event in events] == ["TeamRunStarted", "TeamRunContent", "TeamRunCompleted"]
+    assert events[-1].content == "Stub answer to: Get the 2025 player advanced stats"
+
+    after = routing_stats.stats()
+    assert (after["data"] - before["data"], after["team"] - before["team"]) == (2, 1)
+
+def test_follow_up_data_request_runs_the_team(tmp_path):
+    '''
+    A follow-up that looks like a simple data retrieval runs the team, it depends on the conversation.
+    '''
+    team = routed_team(tmp_path)
+    assert classify_request("Show me their shooting stats").route == "data"
+
+    first = asyncio.run(team.arun("Compare the 2024 rockets and magic", session_id="s1"))
+    follow_up = asyncio.run(team.arun("Show me their shooting stats", session_id="s1"))
+    for output in (first, follow_up):
+        assert output.metadata is None or "routing" not in output.metadata
+    assert len(team.get_session("s1").runs) == 2
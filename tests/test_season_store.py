@@ -0,0 +1,127 @@
+'''
+This module tests the local Parquet season store.
+'''
+import os
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import utils.season_store as season_store_module
+from utils.season_store import SeasonStore, get_current_season, ingest, read_season_table, season_end_year
+
+def test_write_and_read_columns(tmp_path):
+    '''
+    A table is partitioned by season, recorded in the manifest and read back column by column.
+    '''
+    stats = pd.DataFrame({"Player": ["A. Sengun", "F. VanVleet"], "BPM": [4.1, 1.2], "WS": [9.0, 5.5]})
+    store = SeasonStore(store_dir=str(tmp_path))
+
+    assert not store.has("adv_stats", "2025")
+    store.write("adv_stats", "2025", stats)
+
+    assert (tmp_path / "adv_stats" / "season=2025" / "data.parquet").exists()
+    assert store.read("adv_stats", "2025").equals(stats)
+    assert store.read("adv_stats", "2025", columns=["Player", "BPM"]).columns.tolist() == ["Player", "BPM"]
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert manifest["adv_stats"]["2025"]["rows"] == 2
+    assert "fetched_at" in manifest["adv_stats"]["2025"]
+
+def test_preload(tmp_path):
+    '''
+    Preloaded tables are served from memory, a new write replaces the preloaded table.
+    '''
+    stats = pd.DataFrame({"Player": ["A. Sengun"], "BPM": [4.1]})
+    SeasonStore(store_dir=str(tmp_path)).write("adv_stats", "2025", stats)
+
+    store = SeasonStore(store_dir=str(tmp_path))
+    assert store.preload() == 1
+    (tmp_path / "adv_stats" / "season=2025" / "data.parquet").unlink()
+    assert store.read("adv_stats", "2025", columns=["BPM"]).equals(stats[["BPM"]])
+
+    store.write("adv_stats", "2025", stats.assign(BPM=[5.0]))
+    assert store.read("adv_stats", "2025")["BPM"].tolist() == [5.0]
+
+def test_current_season_is_refreshed(tmp_path, monkeypatch):
+    '''
+    A table of the season in progress is fetched again once it is older than the TTL,
+    completed seasons are served from the store, and a stale table is served if the refresh fails.
+    '''
+    current, completed = str(get_current_season()), str(get_current_season() - 1)
+    store = SeasonStore(store_dir=str(tmp_path), ttl=60)
+    for season in (current, completed):
+        store.write("adv_stats", season, pd.DataFrame({"Player": ["A. Sengun"], "BPM": [4.1]}))
+
+    calls = []
+    def fetch(table, season):
+        calls.append(season)
+        return pd.DataFrame({"Player": ["A. Sengun"], "BPM": [5.0]})
+
+    monkeypatch.setattr(season_store_module, "season_store", store)
+    monkeypatch.setattr(season_store_module, "fetch_season_table", fetch)
+    assert read_season_table("adv_stats", current)["BPM"].tolist() == [4.1]
+
+    # Age the manifest entries beyond the TTL
+    manifest = json.loads(store.manifest_path.read_text())
+    for season in (current, completed):
+        manifest["adv_stats"][season]["fetched_at"] = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    store.manifest_path.write_text(json.dumps(manifest))
+
+    assert read_season_table("adv_stats", completed)["BPM"].tolist() == [4.1]
+    assert read_season_table("adv_stats", current)["BPM"].tolist() == [5.0]
+    assert read_season_table("adv_stats", current)["BPM"].tolist() == [5.0]
+    assert calls == [current]
+    assert not store.is_stale("adv_stats", current)
+
+    def unavailable(table, season):
+        raise ConnectionError("upstream unavailable")
+
+    manifest = json.loads(store.manifest_path.read_text())
+    manifest["adv_stats"][current]["fetched_at"] = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    store.manifest_path.write_text(json.dumps(manifest))
+    monkeypatch.setattr(season_store_module, "fetch_season_table", unavailable)
+    assert read_season_table("adv_stats", current)["BPM"].tolist() == [5.0]
+
+def test_season_labels(tmp_path):
+    '''
+    Seasons are named after their ending year, with both years in the label or not.
+    '''
+    assert [season_end_year(label) for label in ("2024", 2024, "2023-24", "2023/2024", "1999-00")] == [2024] * 4 + [2000]
+    with pytest.raises(ValueError):
+        season_end_year("last season")
+
+    current = get_current_season()
+    store = SeasonStore(store_dir=str(tmp_path), ttl=60)
+    assert store.is_stale("adv_stats", f"{current - 1}-{str(current)[-2:]}")
+    assert not store.is_stale("adv_stats", f"{current - 2}-{str(current - 1)[-2:]}")
+
+def test_ingest_up_to_the_current_season(tmp_path, monkeypatch):
+    '''
+    Without an end season, the ingestion runs up to the season in progress at call time.
+    '''
+    store = SeasonStore(store_dir=str(tmp_path))
+    monkeypatch.setattr(season_store_module, "season_store", store)
+    monkeypatch.setattr(season_store_module, "fetch_season_table", lambda table, season: pd.DataFrame({"Season": [season]}))
+    monkeypatch.setattr(season_store_module, "get_current_season", lambda: 2031)
+
+    ingest(start_season=2030, end_season=None, force=False)
+    assert sorted(store.read_manifest()["adv_stats"]) == ["2030", "2031"]
+
+def test_concurrent_manifest_writes(tmp_path):
+    '''
+    Writes of several workers (separate stores on the same directory) are all recorded in the manifest.
+    '''
+    stores = [SeasonStore(store_dir=str(tmp_path)) for _ in range(4)]
+    stats = pd.DataFrame({"Player": ["A. Sengun"], "BPM": [4.1]})
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda season: stores[season % 4].write("adv_stats", str(season), stats), range(2000, 2032)))
+
+    assert sorted(json.loads((tmp_path / "manifest.json").read_text())["adv_stats"]) == [str(season) for season in range(2000, 2032)]
+    assert not list(tmp_path.rglob("*.tmp"))
@@ -0,0 +1,154 @@
+'''
+This module tests the semantic response cache.
+'''
+import os
+import sys
+import asyncio
+
+import pandas as pd
+from agno.agent import Agent
+from agno.db.sqlite import SqliteDb
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import utils.semantic_cache as semantic_cache_module
+from utils.season_store import SeasonStore, get_current_season
+from utils.semantic_cache import CachedTeam, SemanticCache, extract_parameters, normalize_question
+from utils.stub_model import StubModel
+
+def test_parameters_and_normalization():
+    '''
+    Seasons, game dates, counts, teams, stats, positions and the number of clusters are extracted,
+    the season notations are unified.
+    '''
+    parameters = extract_parameters("Cluster the 2023-24 Celtics and HOU by shooting in 3 clusters")
+    assert parameters == {
+        "seasons": [2024], "dates": [], "counts": [3], "teams": ["BOS", "HOU"], "stats": [], "positions": [], "n_cluster": 3,
+    }
+    assert extract_parameters("What does DBPM mean?") == {
+        "seasons": [], "dates": [], "counts": [], "teams": [], "stats": ["DBPM"], "positions": [], "n_cluster": None,
+    }
+    parameters = extract_parameters("Top 10 point guards by assists in 2024 and the Rockets game on 20251116")
+    assert parameters["seasons"] == [2024]
+    assert parameters["dates"] == ["20251116"]
+    assert parameters["counts"] == [10]
+    assert parameters["stats"] == ["AST"]
+    assert parameters["positions"] == ["PG"]
+
+    assert normalize_question("Please, cluster the 2023-24 teams!") == normalize_question("cluster 2024 teams")
+
+def test_other_parameters_miss(tmp_path, monkeypatch):
+    '''
+    Similar questions with another count, date, stat or position never share an answer.
+    '''
+    monkeypatch.setattr(semantic_cache_module, "season_store", SeasonStore(store_dir=str(tmp_path / "seasons")))
+    cache = SemanticCache(path=str(tmp_path / "cache.db"))
+    pairs = [
+        ("top 10 players by BPM in 2024", "top 20 players by BPM in 2024"),
+        ("teams with the most 3 pointers", "teams with the most 2 pointers"),
+        ("Rockets game on 20251116", "Rockets game on 20251118"),
+        ("Rockets players", "Rockets guards"),
+        ("Rockets players by points", "Rockets players by rebounds"),
+    ]
+    for cached, question in pairs:
+        cache.store("team", cached, f"Answer to {cached}", {"run_id": "1"})
+        assert cache.lookup("team", question) is None
+        assert cache.lookup("team", f"{cached}?")[0] == f"Answer to {cached}"
+
+def test_lookup_and_freshness(tmp_path, monkeypatch):
+    '''
+    Near-identical questions hit the cache for the same parameters and user only.
+    Answers about the current season expire when the season store is refreshed, completed seasons never expire.
+    '''
+    store = SeasonStore(store_dir=str(tmp_path / "seasons"))
+    monkeypatch.setattr(semantic_cache_module, "season_store", store)
+    cache = SemanticCache(path=str(tmp_path / "cache.db"), threshold=0.9, ttl=3600)
+
+    current = get_current_season()
+    cache.store("team", f"Cluster {current - 1} teams by shooting", "Old clusters", {"run_id": "1"})
+    cache.store("team", f"Cluster {current} teams by shooting", "Current clusters", {"run_id": "2"})
+
+    answer, provenance = cache.lookup("team", f"cluster {current - 1} teams by shooting?")
+    assert answer == "Old clusters"
+    assert provenance["run_id"] == "1"
+    assert provenance["similarity"] >= 0.9
+    assert cache.lookup("team", f"Cluster {current - 2} teams by shooting") is None
+    assert cache.lookup("other_team", f"Cluster {current - 1} teams by shooting") is None
+    assert cache.lookup("team", f"Cluster {current - 1} teams by shooting", user_id="other_user") is None
+    assert cache.lookup("team", f"Who had the best defense in {current - 1}?") is None
+    assert cache.lookup("team", f"Cluster {current} teams by shooting")[0] == "Current clusters"
+
+    store.write("team_shooting", str(current), pd.DataFrame({"Team": ["HOU"]}))
+    assert cache.lookup("team", f"Cluster {current} teams by shooting") is None
+    assert cache.lookup("team", f"Cluster {current - 1} teams by shooting")[0] == "Old clusters"
+
+    stats = cache.stats()
+    assert stats["lookups"] == 8
+    assert stats["hits"] == 3
+    assert stats["expired"] == 1
+    assert stats["hit_rate"] == round(3 / 8, 3)
+
+def test_follow_up_questions_skip_the_cache(tmp_path, monkeypatch):
+    '''
+    The first question of a session is stored and answers the same question in a new session,
+    a follow-up question in a session that already has runs runs the team.
+    '''
+    monkeypatch.setattr(semantic_cache_module, "SEMANTIC_CACHE", "true")
+    monkeypatch.setattr(semantic_cache_module, "season_store", SeasonStore(store_dir=str(tmp_path / "seasons")))
+    monkeypatch.setattr(semantic_cache_module, "semantic_cache", SemanticCache(path=str(tmp_path / "cache.db")))
+    team = CachedTeam(
+        name="Team",
+        id="team",
+        members=[Agent(name="Member", model=StubModel(id="member", latency_ms=0))],
+        model=StubModel(id="team", latency_ms=0),
+        db=SqliteDb(db_file=str(tmp_path / "agno.db")),
+    )
+    question = f"Cluster {get_current_season() - 1} teams by shooting"
+
+    first = asyncio.run(team.arun(question, session_id="s1"))
+    assert not first.run_id.startswith("cached-")
+    assert asyncio.run(team.arun(question, session_id="s2")).run_id == f"cached-{first.run_id}"
+
+    follow_up = asyncio.run(team.arun(question, session_id="s1"))
+    assert not follow_up.run_id.startswith("cached-")
+    assert len(team.get_session("s1").runs) == 2
+    assert semantic_cache_module.semantic_cache.stats()["stores"] == 1
+
+    # Answers may depend on the memories of the user
+    other_user = asyncio.run(team.arun(question, session_id="s3", user_id="other_user"))
+    assert not other_user.run_id.startswith("cached-")
+
+def test_cached_answers_are_added_to_the_session(tmp_path, monkeypatch):
+    '''
+    A cached answer is added to the session, a follow-up question gets it in its history.
+    '''
+    monkeypatch.setattr(semantic_cache_module, "SEMANTIC_CACHE", "true")
+    monkeypatch.setattr(semantic_cache_module, "season_store", SeasonStore(store_dir=str(tmp_path / "seasons")))
+    monkeypatch.setattr(semantic_cache_module, "semantic_cache", SemanticCache(path=str(tmp_path / "cache.db")))
+    team = CachedTeam(
+        name="Team",
+        id="team",
+        members=[Agent(name="Member", model=StubModel(id="member", latency_ms=0))],
+        model=StubModel(id="team", latency_ms=0),
+        db=SqliteDb(db_file=str(tmp_path / "agno.db")),
+        add_history_to_context=True,
+    )
+    question = f"Cluster {get_current_season() - 1} teams by shooting"
+    asyncio.run(team.arun(question, session_id="s1"))
+
+    cached = asyncio.run(team.arun(question, session_id="s2"))
+    assert cached.run_id.startswith("cached-")
+    assert [run.run_id for run in team.get_session("s2").runs] == [cached.run_id]
+
+    follow_up = asyncio.run(team.arun("And the year before?", session_id="s2"))
+    assert not follow_up.run_id.startswith("cached-")
+    assert any(message.content == cached.content for message in follow_up.messages if message.role == "assistant")
+    assert len(team.get_session("s2").runs) == 2
+
+    async def stream():
+        return [event async for event in team.arun(question, session_id="s3", stream=True)]
+
+    events = asyncio.run(stream())
+    assert [event.event for event in events] == ["TeamRunStarted", "TeamRunContent", "TeamRunCompleted"]
+    assert team.get_session("s3").runs[0].content == events[-1].content
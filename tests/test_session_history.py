@@ -0,0 +1,56 @@
+'''
+This module tests the session history settings and the token meter.
+'''
+import os
+import sys
+from types import SimpleNamespace
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.session_history import SessionTokenMeter, get_history_settings, record_session_tokens, session_token_meter
+
+def test_token_meter():
+    '''
+    Tokens are added up per session and runs above the budget are counted.
+    '''
+    meter = SessionTokenMeter(max_sessions=2, token_budget=1000)
+    meter.record("a", 400, 50)
+    stats = meter.record("a", 1200, 80)
+
+    assert stats == {
+        "runs": 2,
+        "input_tokens": 1600,
+        "output_tokens": 130,
+        "last_input_tokens": 1200,
+        "max_input_tokens": 1200,
+        "runs_over_budget": 1,
+    }
+
+    # The least recently used session is dropped
+    meter.record("b", 10, 1)
+    meter.record("c", 10, 1)
+    assert meter.get("a") is None
+    assert meter.get("c")["runs"] == 1
+
+def test_post_hook_records_run():
+    '''
+    The post hook reads the metrics of the run output.
+    '''
+    run_output = SimpleNamespace(metrics=SimpleNamespace(input_tokens=321, output_tokens=12))
+    record_session_tokens(run_output, SimpleNamespace(session_id="test-session"))
+
+    assert session_token_meter.get("test-session")["input_tokens"] == 321
+
+def test_history_settings():
+    '''
+    The history is windowed and every Agent or Team gets its own compression manager.
+    '''
+    settings = get_history_settings()
+    assert settings["num_history_runs"] > 0
+    assert settings["post_hooks"] == [record_session_tokens]
+    assert "num_team_history_runs" not in settings
+    assert "num_team_history_runs" in get_history_settings(team=True)
+
+    if settings.get("compression_manager") is not None:
+        assert get_history_settings()["compression_manager"] is not settings["compression_manager"]
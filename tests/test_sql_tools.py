@@ -0,0 +1,74 @@
+'''
+This module tests the DuckDB SQL tools of the analyst agent.
+'''
+import os
+import sys
+
+import pandas as pd
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.pbp_cache import PlayByPlayCache, parse_play_by_play_html
+from utils.pbp_parser import parse_events
+from utils.sql_tools import StatsSqlTools
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pbp_20251116_HOU.html")
+
+def make_tools(tmp_path, **kwargs) -> StatsSqlTools:
+    '''
+    SQL tools over a season table and the events of the recorded game.
+    '''
+    season_dir = tmp_path / "seasons" / "team_shooting" / "season=2025"
+    season_dir.mkdir(parents=True)
+    pd.DataFrame({"Team": ["HOU", "ORL"], "3P_pct": [0.35, 0.33]}).to_parquet(season_dir / "data.parquet")
+
+    events = parse_events(parse_play_by_play_html(FIXTURE))
+    PlayByPlayCache(cache_dir=str(tmp_path / "pbp"), suffix="events").put("20251116", "HOU", events, final=True)
+
+    return StatsSqlTools(season_store_dir=str(tmp_path / "seasons"), pbp_cache_dir=str(tmp_path / "pbp"), **kwargs)
+
+def test_query_views(tmp_path):
+    '''
+    Season tables and game events are exposed as views and aggregated in SQL.
+    '''
+    tools = make_tools(tmp_path)
+
+    tables = tools.list_tables()
+    assert "team_shooting: Team VARCHAR" in tables
+    assert "game_events: date VARCHAR, home_team VARCHAR" in tables
+
+    result = tools.run_sql_query("SELECT season, Team FROM team_shooting WHERE Team = 'HOU'")
+    assert "2025,HOU" in result
+
+    result = tools.run_sql_query(
+        "SELECT home_team, team, sum(points) AS pts FROM game_events GROUP BY ALL ORDER BY pts DESC;")
+    assert "HOU,ORL,130" in result
+    assert "HOU,HOU,116" in result
+
+def test_limits_and_read_only(tmp_path):
+    '''
+    Results are truncated to the row limit and only SELECT statements on the data directories are run.
+    '''
+    tools = make_tools(tmp_path, max_rows=3)
+
+    result = tools.run_sql_query("SELECT * FROM game_events", limit=10)
+    assert result.startswith("data[3]")
+    assert "Result truncated to 3 rows" in result
+
+    assert tools.run_sql_query("DROP VIEW game_events").startswith("Error")
+    assert tools.run_sql_query("SELECT 1; SELECT 2").startswith("Error")
+    assert tools.run_sql_query("SELECT * FROM read_csv('/etc/passwd')").startswith("Error")
+
+def test_cache_invalidation(tmp_path):
+    '''
+    Cached results are dropped when a new game is added to the play by play cache.
+    '''
+    tools = make_tools(tmp_path)
+    query = "SELECT count(DISTINCT date) AS games FROM game_events"
+    assert tools.run_sql_query(query) == tools.run_sql_query(f"  {query} ;")
+    assert len(tools._cache) == 1
+
+    events = parse_events(parse_play_by_play_html(FIXTURE))
+    PlayByPlayCache(cache_dir=str(tmp_path / "pbp"), suffix="events").put("20251117", "HOU", events, final=True)
+    assert "2" in tools.run_sql_query(query).splitlines()[1]
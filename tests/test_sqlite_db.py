@@ -0,0 +1,44 @@
+'''
+This module tests the shared SQLite database of the agents.
+'''
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+from agno.db.schemas.memory import UserMemory
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.config import sqlite_db, SQLITE_BUSY_TIMEOUT_MS
+
+def test_shared_instance_and_pragmas(tmp_path):
+    '''
+    Agents using the same database file share one instance with WAL mode enabled.
+    '''
+    db_path = str(tmp_path / "agno.db")
+    db = sqlite_db(db_path)
+
+    assert sqlite_db(db_path) is db
+    assert sqlite_db(str(tmp_path / "other.db")) is not db
+
+    with db.db_engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == SQLITE_BUSY_TIMEOUT_MS
+
+def test_concurrent_writes(tmp_path):
+    '''
+    Concurrent sessions write their memories without errors.
+    '''
+    db = sqlite_db(str(tmp_path / "agno.db"))
+
+    def write(index: int) -> None:
+        for run in range(5):
+            db.upsert_user_memory(UserMemory(memory=f"Memory {run}", user_id=f"user-{index}"))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(8)))
+
+    memories = db.get_user_memories()
+    assert len(memories) == 40
@@ -0,0 +1,78 @@
+'''
+This module tests the column-wise table serializer of the tool outputs.
+'''
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pandas_toon  # Registers DataFrame.to_toon, the reference of the TOON output
+import pytest
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.pbp_cache import parse_play_by_play_html
+from utils.table_format import FORMATS, iter_table, read_table, to_table, to_toon
+from utils.tool_output import estimate_tokens, fit_rows
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "pbp_20251116_HOU.html")
+
+def player_table() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Player": ["Alperen Sengun", "Paolo Banchero", "Dorian Finney-Smith, Jr.", 'Jalen "JG" Green', "A|B"],
+        "Age": [23, 22, 32, 23, 30],
+        "TS%": [0.574, 0.561, np.nan, 0.52, 1e-05],
+        "Starter": [True, True, False, False, True],
+        "Note": ["", None, "bench", " two spaces ", "x\ny"],
+    })
+
+def test_toon_matches_pandas_toon():
+    '''
+    Without missing values the TOON output is the output of pandas_toon.
+    '''
+    df = player_table().drop(columns=["Note"]).fillna(0.5)
+    df["Player"] = ["Alperen Sengun", "Paolo Banchero", "Dorian Finney-Smith, Jr.", "Jalen Green", "A|B"]
+    assert to_toon(df) == df.to_toon()
+    assert to_toon(df.head(0)) == df.head(0).to_toon()
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_round_trip(format):
+    '''
+    Numbers, booleans, text with separators or quotes and missing values are read back.
+    '''
+    df = player_table()
+    expected = df.replace({"": None}).astype(object).where(df.notna(), None)
+    if format == "markdown":
+        expected["Note"] = [None, None, "bench", "two spaces", "x y"]
+    else:
+        expected["Note"] = [None, None, "bench", " two spaces ", "x\ny"]
+
+    result = read_table(to_table(df, format), format)
+    assert list(result.columns) == list(df.columns)
+    assert result.astype(object).where(result.notna(), None).equals(expected)
+    assert result["Age"].dtype == np.int64 and result["Starter"].dtype == bool
+
+def test_stream_in_chunks():
+    '''
+    The chunks joined are the whole table, the first chunk holds the header and the first rows only.
+    '''
+    df = parse_play_by_play_html(FIXTURE)
+    for format in FORMATS:
+        chunks = list(iter_table(df, format, chunk_rows=100))
+        assert len(chunks) == 1 + -(-len(df) // 100)
+        assert "".join(chunks) == to_table(df, format)
+    assert read_table(to_table(df)).shape == df.shape
+
+def test_fit_rows_in_budget():
+    '''
+    The page holds the most rows within the token budget, and at least one row.
+    '''
+    df = parse_play_by_play_html(FIXTURE)
+    rows, page = fit_rows(df, max_tokens=2_000)
+    assert estimate_tokens(page) <= 2_000
+    assert estimate_tokens(to_toon(df.head(rows + 1))) > 2_000
+    assert page == to_toon(df.head(rows))
+
+    assert fit_rows(df, max_tokens=1)[0] == 1
+    assert fit_rows(df.head(0), max_tokens=100) == (0, to_toon(df.head(0)))
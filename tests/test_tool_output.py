@@ -0,0 +1,89 @@
+'''
+This module tests the budgeted tool output serializer.
+'''
+import os
+import sys
+
+import pandas as pd
+import pandas_toon  # Registers DataFrame.to_toon, the reference of the TOON output
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.tool_output import CursorStore, format_tool_output, estimate_tokens, get_next_page
+
+def season_table(rows: int = 500) -> pd.DataFrame:
+    '''
+    A wide player table like the advanced stats clustering.
+    '''
+    df = pd.DataFrame({"Player": [f"Player {i}" for i in range(rows)], "cluster": [i % 5 for i in range(rows)]})
+    for column in ["PER", "TS%", "USG%", "OWS", "DWS", "WS", "WS/48", "OBPM", "DBPM", "BPM", "VORP"]:
+        df[column] = [round(i * 0.37 % 30, 2) for i in range(rows)]
+    return df
+
+def test_row_and_token_budget():
+    '''
+    Pages stay within the budget and report the elided rows.
+    '''
+    df = season_table()
+
+    output = format_tool_output(df, max_rows=50, max_tokens=10_000)
+    assert output.startswith("data[50]")
+    assert "Showing rows 1-50 of 500, 450 rows elided." in output
+
+    output = format_tool_output(df, max_rows=500, max_tokens=1_000)
+    page = output.split("\n\n")[0]
+    assert estimate_tokens(page) <= 1_000
+    assert "rows elided" in output
+
+    small = format_tool_output(df.head(3))
+    assert small == df.head(3).to_toon()
+
+def test_column_projection():
+    '''
+    Only the requested columns and the key columns are returned, unknown columns are reported.
+    '''
+    df = season_table(10)
+
+    output = format_tool_output(df, columns=["bpm", "WS"], key_columns=["Player", "cluster"])
+    assert output.startswith("data[10]{Player,cluster,BPM,WS}")
+
+    output = format_tool_output(df, columns=["BPM", "PTS"], key_columns=["Player"])
+    assert output.startswith("data[10]{Player,BPM}")
+    assert "Unknown columns: PTS." in output
+
+def test_pagination():
+    '''
+    The cursor returns the next page until all rows are read.
+    '''
+    df = season_table(25)
+    output = format_tool_output(df, columns=["BPM"], key_columns=["Player"], max_rows=10)
+
+    pages = [output]
+    while "get_next_page" in pages[-1]:
+        cursor = pages[-1].split('cursor "')[1].split('"')[0]
+        pages.append(get_next_page.entrypoint(cursor))
+
+    assert len(pages) == 3
+    assert pages[1].startswith("data[10]{Player,BPM}")
+    assert "Player 10," in pages[1]
+    assert "Showing rows 21-25 of 25, 0 rows elided." in pages[2]
+    assert "unknown or expired" in get_next_page.entrypoint(cursor)
+
+def test_cursor_shared_across_workers(tmp_path):
+    '''
+    A cursor created by one worker can be read once by another worker.
+    '''
+    df = season_table(25)
+    worker_1 = CursorStore(store_dir=str(tmp_path))
+    worker_2 = CursorStore(store_dir=str(tmp_path))
+
+    cursor = worker_1.put(df, 10, 10, 4000)
+    entry = worker_2.pop(cursor)
+    assert entry is not None
+    assert entry[0].equals(df)
+    assert entry[1:] == (10, 10, 4000)
+
+    assert worker_2.pop(cursor) is None
+    assert worker_2.pop("../manifest") is None
+    assert not list(tmp_path.glob("*.parquet"))
@@ -0,0 +1,98 @@
+'''
+This module tests the sampled, batched tracing pipeline.
+'''
+import os
+import sys
+import json
+import time
+import sqlite3
+
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.trace import Status, StatusCode
+
+# Add src to path to import our modules
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.tracing import (
+    SampledBatchSpanProcessor,
+    SamplingPolicy,
+    SqliteSpanExporter,
+    create_tracer_provider,
+    )
+
+class MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+def run(tracer, name: str, error: bool = False, sleep: float = 0.0) -> None:
+    with tracer.start_as_current_span(name):
+        with tracer.start_as_current_span(f"{name}.model") as span:
+            time.sleep(sleep)
+            if error:
+                span.set_status(Status(StatusCode.ERROR, "boom"))
+
+def test_tail_sampling_keeps_errors_and_slow_runs():
+    '''
+    Errors and slow runs are exported with all their spans, the other runs are sampled out.
+    '''
+    exporter = MemoryExporter()
+    processor = SampledBatchSpanProcessor(exporter, policy=SamplingPolicy(sample_rate=0.0, slow_ms=50), export_interval_ms=10)
+    tracer = create_tracer_provider(processor).get_tracer("test")
+
+    run(tracer, "ok")
+    run(tracer, "failed", error=True)
+    run(tracer, "slow", sleep=0.06)
+    assert processor.force_flush()
+
+    assert sorted(span.name for span in exporter.spans) == ["failed", "failed.model", "slow", "slow.model"]
+    stats = processor.stats()
+    assert (stats["kept_error"], stats["kept_slow"], stats["sampled_out"]) == (1, 1, 1)
+    assert (stats["spans"], stats["exported_spans"], stats["queued_spans"], stats["open_traces"]) == (6, 4, 0, 0)
+
+    # Every run is kept with a sample rate of 1
+    processor.policy = SamplingPolicy(sample_rate=1.0)
+    run(tracer, "sampled")
+    processor.shutdown()
+    assert processor.stats()["kept_sampled"] == 1 and len(exporter.spans) == 6
+
+def test_bounded_queue_drops_runs():
+    '''
+    Runs that do not fit in the queue before the next export are dropped and counted.
+    '''
+    exporter = MemoryExporter()
+    processor = SampledBatchSpanProcessor(
+        exporter, policy=SamplingPolicy(sample_rate=1.0), queue_size=4, batch_size=100, export_interval_ms=60000,
+        )
+    tracer = create_tracer_provider(processor).get_tracer("test")
+
+    for index in range(4):
+        run(tracer, f"run-{index}")
+    assert processor.force_flush()
+    assert processor.stats()["dropped_queue_full"] == 4
+    assert len(exporter.spans) == 4
+
+def test_sqlite_exporter(tmp_path):
+    '''
+    The spans are stored in the local database with their trace, parent and attributes.
+    '''
+    exporter = SqliteSpanExporter(str(tmp_path / "traces.db"))
+    processor = SampledBatchSpanProcessor(exporter, policy=SamplingPolicy(sample_rate=1.0))
+    tracer = create_tracer_provider(processor).get_tracer("test")
+
+    with tracer.start_as_current_span("Team.arun", attributes={"input.value": "Show me 2024 team shooting"}):
+        run(tracer, "Agent.arun")
+    processor.shutdown()
+
+    with sqlite3.connect(tmp_path / "traces.db") as connection:
+        rows = connection.execute("SELECT name, parent_id, attributes, trace_id FROM spans ORDER BY start_time").fetchall()
+    assert [row[0] for row in rows] == ["Team.arun", "Agent.arun", "Agent.arun.model"]
+    assert rows[0][1] is None and rows[1][1] is not None
+    assert json.loads(rows[0][2]) == {"input.value": "Show me 2024 team shooting"}
+    assert len({row[3] for row in rows}) == 1